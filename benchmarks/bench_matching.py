@@ -0,0 +1,91 @@
+"""
+Benchmark matching of raw shortcut dictionaries against compiled shortcuts,
+with and without the dispatch index
+
+Usage: python benchmarks/bench_matching.py [SIZE ...]
+"""
+
+import sys
+import time
+
+from shellcut import main
+from shellcut.index import ShortcutIndex
+
+from synthetic import generate_shortcuts, generate_inputs
+
+
+def time_lookups(inputs, shortcuts, index=None, label=None):
+    """
+    Return the average time of one check_shortcuts call in seconds
+    """
+    start = time.perf_counter()
+    for input_data in inputs:
+        main.check_shortcuts(input_data, shortcuts, label, index=index)
+    return (time.perf_counter() - start) / len(inputs)
+
+
+def bench(size, lookups=5):
+    raw = generate_shortcuts(size)
+    inputs = generate_inputs(raw, lookups)
+
+    start = time.perf_counter()
+    compiled = main.compile_shortcuts(raw)
+    # patterns are compiled lazily, force it to time it
+    for shortcut in compiled:
+        shortcut.parsers, shortcut.regexes
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = ShortcutIndex(compiled)
+    index_time = time.perf_counter() - start
+
+    raw_time = time_lookups(inputs, raw)
+    compiled_time = time_lookups(inputs, compiled)
+    indexed_time = time_lookups(inputs, compiled, index)
+    start = time.perf_counter()
+    index.label_index('docs')
+    label_index_time = time.perf_counter() - start
+    labelled_time = time_lookups(inputs, compiled, index, label='docs')
+
+    print('{:>7} shortcuts: raw {:8.2f} ms/lookup, compiled {:8.2f} '
+          'ms/lookup ({:.1f}x), compile once {:8.2f} ms'.format(
+              size, raw_time * 1000, compiled_time * 1000,
+              raw_time / compiled_time, compile_time * 1000))
+    print('{:>18} indexed {:8.3f} ms/lookup ({:.0f}x), build index '
+          '{:8.2f} ms'.format(
+              '', indexed_time * 1000, raw_time / indexed_time,
+              index_time * 1000))
+    print('{:>18} indexed with label {:8.3f} ms/lookup, build label index '
+          '{:8.2f} ms'.format(
+              '', labelled_time * 1000, label_index_time * 1000))
+
+
+def bench_shared_prefix(size, per_label=333, lookups=20):
+    """
+    Time labelled lookups among shortcuts which all share their prefix and
+    literals, 'per_label' of them per label
+    """
+    labels = max(1, size // per_label)
+    compiled = main.compile_shortcuts([
+        {'name': 'Shortcut {}'.format(i),
+         'match': 'https://github.com/{}/{}',
+         'label': 'repo{}'.format(i % labels),
+         'bash': 'echo {}'}
+        for i in range(size)])
+    index = ShortcutIndex(compiled)
+    index.label_index('repo1')
+    inputs = ['https://github.com/a/b{}'.format(i) for i in range(lookups)]
+
+    unlabelled_time = time_lookups(inputs, compiled, index)
+    labelled_time = time_lookups(inputs, compiled, index, label='repo1')
+    print('{:>7} shortcuts with a shared prefix: indexed {:8.3f} ms/lookup, '
+          'with label {:8.3f} ms/lookup'.format(
+              size, unlabelled_time * 1000, labelled_time * 1000))
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000]
+    for size in sizes:
+        bench(size)
+    for size in sizes:
+        bench_shared_prefix(size)
@@ -0,0 +1,57 @@
+"""
+Memory benchmark of the loaded shortcuts, measured with tracemalloc
+
+Compares the raw shortcut dictionaries loaded from the yaml configs with the
+compact compiled Shortcut objects (once the dictionaries are dropped), and
+with the shortcuts after compiling all of their patterns.
+
+Usage: python benchmarks/bench_memory.py [SIZE ...]
+"""
+
+import gc
+import sys
+import tempfile
+import tracemalloc
+
+from shellcut import main
+
+from synthetic import generate_shortcuts, generate_inputs, write_configs
+
+
+def allocated():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def bench(size):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        write_configs(generate_shortcuts(size), tmpdir)
+
+        tracemalloc.start()
+        base = allocated()
+        raw = main.load_shortcuts([tmpdir])
+        raw_size = allocated() - base
+
+        shortcuts = main.compile_shortcuts(raw)
+        inputs = generate_inputs(raw, 100)
+        del raw
+        compact_size = allocated() - base
+
+        for shortcut in shortcuts:
+            shortcut.parsers, shortcut.regexes
+        for input_data in inputs:
+            main.check_shortcuts(input_data, shortcuts)
+        compiled_size = allocated() - base
+        tracemalloc.stop()
+
+    print('{:>7} shortcuts: dicts {:8.1f} MB ({:4.0f} B each), compact '
+          '{:8.1f} MB ({:.2f}x), with compiled patterns {:8.1f} MB'.format(
+              size, raw_size / 2 ** 20, raw_size / size,
+              compact_size / 2 ** 20, compact_size / raw_size,
+              compiled_size / 2 ** 20))
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000]
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,213 @@
+"""
+Scaling benchmark of every phase of an 's' run over synthetic configs
+
+For each size, the shortcuts are written to several config files and the
+following phases are timed (best of --runs, in milliseconds):
+
+    get_config_dirs          one call
+    load_shortcuts           parsing all config files with yaml
+    load_shortcuts_cached    loading them from the warm cache
+    compile_shortcuts        compiling the shortcuts and building the index
+    check_shortcuts          one indexed lookup, averaged over the inputs
+    render                   rendering the scripts of one match
+    import_catalog           building the SQLite catalog (one run)
+    catalog_lookup           one lookup through the catalog, averaged over
+                             the inputs
+    s <input>                wall-clock time of the whole program
+    s <repeated input>       the same, answered from the memo of recent
+                             inputs
+
+Results are written as JSON with --output, and compared against the results
+of another revision with --compare:
+
+    python benchmarks/bench_phases.py --output old.json
+    git checkout ...
+    python benchmarks/bench_phases.py --compare old.json
+
+Usage: python benchmarks/bench_phases.py [--sizes N ...] [--runs N]
+                                         [--output FILE] [--compare FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+from unittest.mock import patch
+
+from shellcut import main, catalog
+from shellcut.index import ShortcutIndex
+
+from synthetic import generate_shortcuts, generate_inputs, write_configs
+
+
+SIZES = [10, 1000, 10000, 100000]
+
+LOOKUPS = 200
+
+
+def best_time(function, runs):
+    """
+    Return the best time of calling 'function' in milliseconds
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def compile_and_index(raw):
+    shortcuts = main.compile_shortcuts(raw)
+    return shortcuts, ShortcutIndex(shortcuts)
+
+
+def lookup_all(inputs, shortcuts, index):
+    matches = []
+    for input_data in inputs:
+        matches.extend(match for _, match in main.check_shortcuts(
+            input_data, shortcuts, index=index))
+    return matches
+
+
+def catalog_lookup_all(inputs, connection):
+    for input_data in inputs:
+        found = catalog.candidates(connection, input_data)
+        main.check_shortcuts(
+            input_data, main.compile_shortcuts([raw for _, raw in found]))
+
+
+def bench(size, runs, tmpdir):
+    """
+    Return the phase timings for 'size' shortcuts
+    """
+    config_dir = os.path.join(tmpdir, 'config')
+    os.mkdir(config_dir)
+    raw = generate_shortcuts(size)
+    files = write_configs(raw, config_dir)
+    inputs = generate_inputs(raw, LOOKUPS)
+
+    env = dict(os.environ)
+    env.update({
+        'SHELLCUT_CONFIG': config_dir,
+        'XDG_CONFIG_HOME': os.path.join(tmpdir, 'home'),
+        'XDG_CACHE_HOME': os.path.join(tmpdir, 'cache'),
+        # never ask a daemon running for the user
+        'XDG_RUNTIME_DIR': tmpdir,
+    })
+    cache_path = os.path.join(tmpdir, 'shortcuts.cache')
+    configdirs = [config_dir]
+    results = {'shortcuts': size, 'files': len(files)}
+
+    with patch.dict(os.environ, {'SHELLCUT_CONFIG': config_dir}):
+        results['get_config_dirs'] = best_time(main.get_config_dirs, runs)
+    results['load_shortcuts'] = best_time(
+        lambda: main.load_shortcuts(configdirs), runs)
+    main.load_shortcuts_cached(configdirs, cache_path)
+    results['load_shortcuts_cached'] = best_time(
+        lambda: main.load_shortcuts_cached(configdirs, cache_path), runs)
+    results['compile_shortcuts'] = best_time(
+        lambda: compile_and_index(raw), runs)
+
+    shortcuts, index = compile_and_index(raw)
+    results['check_shortcuts'] = best_time(
+        lambda: lookup_all(inputs, shortcuts, index), runs) / len(inputs)
+    matches = lookup_all(inputs, shortcuts, index)
+    results['render'] = best_time(
+        lambda: [match.render() for match in matches], runs) / len(matches)
+
+    catalog_path = os.path.join(tmpdir, 'catalog.sqlite')
+    results['import_catalog'] = best_time(
+        lambda: catalog.write_catalog(configdirs, catalog_path), 1)
+    connection = catalog.open_catalog(configdirs, catalog_path)
+    results['catalog_lookup'] = best_time(
+        lambda: catalog_lookup_all(inputs, connection), runs) / len(inputs)
+    connection.close()
+
+    s = [sys.executable, '-m', 'shellcut.main', inputs[0]]
+    # the first run fills the cache
+    subprocess.check_call(s + ['--no-memo'], env=env,
+                          stdout=subprocess.DEVNULL)
+    results['s <input>'] = best_time(
+        lambda: subprocess.check_call(s + ['--no-memo'], env=env,
+                                      stdout=subprocess.DEVNULL),
+        runs)
+    # the first run fills the memo
+    subprocess.check_call(s, env=env, stdout=subprocess.DEVNULL)
+    results['s <repeated input>'] = best_time(
+        lambda: subprocess.check_call(s, env=env, stdout=subprocess.DEVNULL),
+        runs)
+    return results
+
+
+def revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    """
+    Print a table of the timings, with the ratio to the baseline timings of
+    the same size if given
+    """
+    old = {}
+    if baseline is not None:
+        old = {entry['shortcuts']: entry for entry in baseline['results']}
+
+    for entry in results:
+        print('{} shortcuts in {} files:'.format(
+            entry['shortcuts'], entry['files']))
+        for phase, elapsed in entry.items():
+            if phase in ('shortcuts', 'files'):
+                continue
+            line = '  {:<24} {:10.3f} ms'.format(phase, elapsed)
+            previous = old.get(entry['shortcuts'], {}).get(phase)
+            if previous:
+                line += '  {:6.2f}x'.format(elapsed / previous)
+            print(line)
+
+
+def run_benchmarks():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--compare',
+                        help='JSON results to compare against')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results.append(bench(size, args.runs, tmpdir))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fd:
+            baseline = json.load(fd)
+    print_results(results, baseline)
+
+    if args.output:
+        report = {
+            'revision': revision(),
+            'python': platform.python_version(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'runs': args.runs,
+            'results': results,
+        }
+        with open(args.output, 'w') as fd:
+            json.dump(report, fd, indent=2)
+            fd.write('\n')
+
+
+if __name__ == '__main__':
+    run_benchmarks()
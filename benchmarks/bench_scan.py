@@ -0,0 +1,60 @@
+"""
+Benchmark scanning a synthetic log file for tokens matching the shortcuts
+
+Every tenth line of the log holds an input matching some shortcut, the
+other tokens are line numbers, ids and common words.
+
+Usage: python benchmarks/bench_scan.py [SIZE [LINES]]
+"""
+
+import sys
+import mmap
+import time
+import random
+import tempfile
+
+from shellcut import main, scan
+from shellcut.index import ShortcutIndex
+
+from synthetic import generate_shortcuts, generate_inputs
+
+
+WORDS = ['INFO', 'ERROR', 'took', 'request', 'at', '/usr/lib/python3',
+         '12ms', 'user=bob', '(see', 'done).']
+
+
+def write_log(fd, inputs, lines, seed=0):
+    rnd = random.Random(seed)
+    for i in range(lines):
+        tokens = [str(i), rnd.choice(WORDS), rnd.choice(WORDS),
+                  rnd.choice(inputs) if i % 10 == 0 else rnd.choice(WORDS),
+                  'id{}'.format(rnd.randrange(100000))]
+        fd.write((' '.join(tokens) + '\n').encode())
+    fd.flush()
+
+
+def bench(size, lines):
+    raw = generate_shortcuts(size)
+    inputs = generate_inputs(raw, 2000)
+    shortcuts = main.compile_shortcuts(raw)
+    index = ShortcutIndex(shortcuts)
+
+    with tempfile.TemporaryFile() as fd:
+        write_log(fd, inputs, lines)
+        buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        with buffer:
+            start = time.perf_counter()
+            found = scan.scan_buffer(buffer, shortcuts, index)
+            count = sum(1 for _ in found)
+            elapsed = time.perf_counter() - start
+            megabytes = len(buffer) / 1e6
+
+    print('{:>7} shortcuts: {:.1f} MB, {} matching tokens in {:.2f} s '
+          '({:.1f} MB/s)'.format(size, megabytes, count, elapsed,
+                                 megabytes / elapsed))
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    bench(size, lines)
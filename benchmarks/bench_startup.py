@@ -0,0 +1,114 @@
+"""
+Startup benchmark of the 's' entry point
+
+Measures the import time of shellcut.main (with -X importtime) and the
+wall-clock time of 's --help' and of a match served from the warm cache, and
+fails if any of them exceeds its threshold.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--scale FACTOR]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+
+# milliseconds; wall-clock times are measured on top of a bare interpreter.
+# A cached match still imports parse (about 30 ms) to match the template and
+# spawns bash; it measured 57-96 ms, the limit leaves room for noise
+THRESHOLDS = {
+    'import shellcut.main': 25,
+    's --help': 60,
+    's <cached match>': 120,
+}
+
+CONFIG = """\
+---
+shortcuts:
+- name: Benchmark shortcut
+  match: bench{}
+  bash: ':'
+"""
+
+
+def run_time(args, env, runs):
+    """
+    Return the best wall-clock time of running 'args' in milliseconds
+    """
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.check_call(args, env=env, stdout=subprocess.DEVNULL)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def import_time(env, runs):
+    """
+    Return the best cumulative import time of shellcut.main in milliseconds
+    """
+    best = None
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, '-X', 'importtime', '-c', 'import shellcut.main'],
+            env=env, stderr=subprocess.STDOUT, universal_newlines=True)
+        for line in output.splitlines():
+            fields = [field.strip() for field in line.split('|')]
+            if len(fields) == 3 and fields[2] == 'shellcut.main':
+                elapsed = int(fields[1]) / 1000
+                best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply the thresholds, for slow machines')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config_dir = os.path.join(tmpdir, 'config')
+        os.mkdir(config_dir)
+        with open(os.path.join(config_dir, 'bench.yaml'), 'w') as fd:
+            fd.write(CONFIG)
+
+        env = dict(os.environ)
+        env.update({
+            'SHELLCUT_CONFIG': config_dir,
+            'XDG_CONFIG_HOME': tmpdir,
+            'XDG_CACHE_HOME': os.path.join(tmpdir, 'cache'),
+            # keep a running daemon from answering
+            'XDG_RUNTIME_DIR': tmpdir,
+        })
+        s = [sys.executable, '-m', 'shellcut.main']
+
+        # fill the cache
+        subprocess.check_call(s + ['bench42'], env=env)
+
+        baseline = run_time([sys.executable, '-c', 'pass'], env, args.runs)
+        results = {
+            'import shellcut.main': import_time(env, args.runs),
+            's --help':
+                run_time(s + ['--help'], env, args.runs) - baseline,
+            's <cached match>':
+                run_time(s + ['bench42'], env, args.runs) - baseline,
+        }
+
+    print('bare interpreter: {:7.1f} ms'.format(baseline))
+    failed = False
+    for name, elapsed in results.items():
+        limit = THRESHOLDS[name] * args.scale
+        status = 'ok' if elapsed <= limit else 'SLOW'
+        failed = failed or elapsed > limit
+        print('{:<20} {:7.1f} ms  (limit {:5.1f} ms) {}'.format(
+            name + ':', elapsed, limit, status))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
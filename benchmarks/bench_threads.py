@@ -0,0 +1,76 @@
+"""
+Benchmark the lookup throughput of one ShortcutEngine shared by several
+threads
+
+Every thread runs the same lookups (match and render) at once. Lookups take
+no lock, so the throughput is only bounded by the interpreter: on a build
+with the GIL it stays level as threads are added, on a free-threaded build
+it grows with the number of cores.
+
+Usage: python benchmarks/bench_threads.py [SIZE [LOOKUPS]]
+"""
+
+import os
+import sys
+import time
+import threading
+
+from shellcut.engine import ShortcutEngine
+
+from synthetic import generate_shortcuts, generate_inputs
+
+
+THREAD_COUNTS = [1, 2, 4, 8, 16]
+
+
+def lookups(engine, inputs):
+    for input_data in inputs:
+        for match in engine.match(input_data):
+            engine.render(match)
+
+
+def throughput(engine, inputs, thread_count):
+    """
+    Return the lookups per second of 'thread_count' threads each looking up
+    all inputs
+    """
+    barrier = threading.Barrier(thread_count + 1)
+
+    def worker():
+        barrier.wait()
+        lookups(engine, inputs)
+
+    threads = [threading.Thread(target=worker) for _ in range(thread_count)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return thread_count * len(inputs) / elapsed
+
+
+def bench(size, count):
+    raw = generate_shortcuts(size)
+    inputs = generate_inputs(raw, count)
+    engine = ShortcutEngine(raw)
+    # warm up
+    lookups(engine, inputs)
+
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('{} shortcuts, {} lookups per thread, {} CPUs, GIL {}'.format(
+        size, count, os.cpu_count(), 'enabled' if gil else 'disabled'))
+    single = None
+    for thread_count in THREAD_COUNTS:
+        rate = throughput(engine, inputs, thread_count)
+        if single is None:
+            single = rate
+        print('{:>4} threads: {:10.0f} lookups/s ({:.2f}x)'.format(
+            thread_count, rate, rate / single))
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    bench(size, count)
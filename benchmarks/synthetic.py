@@ -0,0 +1,90 @@
+"""
+Generators of synthetic shortcut configs for benchmarks
+"""
+
+import random
+
+
+HOSTS = ['github.com', 'gitlab.com', 'bugzilla.redhat.com', 'jira.example.com',
+         'docs.python.org', 'pypi.org', 'travis-ci.org', 'example.org']
+
+LABELS = ['bug', 'clone', 'edit', 'backup', 'docs', 'pull', 'tmp', 'review']
+
+
+def generate_shortcuts(count, seed=0):
+    """
+    Generate 'count' raw shortcut dictionaries mixing match and regex
+    conditions, labels and executors
+    """
+    rnd = random.Random(seed)
+    shortcuts = []
+    for i in range(count):
+        host = rnd.choice(HOSTS)
+        shortcut = {
+            'name': 'Shortcut {}'.format(i),
+            'bash': 'echo {} {{}}\n'.format(i),
+        }
+        kind = i % 4
+        if kind == 0:
+            shortcut['match'] = 'https://{}/s{}/{{}}'.format(host, i)
+        elif kind == 1:
+            shortcut['regex'] = r'^https://{}/r{}/(\w+)$'.format(
+                host.replace('.', r'\.'), i)
+        elif kind == 2:
+            shortcut['match'] = 'T{}-{{}}'.format(i)
+        else:
+            shortcut['match'] = ['m{}:{{}}'.format(i), 'M{}={{}}'.format(i)]
+            shortcut['regex'] = r'^x{}_(\d+)$'.format(i)
+        if rnd.random() < 0.7:
+            shortcut['label'] = rnd.sample(LABELS, rnd.randint(1, 3))
+        shortcuts.append(shortcut)
+    return shortcuts
+
+
+def generate_inputs(shortcuts, count, seed=0):
+    """
+    Generate 'count' inputs, half of them matching some of the shortcuts
+    """
+    rnd = random.Random(seed)
+    inputs = []
+    for i in range(count):
+        if i % 2:
+            inputs.append('https://unknown.example/{}'.format(i))
+            continue
+        n = rnd.randrange(len(shortcuts))
+        kind = n % 4
+        if kind == 0:
+            host = shortcuts[n]['match'].split('/')[2]
+            inputs.append('https://{}/s{}/abc'.format(host, n))
+        elif kind == 1:
+            host = shortcuts[n]['regex'][len('^https://'):].split('/')[0]
+            inputs.append('https://{}/r{}/abc'.format(
+                host.replace('\\', ''), n))
+        elif kind == 2:
+            inputs.append('T{}-42'.format(n))
+        else:
+            inputs.append('x{}_42'.format(n))
+    return inputs
+
+
+def write_configs(shortcuts, directory, per_file=1000):
+    """
+    Write the shortcuts to yaml config files of at most 'per_file' shortcuts
+    each, at least two files if there are two shortcuts
+
+    Returns:
+        list of the written file names
+    """
+    import os
+    import yaml
+
+    per_file = max(1, min(per_file, len(shortcuts) // 2))
+    filenames = []
+    for start in range(0, len(shortcuts), per_file):
+        filename = os.path.join(
+            directory, 'synthetic{:05}.yaml'.format(start // per_file))
+        with open(filename, 'w') as fd:
+            yaml.safe_dump({'shortcuts': shortcuts[start:start + per_file]},
+                           fd, default_flow_style=False)
+        filenames.append(filename)
+    return filenames
@@ -19,7 +19,6 @@ setup(
     },
     install_requires=[
         "parse",
-        "xdg",
         "pyyaml",
     ]
 )
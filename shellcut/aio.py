@@ -0,0 +1,122 @@
+"""
+Running the rendered executor scripts from an asyncio event loop
+
+For programs embedding shellcut which run shortcuts for many requests at
+once: every executor is an asyncio subprocess, so no thread is needed per
+child. The blocking functions in shellcut.executors are still what 's' uses.
+
+    import asyncio
+    from shellcut import aio
+
+    limit = asyncio.Semaphore(8)
+    status = await aio.run_executors(executor_map, timeout=10,
+                                     concurrency=limit)
+"""
+
+import os
+import sys
+import signal
+import asyncio
+import subprocess
+
+from shellcut.executors import TIMEOUT_STATUS, combine_statuses
+
+
+def write_prefixed(command, stream, line):
+    """
+    Default output handler: write the line to our stdout or stderr,
+    prefixed with the executor name
+    """
+    out = sys.stdout if stream == 'stdout' else sys.stderr
+    out.buffer.write('[{}] '.format(command).encode() + line)
+    out.buffer.flush()
+
+
+async def pipe_lines(reader, command, stream, on_output):
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        on_output(command, stream, line)
+
+
+def kill_group(process):
+    """
+    Kill the process group of a child started in a new session
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+async def run_executor(command, script, timeout, limit, on_output):
+    """
+    Run a single executor once the limit lets it start
+
+    Returns:
+        exit status, TIMEOUT_STATUS if it was killed after the timeout
+    """
+    async with limit:
+        process = await asyncio.create_subprocess_exec(
+            command, '-c', script, stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=True)
+        readers = asyncio.gather(
+            pipe_lines(process.stdout, command, 'stdout', on_output),
+            pipe_lines(process.stderr, command, 'stderr', on_output))
+        try:
+            status = await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            kill_group(process)
+            await process.wait()
+            status = TIMEOUT_STATUS
+        except BaseException:
+            # cancelled, e.g. on Ctrl-C: don't leave the child running
+            kill_group(process)
+            await process.wait()
+            readers.cancel()
+            raise
+        await readers
+        return status
+
+
+async def run_executors(executor_map, *, timeout=None, concurrency=None,
+                        on_output=None):
+    """
+    Run the executors of a match concurrently
+
+    The timeout applies to each executor. 'concurrency' limits how many
+    executors run at once: either a number, or an asyncio.Semaphore shared
+    by all calls which should count against the same limit.
+
+    Output is streamed line by line to on_output(command, stream, line),
+    where stream is 'stdout' or 'stderr' and line is bytes. By default it
+    is written to our stdout and stderr, prefixed with the executor name.
+
+    Cancelling the call kills all executors it started.
+
+    Returns:
+        combined exit status: the first non-zero status of an executor, in
+        executor order
+    """
+    if concurrency is None:
+        concurrency = max(len(executor_map), 1)
+    if isinstance(concurrency, int):
+        concurrency = asyncio.Semaphore(concurrency)
+    if on_output is None:
+        on_output = write_prefixed
+
+    tasks = [asyncio.ensure_future(
+                 run_executor(command, script, timeout, concurrency,
+                              on_output))
+             for command, script in executor_map.items()]
+    try:
+        statuses = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # let them kill their children
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return combine_statuses(statuses)
@@ -0,0 +1,204 @@
+"""
+Batch mode: match many inputs, one per line, against the shortcuts
+
+Results are written as JSON Lines, one record per input line and in the same
+order:
+
+    {"input": "BZ1234", "matches": [{"name": "Open RH bugzilla Bug",
+                                     "scripts": {"bash": "xdg-open ..."}}]}
+
+Inputs are streamed, so memory use does not depend on the number of lines.
+
+With 'run', the scripts of inputs matching exactly one shortcut are run and
+the record gets their exit status and output:
+
+    "results": {"bash": {"status": 0, "output": "..."}}
+
+bash and fish scripts are run by a shellcut.pool.ShellPool.
+"""
+
+import sys
+import json
+import itertools
+import collections
+
+from shellcut import guard, main
+
+
+# lines sent to a worker process at once
+CHUNK_SIZE = 256
+
+# set in the worker processes by init_worker
+_worker_state = None
+
+
+def match_record(input_data, shortcuts, index, label=None):
+    """
+    Return the JSON record of the shortcuts matching input_data
+    """
+    possible = main.check_shortcuts(input_data, shortcuts, label,
+                                    index=index)
+    return {
+        'input': input_data,
+        'matches': [{'name': shortcut.get('name'), 'scripts': match.render()}
+                    for shortcut, match in possible],
+    }
+
+
+def read_inputs(lines):
+    """
+    Strip the line endings of the input lines
+    """
+    for line in lines:
+        yield line.rstrip('\r\n')
+
+
+def init_worker(configdirs, guarded=False, regex_budget=None):
+    global _worker_state
+    from shellcut.index import ShortcutIndex
+
+    if guarded:
+        guard.enable(regex_budget)
+    shortcuts = main.compile_shortcuts(main.load_shortcuts_cached(configdirs))
+    _worker_state = (shortcuts, ShortcutIndex(shortcuts))
+
+
+def match_chunk(inputs, label):
+    """
+    Match a chunk of inputs in a worker process
+
+    Returns:
+        pair (records, pattern costs of the chunk if guarded)
+    """
+    shortcuts, index = _worker_state
+    records = [match_record(input_data, shortcuts, index, label)
+               for input_data in inputs]
+    costs = guard.active.take_costs() if guard.active is not None else []
+    return records, costs
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def match_parallel(inputs, label, jobs, configdirs):
+    """
+    Match the inputs in a pool of worker processes, yielding records in the
+    order of the inputs
+
+    Only a bounded number of chunks is in flight at any time. The pattern
+    costs counted by the workers are added to the guard of this process.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    checker = guard.active
+    initargs = (configdirs, checker is not None,
+                checker.budget if checker is not None else None)
+
+    def results(future):
+        records, costs = future.result()
+        if checker is not None:
+            checker.add_costs(costs)
+        return records
+
+    pending = collections.deque()
+    with ProcessPoolExecutor(jobs, initializer=init_worker,
+                             initargs=initargs) as executor:
+        for chunk in chunked(inputs, CHUNK_SIZE):
+            pending.append(executor.submit(match_chunk, chunk, label))
+            if len(pending) >= 2 * jobs:
+                yield from results(pending.popleft())
+        while pending:
+            yield from results(pending.popleft())
+
+
+def run_scripts(executor_map, pool):
+    """
+    Run the scripts of a match, capturing their status and output
+    """
+    import subprocess
+    from shellcut.pool import SHELL_COMMANDS
+
+    results = {}
+    for command, script in executor_map.items():
+        if command in SHELL_COMMANDS:
+            status, output = pool.run(command, script)
+        else:
+            completed = subprocess.run(
+                [command, '-c', script], stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            status, output = completed.returncode, completed.stdout
+        results[command] = {
+            'status': status,
+            'output': output.decode(errors='replace'),
+        }
+    return results
+
+
+def run_batch(lines, out, label=None, jobs=1, configdirs=None, run=False,
+              regex_budget=None, regex_costs=False):
+    """
+    Match every line against the shortcuts and write JSON records to 'out'
+
+    With jobs > 1, the lines are matched by that many worker processes. With
+    'run', the scripts of inputs with a single match are run as well.
+
+    Patterns taking more than 'regex_budget' seconds are skipped. With
+    'regex_costs', the time spent in every pattern is written to stderr as
+    JSON at the end.
+    """
+    if configdirs is None:
+        configdirs = main.get_config_dirs()
+    if regex_budget is not None or regex_costs:
+        guard.enable(regex_budget)
+        try:
+            run_batch(lines, out, label, jobs, configdirs, run)
+            if regex_costs:
+                json.dump({'regex_costs': guard.active.report()},
+                          sys.stderr)
+                sys.stderr.write('\n')
+        finally:
+            guard.disable()
+        return
+
+    inputs = read_inputs(lines)
+
+    if jobs > 1:
+        records = match_parallel(inputs, label, jobs, configdirs)
+    else:
+        from shellcut.index import ShortcutIndex
+
+        shortcuts = main.compile_shortcuts(
+            main.load_shortcuts_cached(configdirs))
+        index = ShortcutIndex(shortcuts)
+        records = (match_record(input_data, shortcuts, index, label)
+                   for input_data in inputs)
+
+    if not run:
+        write_records(records, out)
+        return
+
+    from shellcut.pool import ShellPool
+
+    with ShellPool(size=1) as pool:
+        write_records(run_records(records, pool), out)
+
+
+def run_records(records, pool):
+    for record in records:
+        if len(record['matches']) == 1:
+            record['results'] = run_scripts(
+                record['matches'][0]['scripts'], pool)
+        yield record
+
+
+def write_records(records, out):
+    for record in records:
+        out.write(json.dumps(record))
+        out.write('\n')
+        out.flush()
@@ -0,0 +1,101 @@
+"""
+On-disk cache of shortcuts parsed from yaml config files
+
+The cache is written with marshal. The shortcuts of a config file holding
+values marshal can't store, such as dates, are pickled instead.
+"""
+
+import os
+import marshal
+
+from shellcut.dirs import XDG_CACHE_HOME
+
+
+# bump when the layout of the cached data changes
+CACHE_VERSION = 2
+
+
+def get_cache_path():
+    """
+    Return the path of the shortcut cache file
+    """
+    return os.path.join(XDG_CACHE_HOME, 'shellcut', 'shortcuts.cache')
+
+
+def file_key(filename):
+    """
+    Return the key identifying the current content of a config file
+    """
+    st = os.stat(filename)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def read_cache(cache_path):
+    """
+    Read the cache file
+
+    Returns:
+        dict mapping config file paths to (file_key, shortcuts) pairs, or an
+        empty dict if the cache is missing, corrupt or of another version
+    """
+    try:
+        with open(cache_path, 'rb') as fd:
+            version, entries = marshal.load(fd)
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+
+    if version != CACHE_VERSION or not isinstance(entries, dict):
+        return {}
+
+    for path, (key, shortcuts) in list(entries.items()):
+        if isinstance(shortcuts, bytes):
+            import pickle
+            try:
+                entries[path] = (key, pickle.loads(shortcuts))
+            except Exception:
+                del entries[path]
+    return entries
+
+
+def encode_entries(entries):
+    """
+    Return the entries with the shortcuts marshal can't store pickled, and
+    without those pickle can't store either
+    """
+    import pickle
+
+    encoded = {}
+    for path, (key, shortcuts) in entries.items():
+        try:
+            marshal.dumps(shortcuts)
+        except ValueError:
+            try:
+                shortcuts = pickle.dumps(shortcuts, pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                continue
+        encoded[path] = (key, shortcuts)
+    return encoded
+
+
+def write_cache(cache_path, entries):
+    """
+    Atomically replace the cache file with new entries
+
+    Returns:
+        True if the cache was written, False otherwise
+    """
+    try:
+        data = marshal.dumps((CACHE_VERSION, entries))
+    except ValueError:
+        # some config contains values marshal can't store (e.g. dates)
+        data = marshal.dumps((CACHE_VERSION, encode_entries(entries)))
+
+    tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'wb') as fd:
+            fd.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        return False
+    return True
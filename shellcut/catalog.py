@@ -0,0 +1,231 @@
+"""
+SQLite catalog of the shortcuts, for very large configs
+
+'s --import-yaml' stores the shortcuts of all config files in an SQLite
+database: every shortcut with its labels, and every condition with the
+literal prefix an input has to start with. A lookup then reads only the
+shortcuts whose prefixes the input starts with, instead of loading and
+indexing all of them.
+
+    shortcuts   id (position in the configs), name, data (the shortcut as
+                JSON)
+    labels      label, shortcut_id
+    conditions  shortcut_id, kind ('match' or 'regex'), pattern, prefix,
+                folded (whether the prefix is lowercased, for match
+                templates)
+    meta        schema version and the config files imported
+
+Like the compiled dispatcher, main uses the catalog as long as it is newer
+than all config files and the set of config files did not change.
+"""
+
+import os
+
+from shellcut.dirs import XDG_CACHE_HOME
+
+
+# bump when the tables change
+SCHEMA_VERSION = 1
+
+# literal prefixes are indexed up to this length
+KEY_LENGTH = 32
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE shortcuts (id INTEGER PRIMARY KEY, name TEXT,
+                        data TEXT NOT NULL);
+CREATE TABLE labels (label TEXT NOT NULL, shortcut_id INTEGER NOT NULL);
+CREATE TABLE conditions (shortcut_id INTEGER NOT NULL, kind TEXT NOT NULL,
+                         pattern TEXT NOT NULL, prefix TEXT NOT NULL,
+                         folded INTEGER NOT NULL);
+'''
+
+# created after the rows are inserted, which is faster
+INDEXES = '''
+CREATE INDEX labels_label ON labels (label, shortcut_id);
+CREATE INDEX conditions_prefix ON conditions (folded, prefix, shortcut_id);
+'''
+
+
+def get_catalog_path():
+    """
+    Return the path of the catalog database
+    """
+    return os.path.join(XDG_CACHE_HOME, 'shellcut', 'catalog.sqlite')
+
+
+def condition_rows(shortcut_id, shortcut):
+    """
+    Return the rows of the conditions table for a compiled shortcut
+    """
+    from shellcut.index import (template_literal_prefix, regex_literal_prefix,
+                                fold_prefix)
+
+    rows = []
+    for condition in shortcut.match_conditions:
+        prefix = fold_prefix(template_literal_prefix(condition))
+        rows.append((shortcut_id, 'match', condition, prefix[:KEY_LENGTH], 1))
+    for condition in shortcut.regex_conditions:
+        prefix = regex_literal_prefix(condition)
+        rows.append((shortcut_id, 'regex', condition, prefix[:KEY_LENGTH], 0))
+    return rows
+
+
+def write_catalog(configdirs, path=None):
+    """
+    Import the shortcuts of the config directories into the catalog at
+    'path', replacing it
+
+    Values JSON can't hold, such as dates, are stored as strings.
+
+    Returns:
+        pair (number of shortcuts, number of config files)
+    """
+    import json
+    import sqlite3
+    from shellcut import main
+
+    if path is None:
+        path = get_catalog_path()
+
+    sources = [os.path.abspath(filename)
+               for filename in main.find_config_files(configdirs)]
+    raw = main.load_shortcuts(configdirs)
+    shortcuts = main.compile_shortcuts(raw)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    connection = sqlite3.connect(tmp_path)
+    try:
+        with connection:
+            connection.executescript(SCHEMA)
+            connection.executemany(
+                'INSERT INTO meta VALUES (?, ?)',
+                [('version', str(SCHEMA_VERSION)),
+                 ('sources', json.dumps(sources))])
+            connection.executemany(
+                'INSERT INTO shortcuts VALUES (?, ?, ?)',
+                ((shortcut_id, shortcut.get('name'),
+                  json.dumps(data, default=str))
+                 for shortcut_id, (shortcut, data)
+                 in enumerate(zip(shortcuts, raw))))
+            connection.executemany(
+                'INSERT INTO labels VALUES (?, ?)',
+                ((label, shortcut_id)
+                 for shortcut_id, shortcut in enumerate(shortcuts)
+                 for label in shortcut.labels if label is not None))
+            connection.executemany(
+                'INSERT INTO conditions VALUES (?, ?, ?, ?, ?)',
+                (row
+                 for shortcut_id, shortcut in enumerate(shortcuts)
+                 for row in condition_rows(shortcut_id, shortcut)))
+            connection.executescript(INDEXES)
+    finally:
+        connection.close()
+    os.replace(tmp_path, path)
+    return len(shortcuts), len(sources)
+
+
+def open_catalog(configdirs, path=None):
+    """
+    Open the catalog if it is up to date with the config files
+
+    Returns:
+        sqlite3 connection, or None if the catalog is missing, older than
+        any config file, imported from other config files or of another
+        schema version
+    """
+    if path is None:
+        path = get_catalog_path()
+    try:
+        imported_at = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    from shellcut import main
+
+    sources = []
+    for filename in main.find_config_files(configdirs):
+        source = os.path.abspath(filename)
+        if os.stat(source).st_mtime_ns >= imported_at:
+            return None
+        sources.append(source)
+
+    import json
+    import sqlite3
+
+    connection = sqlite3.connect(path)
+    try:
+        meta = dict(connection.execute('SELECT key, value FROM meta'))
+    except sqlite3.DatabaseError:
+        connection.close()
+        return None
+    if (meta.get('version') != str(SCHEMA_VERSION) or
+            json.loads(meta.get('sources', 'null')) != sources):
+        connection.close()
+        return None
+    return connection
+
+
+def load_shortcuts(connection):
+    """
+    Return all raw shortcut dictionaries of the catalog, in config order
+    """
+    import json
+
+    return [json.loads(data) for data, in connection.execute(
+        'SELECT data FROM shortcuts ORDER BY id')]
+
+
+def prefixes(text):
+    return [text[:length]
+            for length in range(min(len(text), KEY_LENGTH) + 1)]
+
+
+def candidates(connection, input_data, label=None):
+    """
+    Return the (id, raw shortcut) pairs of the shortcuts whose conditions
+    input_data starts with the prefix of, in config order
+
+    With a label, only shortcuts carrying it are returned.
+    """
+    import json
+
+    head = input_data[:KEY_LENGTH]
+    exact = prefixes(head)
+
+    # match templates ignore case, their prefixes are folded ASCII
+    ascii_length = len(head)
+    for i, char in enumerate(head):
+        if ord(char) >= 128:
+            ascii_length = i
+            break
+    folded_head = head[:ascii_length].lower()
+    folded = prefixes(folded_head)
+
+    queries = [
+        'SELECT shortcut_id FROM conditions WHERE folded = 0 AND '
+        'prefix IN ({})'.format(', '.join('?' * len(exact))),
+        'SELECT shortcut_id FROM conditions WHERE folded = 1 AND '
+        'prefix IN ({})'.format(', '.join('?' * len(folded))),
+    ]
+    parameters = exact + folded
+    if ascii_length < len(head):
+        # non-ASCII characters may match ASCII ones when case is ignored
+        # (e.g. KELVIN SIGN), keep all longer prefixes going on from here,
+        # which sort between it and it followed by a non-ASCII character
+        queries.append('SELECT shortcut_id FROM conditions WHERE folded = 1 '
+                       'AND prefix > ? AND prefix < ?')
+        parameters += [folded_head, folded_head + '\x80']
+
+    query = ('SELECT id, data FROM shortcuts WHERE id IN ({})'.format(
+        ' UNION '.join(queries)))
+    if label:
+        query += (' AND id IN (SELECT shortcut_id FROM labels '
+                  'WHERE label = ?)')
+        parameters.append(label)
+    query += ' ORDER BY id'
+    return [(shortcut_id, json.loads(data))
+            for shortcut_id, data in connection.execute(query, parameters)]
@@ -0,0 +1,398 @@
+"""
+Compilation of the configs into a standalone dispatcher module
+
+'s --compile' translates the shortcuts of all config files into a Python
+module holding the patterns as regular expressions, the shortcut data and a
+dispatch table of their literal prefixes. The module only imports re, so a
+run using it needs neither yaml nor parse (except for match templates with
+typed fields such as '{:d}', which the module hands to parse).
+
+main uses the module as long as it is newer than all config files and the
+set of config files did not change.
+"""
+
+import os
+import sys
+
+from shellcut.dirs import XDG_CACHE_HOME
+
+
+MODULE_NAME = 'shellcut_dispatch'
+
+# version of the generated module, modules of other versions are not used
+DISPATCHER_VERSION = 1
+
+# literal prefixes are indexed up to this length
+KEY_LENGTH = 32
+
+# condition kinds
+REGEX, TEMPLATE, PARSE = 0, 1, 2
+
+HEADER = '''\
+"""
+Shortcut dispatcher generated by 's --compile' from:
+
+{sources}
+
+Do not edit, run 's --compile' again after changing the configs.
+"""
+
+import re
+
+
+VERSION = {version}
+
+SOURCES = {source_list}
+
+KEY_LENGTH = {key_length}
+
+# condition kinds
+REGEX, TEMPLATE, PARSE = 0, 1, 2
+
+
+def constant(text):
+    return lambda *args, **kwargs: text
+
+
+'''
+
+RUNTIME = '''
+
+NON_ASCII_RE = re.compile('[^\\\\x00-\\\\x7f]')
+
+# compiled patterns by condition id, filled on first use
+_compiled = {}
+
+
+class Shortcut:
+    """
+    Matched shortcut, only holding what main needs
+    """
+
+    __slots__ = ('data', 'settings', 'renderers')
+
+    def __init__(self, name, settings, renderers):
+        self.data = dict(settings, name=name)
+        self.settings = settings
+        self.renderers = renderers
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
+class Match:
+    """
+    Shortcut matched by an input, together with the captured groups
+    """
+
+    __slots__ = ('shortcut', 'args', 'kwargs')
+
+    def __init__(self, shortcut, args, kwargs):
+        self.shortcut = shortcut
+        self.args = args
+        self.kwargs = kwargs
+
+    @property
+    def settings(self):
+        return dict(self.shortcut.settings)
+
+    def render(self):
+        return {executor: render(*self.args, **self.kwargs)
+                for executor, render in self.shortcut.renderers}
+
+
+def compile_condition(condition_id):
+    kind, pattern, flags, _, _ = CONDITIONS[condition_id]
+    if kind == PARSE:
+        import parse
+        compiled = parse.compile(pattern)
+    else:
+        compiled = re.compile(pattern, flags)
+    _compiled[condition_id] = compiled
+    return compiled
+
+
+def match_conditions(input_data, condition_ids):
+    """
+    Return the (args, kwargs) captured by the first matching condition
+    """
+    for condition_id in condition_ids:
+        compiled = _compiled.get(condition_id)
+        if compiled is None:
+            compiled = compile_condition(condition_id)
+        kind, _, _, fixed, named = CONDITIONS[condition_id]
+
+        if kind == PARSE:
+            result = compiled.parse(input_data)
+            if result is not None:
+                return result.fixed, result.named
+            continue
+
+        match = compiled.match(input_data)
+        if match is None:
+            continue
+        if kind == REGEX:
+            return match.groups(), {}
+        return (tuple(match.group(group) for group in fixed),
+                {name: match.group(group) for group, name in named})
+
+
+def candidates(input_data):
+    """
+    Return the sorted ids of shortcuts whose prefixes input_data starts with
+    """
+    found = set(ALWAYS)
+    for length, table in EXACT_PREFIXES:
+        found.update(table.get(input_data[:length], ()))
+
+    # templates match case-insensitively, the prefixes are folded ASCII
+    head = input_data[:KEY_LENGTH]
+    non_ascii = NON_ASCII_RE.search(head)
+    ascii_length = non_ascii.start() if non_ascii else len(head)
+    head = head.lower()
+    for length, table, all_ids in FOLDED_PREFIXES:
+        if length <= ascii_length:
+            found.update(table.get(head[:length], ()))
+        elif non_ascii:
+            found.update(all_ids)
+    return sorted(found)
+
+
+def check_shortcuts(input_data, label=None):
+    """
+    Returns the shortcuts matching input_data, like shellcut.main's
+    check_shortcuts over the compiled configs
+
+    Returns: list of pairs (shortcut, match)
+    """
+    possible = []
+    for shortcut_id in candidates(input_data):
+        name, labels, settings, renderers, condition_ids = \\
+            SHORTCUTS[shortcut_id]
+        if label and label not in labels:
+            continue
+        captured = match_conditions(input_data, condition_ids)
+        if captured is not None:
+            shortcut = Shortcut(name, settings, renderers)
+            possible.append((shortcut, Match(shortcut, *captured)))
+    return possible
+'''
+
+
+def get_dispatcher_path():
+    """
+    Return the path of the generated dispatcher module
+    """
+    return os.path.join(XDG_CACHE_HOME, 'shellcut', MODULE_NAME + '.py')
+
+
+def compile_parse_template(template):
+    """
+    Translate a parse template to a condition of the generated module
+
+    Templates with typed fields or nested field names can't be translated
+    to a plain regex, they stay parse templates. So do all templates if the
+    installed parse version lacks the internals the translation reads.
+    """
+    import parse
+
+    parser = parse.compile(template)
+    try:
+        names = parser._group_to_name_map
+        if parser._type_conversions or any('[' in names[group]
+                                           for group in parser._named_fields):
+            return (PARSE, template, 0, (), ())
+
+        pattern = r'\A{}\Z'.format(parser._expression)
+        fixed = tuple(group + 1 for group in parser._fixed_fields)
+        named = tuple((group, names[group])
+                      for group in parser._named_fields)
+        flags = int(parser._re_flags)
+    except AttributeError:
+        return (PARSE, template, 0, (), ())
+    return (TEMPLATE, pattern, flags, fixed, named)
+
+
+def render_renderer(executor, template):
+    """
+    Return the source of a (executor, render function) pair, following
+    main.compile_template
+    """
+    if '{' in template or '}' in template:
+        return '({!r}, {!r}.format)'.format(executor, template)
+    return '({!r}, constant({!r}))'.format(executor, template)
+
+
+def render_tuple(items):
+    return '({},)'.format(', '.join(items)) if items else '()'
+
+
+def render_table(table):
+    lines = ['{']
+    for key in sorted(table):
+        lines.append('        {!r}: {},'.format(
+            key, render_tuple([str(i) for i in sorted(table[key])])))
+    lines.append('    }')
+    return '\n'.join(lines)
+
+
+def add_prefix(tables, prefix, shortcut_id):
+    prefix = prefix[:KEY_LENGTH]
+    tables.setdefault(len(prefix), {}).setdefault(prefix, set()).add(
+        shortcut_id)
+
+
+def generate_dispatcher(shortcuts, sources):
+    """
+    Return the source of the dispatcher module for compiled shortcuts
+    loaded from the config files 'sources'
+    """
+    from shellcut import main
+    from shellcut.index import (template_literal_prefix, regex_literal_prefix,
+                                fold_prefix)
+
+    conditions = []
+    entries = []
+    exact = {}
+    folded = {}
+    for shortcut in shortcuts:
+        # a shortcut without executors never matches
+        if not shortcut.executors:
+            continue
+        shortcut_id = len(entries)
+
+        # conditions in the order get_match tries them
+        condition_ids = []
+        for condition in reversed(shortcut.regex_conditions):
+            condition_ids.append(len(conditions))
+            conditions.append((REGEX, condition, 0, (), ()))
+            add_prefix(exact, regex_literal_prefix(condition), shortcut_id)
+        for condition in reversed(shortcut.match_conditions):
+            condition_ids.append(len(conditions))
+            conditions.append(compile_parse_template(condition))
+            add_prefix(folded, fold_prefix(template_literal_prefix(condition)),
+                       shortcut_id)
+
+        labels = sorted(map(repr, shortcut.labels))
+        settings = {key: shortcut[key]
+                    for key in main.EXECUTION_SETTINGS if key in shortcut}
+        renderers = [render_renderer(executor, template)
+                     for executor, template in shortcut.executors]
+        entries.append('    ({!r}, frozenset({}), {!r}, {}, {}),'.format(
+            shortcut.get('name'), render_tuple(labels), settings,
+            render_tuple(renderers),
+            render_tuple([str(i) for i in condition_ids])))
+
+    # prefix-less conditions go to ALWAYS
+    always = exact.pop(0, {}).get('', set()) | folded.pop(0, {}).get('', set())
+
+    parts = [HEADER.format(
+        sources='\n'.join('    ' + source for source in sources),
+        version=DISPATCHER_VERSION,
+        source_list=repr(list(sources)),
+        key_length=KEY_LENGTH)]
+
+    parts.append('# kind, pattern, flags, fixed groups, (group, name) of '
+                 'named groups\nCONDITIONS = [\n')
+    parts.extend('    {!r},\n'.format(condition) for condition in conditions)
+    parts.append(']\n\n# name, labels, settings, renderers, condition ids\n'
+                 'SHORTCUTS = [\n')
+    parts.extend(entry + '\n' for entry in entries)
+    parts.append(']\n\n# ids of shortcuts with a condition without a prefix\n'
+                 'ALWAYS = {}\n\n'.format(
+                     render_tuple([str(i) for i in sorted(always)])))
+
+    parts.append('# (prefix length, {prefix: shortcut ids}) of regexes\n'
+                 'EXACT_PREFIXES = [\n')
+    for length in sorted(exact):
+        parts.append('    ({}, {}),\n'.format(
+            length, render_table(exact[length])))
+    parts.append(']\n\n# (prefix length, {lowercase prefix: shortcut ids}, '
+                 'all ids) of templates\nFOLDED_PREFIXES = [\n')
+    for length in sorted(folded):
+        all_ids = set().union(*folded[length].values())
+        parts.append('    ({}, {}, {}),\n'.format(
+            length, render_table(folded[length]),
+            render_tuple([str(i) for i in sorted(all_ids)])))
+    parts.append(']\n')
+    parts.append(RUNTIME)
+    return ''.join(parts)
+
+
+def write_dispatcher(configdirs, path=None):
+    """
+    Compile the shortcuts of the config directories into the dispatcher
+    module at 'path'
+
+    Returns:
+        pair (number of shortcuts, number of config files)
+    """
+    from shellcut import main
+
+    if path is None:
+        path = get_dispatcher_path()
+
+    sources = [os.path.abspath(filename)
+               for filename in main.find_config_files(configdirs)]
+    shortcuts = main.compile_shortcuts(main.load_shortcuts(configdirs))
+    source = generate_dispatcher(shortcuts, sources)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w') as fd:
+        fd.write(source)
+    os.replace(tmp_path, path)
+
+    # write the bytecode now, so even the first run doesn't compile the
+    # source (a stale bytecode file of the same second and size would be
+    # taken as current)
+    import py_compile
+    py_compile.compile(path, doraise=True)
+    return len(shortcuts), len(sources)
+
+
+def load_dispatcher(configdirs, path=None):
+    """
+    Import the dispatcher module if it is up to date with the config files
+
+    Returns:
+        the module, or None if it's missing, older than any config file,
+        compiled from other config files or by another shellcut version
+    """
+    from shellcut import main
+
+    if path is None:
+        path = get_dispatcher_path()
+    try:
+        compiled_at = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    sources = []
+    for filename in main.find_config_files(configdirs):
+        source = os.path.abspath(filename)
+        if os.stat(source).st_mtime_ns >= compiled_at:
+            return None
+        sources.append(source)
+
+    # load it with the source loader, so its bytecode gets cached
+    import importlib.machinery
+
+    loader = importlib.machinery.SourceFileLoader(MODULE_NAME, path)
+    module = type(sys)(MODULE_NAME)
+    module.__file__ = path
+    try:
+        loader.exec_module(module)
+    except Exception:
+        return None
+
+    if (getattr(module, 'VERSION', None) != DISPATCHER_VERSION or
+            module.SOURCES != sources):
+        return None
+    return module
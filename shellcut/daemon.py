@@ -0,0 +1,195 @@
+"""
+Resident daemon keeping the compiled shortcuts in memory
+
+Changed config files are reloaded by a shellcut.watch.ConfigWatcher.
+
+The daemon listens on a Unix socket. Clients send one JSON line per query,
+with the config directories they would load shortcuts from:
+
+    {"input": "BZ1234", "label": null, "configdirs": ["/home/user/..."]}
+
+and receive one JSON line with the matching shortcuts:
+
+    {"matches": [["Open RH bugzilla Bug", {"bash": "xdg-open ..."}, {}]]}
+
+where the last item holds the execution settings of the shortcut. A daemon
+serving other config directories answers with an error instead, and the
+client checks its shortcuts itself.
+
+Like main, this module imports most of what it needs lazily, so the client
+side stays cheap.
+"""
+
+import os
+
+from shellcut.dirs import XDG_CACHE_HOME, XDG_RUNTIME_DIR
+
+
+SOCKET_NAME = 'shellcut.sock'
+
+
+def get_socket_path():
+    """
+    Return the path of the daemon socket
+    """
+    if XDG_RUNTIME_DIR:
+        return os.path.join(XDG_RUNTIME_DIR, SOCKET_NAME)
+    return os.path.join(XDG_CACHE_HOME, 'shellcut', SOCKET_NAME)
+
+
+def normalize_dirs(configdirs):
+    return [os.path.abspath(configdir) for configdir in configdirs]
+
+
+def query(input_data, label=None, socket_path=None, timeout=1.0,
+          configdirs=None):
+    """
+    Ask a running daemon for the shortcuts matching input_data in the config
+    directories (those of main.get_config_dirs by default)
+
+    Returns:
+        list of pairs (shortcut, match) like check_shortcuts, where shortcut
+        only holds the shortcut name, or None if no daemon serving the
+        config directories answered
+    """
+    if socket_path is None:
+        socket_path = get_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+
+    import json
+    import socket
+
+    if configdirs is None:
+        from shellcut.main import get_config_dirs
+        configdirs = get_config_dirs()
+    request = json.dumps({'input': input_data, 'label': label,
+                          'configdirs': normalize_dirs(configdirs)})
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall(request.encode() + b'\n')
+            with sock.makefile('rb') as fd:
+                response = json.loads(fd.readline().decode())
+    except (OSError, ValueError):
+        # no daemon behind the socket, or it misbehaved
+        return None
+
+    if 'matches' not in response:
+        return None
+    return [({'name': name}, RenderedMatch(executor_map, settings))
+            for name, executor_map, settings in response['matches']]
+
+
+def is_listening(socket_path):
+    """
+    Check if a daemon, whichever config directories it serves, accepts
+    connections on the socket
+    """
+    import socket
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+    except OSError:
+        return False
+    return True
+
+
+class RenderedMatch:
+    """
+    Match received from the daemon, which renders the scripts on its side
+    """
+
+    def __init__(self, executor_map, settings):
+        self.executor_map = executor_map
+        self.settings = settings
+
+    def render(self):
+        return self.executor_map
+
+
+def make_server(socket_path, check_shortcuts, configdirs=None):
+    """
+    Create a threaded server answering queries with the given function
+
+    check_shortcuts(input_data, label) has to return the matching shortcuts
+    like main.check_shortcuts. If the config directories the shortcuts come
+    from are given, queries for other directories are refused.
+    """
+    import json
+    import socketserver
+
+    if configdirs is not None:
+        configdirs = normalize_dirs(configdirs)
+
+    class Handler(socketserver.StreamRequestHandler):
+
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    request = json.loads(line.decode())
+                    if (configdirs is not None and
+                            request.get('configdirs') != configdirs):
+                        raise ValueError(
+                            'serving other config directories: {}'.format(
+                                configdirs))
+                    possible = check_shortcuts(request['input'],
+                                               request.get('label'))
+                    response = {'matches': [
+                        [shortcut.get('name'), match.render(),
+                         match.settings]
+                        for shortcut, match in possible
+                    ]}
+                except Exception as ex:
+                    response = {'error': repr(ex)}
+                self.wfile.write(json.dumps(response).encode() + b'\n')
+
+    class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+    # only the current user may talk to the daemon
+    old_umask = os.umask(0o077)
+    try:
+        return Server(socket_path, Handler)
+    finally:
+        os.umask(old_umask)
+
+
+def serve(socket_path, configdirs=None):
+    """
+    Serve queries until interrupted, reloading changed config files
+
+    A stale socket left by a dead daemon is replaced, but a running daemon
+    is not.
+    """
+    if is_listening(socket_path):
+        raise RuntimeError(
+            'A daemon is already listening on {}'.format(socket_path))
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+
+    import signal
+
+    def terminate(signum, frame):
+        raise SystemExit(0)
+
+    # remove the socket when killed as well
+    signal.signal(signal.SIGTERM, terminate)
+
+    from shellcut.watch import ConfigWatcher
+
+    watcher = ConfigWatcher(configdirs)
+    watcher.start()
+    server = make_server(socket_path, watcher.check_shortcuts,
+                         watcher.configdirs)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        watcher.stop()
+        os.remove(socket_path)
@@ -0,0 +1,24 @@
+"""
+XDG base directories
+
+Resolved from the environment as the XDG Base Directory specification
+describes, without importing the xdg package, which is slow to import.
+"""
+
+import os
+
+
+def xdg_dir(variable, default):
+    """
+    Return the directory from the environment variable if it's set to an
+    absolute path, otherwise the default
+    """
+    value = os.environ.get(variable)
+    if value and os.path.isabs(value):
+        return value
+    return default and os.path.expanduser(default)
+
+
+XDG_CONFIG_HOME = xdg_dir('XDG_CONFIG_HOME', '~/.config')
+XDG_CACHE_HOME = xdg_dir('XDG_CACHE_HOME', '~/.cache')
+XDG_RUNTIME_DIR = xdg_dir('XDG_RUNTIME_DIR', None)
@@ -0,0 +1,82 @@
+"""
+Library interface for programs embedding shellcut
+
+A ShortcutEngine loads and compiles the shortcuts once and then answers
+lookups without printing, prompting or exiting, which is left to the caller:
+
+    from shellcut.engine import ShortcutEngine
+
+    engine = ShortcutEngine()
+    matches = engine.match('BZ1234', label='bug')
+    if len(matches) == 1:
+        scripts = engine.render(matches[0])
+
+One engine can be shared by any number of threads. Lookups only read the
+compiled shortcuts and their index, so they take no lock; reload() builds new
+ones and swaps them in, lookups already running finish on the old ones.
+"""
+
+import threading
+
+from shellcut import main
+
+
+class ShortcutEngine:
+    """
+    Matches inputs against shortcuts compiled once
+
+    The shortcuts are the raw shortcut dictionaries given, or those of the
+    config directories (by default main.get_config_dirs()).
+    """
+
+    def __init__(self, shortcuts=None, configdirs=None):
+        self.configdirs = configdirs
+        self.lock = threading.Lock()
+        self.state = None
+        self.reload(shortcuts)
+
+    def reload(self, shortcuts=None):
+        """
+        Compile the given shortcuts, or load the config directories again,
+        and use them for the following lookups
+        """
+        from shellcut.index import ShortcutIndex
+
+        # only reloads wait for each other, lookups keep going
+        with self.lock:
+            if shortcuts is None:
+                configdirs = self.configdirs
+                if configdirs is None:
+                    configdirs = main.get_config_dirs()
+                shortcuts = main.load_shortcuts_cached(configdirs)
+            compiled = main.compile_shortcuts(shortcuts)
+            # compile the patterns now instead of on first use by a lookup,
+            # which also reports invalid patterns here
+            for shortcut in compiled:
+                shortcut.parsers, shortcut.regexes
+            self.state = (compiled, ShortcutIndex(compiled))
+
+    @property
+    def shortcuts(self):
+        """
+        The compiled shortcuts, in config order
+        """
+        return list(self.state[0])
+
+    def match(self, input_data, label=None):
+        """
+        Return the list of Match objects of the shortcuts matching
+        input_data, in config order
+
+        Match.shortcut is the matched Shortcut, with its name, labels and
+        settings.
+        """
+        shortcuts, index = self.state
+        return [match for _, match in main.check_shortcuts(
+            input_data, shortcuts, label, index=index)]
+
+    def render(self, match):
+        """
+        Return the executor map of a match: executor name -> script
+        """
+        return match.render()
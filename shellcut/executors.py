@@ -0,0 +1,261 @@
+"""
+Running the rendered executor scripts
+
+Besides running them as child processes, 's' can replace itself with a
+single executor (--exec), or print the scripts for a shell to evaluate
+(--eval), so that e.g. a 'cd' stays in effect.
+"""
+
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+
+
+# exit status of an executor killed after its timeout, as with timeout(1)
+TIMEOUT_STATUS = 124
+
+
+def combine_statuses(statuses):
+    """
+    Return the first non-zero exit status, or 0 if all executors succeeded
+
+    Executors killed by a signal get the status a shell would report.
+    """
+    for status in statuses:
+        if status:
+            return status if status > 0 else 128 - status
+    return 0
+
+
+def exit_status(code):
+    """
+    Return the exit status the interpreter uses for a SystemExit code
+    """
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def run_python_inprocess(script):
+    """
+    Run a python executor script in this interpreter, in a fresh namespace
+
+    Exceptions are reported like 'python -c' reports them.
+
+    Returns:
+        exit status
+    """
+    import traceback
+
+    namespace = {'__name__': '__main__', '__builtins__': __builtins__}
+    old_argv = sys.argv
+    sys.argv = ['-c']
+    try:
+        exec(compile(script, '<string>', 'exec'), namespace)
+    except SystemExit as ex:
+        return exit_status(ex.code)
+    except KeyboardInterrupt:
+        return 128 + signal.SIGINT
+    except BaseException as ex:
+        # leave out the frame of this function
+        traceback.print_exception(type(ex), ex, ex.__traceback__.tb_next)
+        return 1
+    finally:
+        sys.argv = old_argv
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return 0
+
+
+def run_sequential(executor_map, timeout=None, inprocess=False):
+    """
+    Run the executors one after another, attached to the terminal
+
+    With 'inprocess', python scripts run in this interpreter instead of a
+    new one. The timeout does not apply to them.
+
+    With a timeout, each executor runs in its own process group, so that the
+    timeout or Ctrl-C kills everything it started, like in run_parallel.
+
+    Returns:
+        combined exit status
+    """
+    statuses = []
+    for command, script in executor_map.items():
+        if inprocess and command == 'python':
+            statuses.append(run_python_inprocess(script))
+            continue
+        if timeout is None:
+            statuses.append(
+                subprocess.call([command, '-c', script], timeout=timeout))
+            continue
+
+        process = subprocess.Popen([command, '-c', script],
+                                   start_new_session=True)
+        try:
+            statuses.append(process.wait(timeout=timeout))
+        except subprocess.TimeoutExpired:
+            kill_group(process)
+            statuses.append(TIMEOUT_STATUS)
+        except KeyboardInterrupt:
+            kill_group(process)
+            raise
+    return combine_statuses(statuses)
+
+
+def pipe_lines(stream, out, prefix, lock):
+    """
+    Copy lines from a child's pipe to 'out', each prefixed
+    """
+    with stream:
+        for line in iter(stream.readline, b''):
+            with lock:
+                out.write(prefix + line)
+                out.flush()
+
+
+def kill_group(process):
+    """
+    Kill the process group of a child started in a new session
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def run_parallel(executor_map, timeout=None, out=None, err=None):
+    """
+    Run all executors at once, prefixing every line of their output with
+    the executor name
+
+    The executors don't get the terminal's stdin, as they would compete for
+    it. Each runs in its own process group, so that a timeout or Ctrl-C kills
+    everything it started.
+
+    Returns:
+        combined exit status
+    """
+    if out is None:
+        out = sys.stdout.buffer
+    if err is None:
+        err = sys.stderr.buffer
+
+    lock = threading.Lock()
+    processes = []
+    threads = []
+    for command, script in executor_map.items():
+        process = subprocess.Popen([command, '-c', script],
+                                   stdin=subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   start_new_session=True)
+        prefix = '[{}] '.format(command).encode()
+        for stream, target in ((process.stdout, out), (process.stderr, err)):
+            thread = threading.Thread(target=pipe_lines,
+                                      args=(stream, target, prefix, lock))
+            thread.start()
+            threads.append(thread)
+        processes.append(process)
+
+    # the timeout applies to each executor, but they all started together
+    deadline = None if timeout is None else time.monotonic() + timeout
+    statuses = []
+    try:
+        for process in processes:
+            remaining = (None if deadline is None
+                         else max(0, deadline - time.monotonic()))
+            try:
+                statuses.append(process.wait(timeout=remaining))
+            except subprocess.TimeoutExpired:
+                kill_group(process)
+                statuses.append(TIMEOUT_STATUS)
+    except KeyboardInterrupt:
+        for process in processes:
+            kill_group(process)
+        raise
+
+    for thread in threads:
+        thread.join()
+    return combine_statuses(statuses)
+
+
+def run_executors(executor_map, parallel=False, timeout=None,
+                  inprocess=False):
+    """
+    Run the executors of the chosen shortcut
+
+    'inprocess' only applies to sequential runs, parallel executors always
+    run in their own processes.
+
+    Returns:
+        combined exit status: the first non-zero status of an executor, in
+        executor order
+    """
+    if parallel and len(executor_map) > 1:
+        return run_parallel(executor_map, timeout)
+    return run_sequential(executor_map, timeout, inprocess)
+
+
+def exec_executor(command, script):
+    """
+    Replace this process with the executor, which then gets the terminal and
+    its exit status becomes the one of 's'
+
+    Only returns by raising OSError if the executor can't be started.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.execvp(command, [command, '-c', script])
+
+
+def format_scripts(executor_map):
+    """
+    Return the rendered scripts for printing, each under a comment naming
+    its executor if there are several
+    """
+    if len(executor_map) == 1:
+        script, = executor_map.values()
+        return script if script.endswith('\n') else script + '\n'
+    parts = []
+    for command, script in executor_map.items():
+        parts.append('# {}\n{}'.format(command, script))
+        if not script.endswith('\n'):
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def quote(shell, text):
+    """
+    Quote text as a single word for the shell
+    """
+    if shell == 'fish':
+        # only backslashes and quotes are special in fish's single quotes
+        return "'{}'".format(text.replace('\\', '\\\\').replace("'", "\\'"))
+    import shlex
+    return shlex.quote(text)
+
+
+def eval_script(executor_map, shell):
+    """
+    Return a script for 'shell' to evaluate, running the executors one after
+    another
+
+    The script of the shell's own executor is included as it is, so that it
+    runs in the evaluating shell and changes to its state (such as cd) stay.
+    The other executors run as child processes.
+    """
+    lines = []
+    for command, script in executor_map.items():
+        if command == shell:
+            lines.append(script.rstrip('\n'))
+        else:
+            lines.append('{} -c {}'.format(command, quote(shell, script)))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,295 @@
+"""
+Guarding against slow regular expressions
+
+analyze_regex flags patterns prone to catastrophic backtracking, config files
+are checked with it whenever they are parsed.
+
+A Guard, enabled with the --regex-budget option or the SHELLCUT_REGEX_BUDGET
+environment variable (milliseconds), stops a pattern whose match takes
+longer than the budget. The pattern is then skipped as if it did not match,
+and reported. The guard also counts the calls and the time spent in every
+pattern, which batch mode prints with --regex-costs.
+
+The budget is enforced with SIGALRM, so only in the main thread of POSIX
+systems. Elsewhere the patterns are only timed.
+"""
+
+import sys
+import time
+
+
+# the Guard of this process, None while disabled
+active = None
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def sre_parser():
+    try:
+        from re import _parser
+    except ImportError:
+        # before Python 3.11
+        import sre_parse as _parser
+    return _parser
+
+
+def min_width(parser, subpattern, items):
+    return parser.SubPattern(subpattern.state, list(items)).getwidth()[0]
+
+
+def first_sets(parser, items):
+    """
+    Return what the items can start with: a set of code points, or None if
+    that's not known (a category, any character, ...)
+    """
+    c = parser
+    for op, av in items:
+        if op == c.LITERAL:
+            return {av}
+        if op == c.IN:
+            chars = set()
+            for item_op, item_av in av:
+                if item_op == c.LITERAL:
+                    chars.add(item_av)
+                elif item_op == c.RANGE and item_av[1] - item_av[0] < 256:
+                    chars.update(range(item_av[0], item_av[1] + 1))
+                else:
+                    return None
+            return chars
+        if op == c.SUBPATTERN:
+            return first_sets(parser, av[-1])
+        if op in (c.AT,):
+            continue
+        return None
+    return None
+
+
+def ambiguous_branches(parser, branches, body_first):
+    """
+    Check if the alternatives can match the same text in more than one way:
+    two of them start with the same character, or one is empty (after the
+    re module factored out a common prefix) while another starts like the
+    repeated body, as in '(a|aa)*'
+    """
+    seen = set()
+    empty = 0
+    for branch in branches:
+        if not branch:
+            empty += 1
+            continue
+        chars = first_sets(parser, branch)
+        if chars is None or chars & seen:
+            return True
+        seen |= chars
+    if empty > 1:
+        return True
+    return bool(empty and seen and (body_first is None or
+                                    body_first & seen))
+
+
+def is_unbounded_repeat(parser, item):
+    op, av = item
+    return (op in (parser.MAX_REPEAT, parser.MIN_REPEAT) and
+            av[1] == parser.MAXREPEAT)
+
+
+def walk(parser, subpattern, items, problems, body_first=False):
+    """
+    Collect the problems of the items
+
+    Inside the body of an unbounded repeat, 'body_first' holds the first
+    characters of the body (see first_sets), otherwise it is False.
+    """
+    c = parser
+    repeated = body_first is not False
+    items = list(items)
+    for i, (op, av) in enumerate(items):
+        # whether this item can fill the repeated body on its own, so the
+        # body can be matched in many ways
+        alone = repeated and min_width(
+            parser, subpattern, items[:i] + items[i + 1:]) == 0
+
+        if op in (c.MAX_REPEAT, c.MIN_REPEAT):
+            unbounded = av[1] == c.MAXREPEAT
+            if unbounded and alone:
+                problems.add('nested quantifier')
+            if (repeated and unbounded and i + 1 < len(items) and
+                    is_unbounded_repeat(parser, items[i + 1])):
+                following = first_sets(parser, items[i + 1][1][2])
+                chars = first_sets(parser, av[2])
+                if following is None or chars is None or following & chars:
+                    problems.add('adjacent overlapping quantifiers')
+            if unbounded:
+                walk(parser, subpattern, av[2], problems,
+                     first_sets(parser, av[2]))
+            else:
+                walk(parser, subpattern, av[2], problems, body_first)
+        elif op == c.SUBPATTERN:
+            walk(parser, subpattern, av[-1], problems, body_first)
+        elif op == c.BRANCH:
+            branches = av[1]
+            if repeated and ambiguous_branches(parser, branches, body_first):
+                problems.add('quantified alternation of ambiguous branches')
+            for branch in branches:
+                walk(parser, subpattern, branch, problems, body_first)
+
+
+def analyze_regex(pattern):
+    """
+    Return the reasons why the regex may backtrack catastrophically: nested
+    unbounded quantifiers such as '(a+)+', or an unbounded repeat of
+    alternatives matching alike such as '(a|aa)*'
+
+    Adjacent unbounded repeats which can match the same characters are
+    flagged inside an unbounded repeat, such as '(x+x+)+'. The analysis is a
+    heuristic, e.g. '(\\w+\\s?)*' is flagged while '(\\w+\\s)*' is not.
+    """
+    parser = sre_parser()
+    try:
+        subpattern = parser.parse(pattern)
+    except Exception:
+        # re.compile reports invalid patterns
+        return []
+    problems = set()
+    walk(parser, subpattern, subpattern, problems)
+    return sorted(problems)
+
+
+def check_shortcuts(shortcuts, filename):
+    """
+    Warn about the regexes of raw shortcuts which may backtrack
+    catastrophically
+    """
+    for shortcut in shortcuts:
+        regexes = shortcut.get('regex', [])
+        for regex in regexes if isinstance(regexes, list) else [regexes]:
+            if not isinstance(regex, str):
+                continue
+            for problem in analyze_regex(regex):
+                print('shellcut: regex {!r} of shortcut {!r} in {} may be '
+                      'very slow on some inputs: {}'.format(
+                          regex, shortcut.get('name'), filename, problem),
+                      file=sys.stderr)
+
+
+class PatternCost:
+    """
+    Cumulative cost of a pattern
+    """
+
+    __slots__ = ('calls', 'seconds', 'timeouts')
+
+    def __init__(self, calls=0, seconds=0.0, timeouts=0):
+        self.calls = calls
+        self.seconds = seconds
+        self.timeouts = timeouts
+
+
+class Guard:
+    """
+    Times pattern matches and stops those exceeding the budget (seconds)
+    """
+
+    def __init__(self, budget=None):
+        import signal
+        import threading
+
+        self.budget = budget
+        # (shortcut name, pattern) -> PatternCost
+        self.costs = {}
+        self.signal = signal
+        self.main_thread = threading.main_thread()
+        self.current_thread = threading.current_thread
+        self.enforced = budget is not None and hasattr(signal, 'setitimer')
+        if self.enforced:
+            self.old_handler = signal.signal(signal.SIGALRM, self.alarm)
+
+    def alarm(self, signum, frame):
+        raise BudgetExceeded()
+
+    def call(self, shortcut, pattern, function, input_data):
+        """
+        Return function(input_data), or None if it exceeded the budget
+        """
+        key = (shortcut.get('name'), pattern)
+        cost = self.costs.get(key)
+        if cost is None:
+            cost = self.costs[key] = PatternCost()
+
+        enforce = (self.enforced and
+                   self.current_thread() is self.main_thread)
+        started = time.perf_counter()
+        try:
+            if enforce:
+                self.signal.setitimer(self.signal.ITIMER_REAL, self.budget)
+            try:
+                result = function(input_data)
+            finally:
+                if enforce:
+                    self.signal.setitimer(self.signal.ITIMER_REAL, 0)
+        except BudgetExceeded:
+            result = None
+            cost.timeouts += 1
+            if cost.timeouts == 1:
+                print('shellcut: skipped pattern {!r} of shortcut {!r}, '
+                      'matching {!r} took over {:g} ms'.format(
+                          pattern, key[0], input_data, self.budget * 1000),
+                      file=sys.stderr)
+        cost.calls += 1
+        cost.seconds += time.perf_counter() - started
+        return result
+
+    def take_costs(self):
+        """
+        Return the counters as a list and reset them
+        """
+        costs = [(name, pattern, cost.calls, cost.seconds, cost.timeouts)
+                 for (name, pattern), cost in self.costs.items()]
+        self.costs = {}
+        return costs
+
+    def add_costs(self, costs):
+        """
+        Add counters returned by take_costs, e.g. in another process
+        """
+        for name, pattern, calls, seconds, timeouts in costs:
+            cost = self.costs.get((name, pattern))
+            if cost is None:
+                cost = self.costs[(name, pattern)] = PatternCost()
+            cost.calls += calls
+            cost.seconds += seconds
+            cost.timeouts += timeouts
+
+    def report(self):
+        """
+        Return the counters of all patterns, the slowest first
+        """
+        report = [{'shortcut': name, 'pattern': pattern, 'calls': cost.calls,
+                   'seconds': cost.seconds, 'timeouts': cost.timeouts}
+                  for (name, pattern), cost in self.costs.items()]
+        report.sort(key=lambda entry: entry['seconds'], reverse=True)
+        return report
+
+    def close(self):
+        if self.enforced:
+            self.signal.signal(self.signal.SIGALRM, self.old_handler)
+
+
+def enable(budget=None):
+    """
+    Start timing the patterns, stopping those running longer than 'budget'
+    seconds if given
+    """
+    global active
+    disable()
+    active = Guard(budget)
+    return active
+
+
+def disable():
+    global active
+    if active is not None:
+        active.close()
+        active = None
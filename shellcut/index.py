@@ -0,0 +1,523 @@
+"""
+Dispatch index selecting the shortcuts an input can possibly match
+
+The index is a prefilter: the candidates it returns still have to be checked
+with get_match, but shortcuts which are not candidates can't match.
+"""
+
+import re
+
+
+# the same field syntax the parse module recognizes in format templates
+TEMPLATE_FIELD_RE = re.compile(
+    r'({{|}}|{[\w-]*(?:\.[-\w]+|\[[^]]+])*(?::[^:}]+)?})')
+
+REGEX_META = set('.^$*+?{}[]()|\\')
+
+REPEAT_RE = re.compile(r'\{(?:\d*,\d*|\d+)\}')
+
+# global inline flags (e.g. '(?i)') change how literals match
+INLINE_FLAGS_RE = re.compile(r'\(\?[aiLmsux]+\)')
+
+# quantifiers making the preceding regex atom optional
+OPTIONAL_QUANTIFIERS = set('*?{')
+
+
+def template_literal_prefix(template):
+    """
+    Return the literal text a parse template starts with
+    """
+    prefix = []
+    for part in TEMPLATE_FIELD_RE.split(template):
+        if part == '{{':
+            prefix.append('{')
+        elif part == '}}':
+            prefix.append('}')
+        elif TEMPLATE_FIELD_RE.fullmatch(part):
+            break
+        else:
+            prefix.append(part)
+    return ''.join(prefix)
+
+
+def template_literals(template):
+    """
+    Return the literal texts between the fields of a parse template
+    """
+    literals = []
+    run = []
+    for part in TEMPLATE_FIELD_RE.split(template):
+        if part == '{{':
+            run.append('{')
+        elif part == '}}':
+            run.append('}')
+        elif TEMPLATE_FIELD_RE.fullmatch(part):
+            literals.append(''.join(run))
+            run = []
+        else:
+            run.append(part)
+    literals.append(''.join(run))
+    return [literal for literal in literals if literal]
+
+
+def skip_set(pattern, i):
+    """
+    Return the index following the character set starting at pattern[i]
+    """
+    i += 1
+    if i < len(pattern) and pattern[i] == '^':
+        i += 1
+    if i < len(pattern) and pattern[i] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        if pattern[i] == '\\':
+            i += 1
+        i += 1
+    return i + 1
+
+
+def has_top_level_alternation(pattern):
+    """
+    Check if the regex contains a '|' outside of any group
+    """
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 1
+        elif char == '[':
+            i = skip_set(pattern, i)
+            continue
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def regex_literal_prefix(pattern):
+    """
+    Return the literal text every string matched by the regex (anchored at
+    the start, as with re.match) has to start with.
+
+    The prefix is conservative: it may be shorter than the real one, but it
+    never contains text a matching string could lack.
+    """
+    if has_top_level_alternation(pattern):
+        return ''
+
+    prefix = []
+    i = 1 if pattern.startswith('^') else 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                # character classes, anchors, backreferences, ...
+                break
+            char = pattern[i + 1]
+            i += 2
+        elif char in REGEX_META:
+            break
+        else:
+            i += 1
+
+        following = pattern[i:i + 1]
+        if following and following in OPTIONAL_QUANTIFIERS:
+            break
+        prefix.append(char)
+        if following == '+':
+            break
+    return ''.join(prefix)
+
+
+def regex_literals(pattern):
+    """
+    Return literal texts every string matched by the regex contains
+
+    Only literals outside of groups are considered, so the result is
+    conservative like the one of regex_literal_prefix.
+    """
+    if has_top_level_alternation(pattern) or INLINE_FLAGS_RE.match(pattern):
+        return []
+
+    literals = []
+    run = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == '\\':
+            if i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+                literal = pattern[i + 1]
+            i += 2
+        elif char == '[':
+            i = skip_set(pattern, i)
+        elif char == '{':
+            repeat = REPEAT_RE.match(pattern, i)
+            i = repeat.end() if repeat else i + 1
+        elif char == '(':
+            depth += 1
+            i += 1
+        elif char == ')':
+            depth -= 1
+            i += 1
+        elif char in REGEX_META:
+            i += 1
+        else:
+            literal = char
+            i += 1
+
+        following = pattern[i:i + 1]
+        if (literal is not None and depth == 0 and
+                not (following and following in OPTIONAL_QUANTIFIERS)):
+            run.append(literal)
+            if following != '+':
+                continue
+        literals.append(''.join(run))
+        run = []
+
+    literals.append(''.join(run))
+    return [literal for literal in literals if literal]
+
+
+def fold_literal(literal):
+    """
+    Return the longest ASCII part of the literal, lowercased
+
+    Used for case-insensitive patterns, as the case folding of non-ASCII
+    characters in the re module doesn't follow str.lower.
+    """
+    return max(re.split(r'[^\x00-\x7f]', literal), key=len).lower()
+
+
+def fold_prefix(prefix):
+    """
+    Return the case-folded prefix used for case-insensitive patterns
+
+    The prefix is cut at the first non-ASCII character, see fold_literal.
+    """
+    folded = []
+    for char in prefix:
+        if ord(char) >= 128:
+            break
+        folded.append(char.lower())
+    return ''.join(folded)
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ids')
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+
+class PrefixTrie:
+    """
+    Trie of literal prefixes, each associated with a condition id
+    """
+
+    def __init__(self, fold=False):
+        self.root = _TrieNode()
+        self.fold = fold
+
+    def add(self, prefix, condition_id):
+        node = self.root
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+        node.ids.append(condition_id)
+
+    def collect(self, node, found):
+        """
+        Add ids of all prefixes in the subtree of 'node' to 'found'
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            found.update(node.ids)
+            stack.extend(node.children.values())
+
+    def find(self, text, found):
+        """
+        Add ids of all prefixes 'text' starts with to 'found'
+        """
+        node = self.root
+        for char in text:
+            found.update(node.ids)
+            if self.fold:
+                if ord(char) >= 128:
+                    # non-ASCII characters may match ASCII ones when case
+                    # is ignored (e.g. KELVIN SIGN), keep all candidates
+                    self.collect(node, found)
+                    return
+                char = char.lower()
+            node = node.children.get(char)
+            if node is None:
+                return
+        found.update(node.ids)
+
+
+class LiteralAutomaton:
+    """
+    Aho-Corasick automaton finding all literals contained in a text in one
+    pass over it
+    """
+
+    def __init__(self, fold=False):
+        self.fold = fold
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        self.ids = set()
+        self.built = True
+
+    def add(self, literal, literal_id):
+        state = 0
+        for char in literal:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                self.goto[state][char] = next_state
+            state = next_state
+        self.out[state].append(literal_id)
+        self.ids.add(literal_id)
+        self.built = False
+
+    def build(self):
+        """
+        Compute the failure links, breadth first
+        """
+        queue = list(self.goto[0].values())
+        for state in queue:
+            self.fail[state] = 0
+        for state in queue:
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.out[next_state] = (self.out[next_state] +
+                                        self.out[self.fail[next_state]])
+        self.built = True
+
+    def find(self, text, found):
+        """
+        Add ids of all literals contained in 'text' to 'found'
+        """
+        if not self.built:
+            self.build()
+
+        if self.fold:
+            if not is_ascii(text):
+                # see PrefixTrie.find
+                found.update(self.ids)
+                return
+            text = text.lower()
+
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found.update(out[state])
+
+
+def is_ascii(text):
+    try:
+        text.encode('ascii')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+class ShortcutIndex:
+    """
+    Index of compiled shortcuts by the literals of their conditions
+
+    A condition is a candidate for an input if the input starts with the
+    literal prefix of the condition and contains its longest other literal.
+    Match conditions are indexed case-insensitively, as the parse module
+    matches them. A shortcut is a candidate if any of its conditions is.
+
+    Lookups only add the index of a label on its first use, which threads
+    racing on it build twice at worst, so threads can share the index.
+    """
+
+    def __init__(self, shortcuts):
+        self.size = len(shortcuts)
+        self.owners = []
+        self.exact_prefixes = PrefixTrie()
+        self.folded_prefixes = PrefixTrie(fold=True)
+        self.exact_literals = LiteralAutomaton()
+        self.folded_literals = LiteralAutomaton(fold=True)
+        # conditions without a prefix or a literal to filter on
+        self.any_prefix = set()
+        self.any_literal = set()
+        # shortcuts with a condition that has neither
+        self.always = set()
+        # label -> ids of shortcuts carrying it
+        self.labels = {}
+        # label -> index of the shortcuts carrying it, built on first use
+        self.label_indexes = {}
+        # shortcut id -> range of its condition ids, and condition id ->
+        # (prefix, literal, fold), to build the label indexes from
+        self.condition_ranges = []
+        self.conditions = []
+
+        for shortcut_id, shortcut in enumerate(shortcuts):
+            self.add(shortcut_id, shortcut)
+        # built now rather than by the first lookup, so that lookups from
+        # several threads only read the index
+        self.exact_literals.build()
+        self.folded_literals.build()
+
+    def add(self, shortcut_id, shortcut):
+        for label in shortcut.labels:
+            if label is not None:
+                self.labels.setdefault(label, set()).add(shortcut_id)
+        first_condition = len(self.owners)
+
+        for condition in shortcut.match_conditions:
+            prefix = fold_prefix(template_literal_prefix(condition))
+            literals = [fold_literal(literal)
+                        for literal in template_literals(condition)]
+            self.add_condition(shortcut_id, prefix, literals,
+                               self.folded_prefixes, self.folded_literals)
+
+        for condition in shortcut.regex_conditions:
+            self.add_condition(shortcut_id, regex_literal_prefix(condition),
+                               regex_literals(condition),
+                               self.exact_prefixes, self.exact_literals)
+        self.condition_ranges.append(range(first_condition, len(self.owners)))
+
+    def add_condition(self, shortcut_id, prefix, literals, trie, automaton):
+        condition_id = len(self.owners)
+        self.owners.append(shortcut_id)
+
+        if prefix:
+            trie.add(prefix, condition_id)
+        else:
+            self.any_prefix.add(condition_id)
+
+        # the prefix is already checked, filter on the longest other literal
+        literals = [literal for literal in literals
+                    if literal and literal != prefix]
+        literal = max(literals, key=len) if literals else None
+        if literal:
+            automaton.add(literal, condition_id)
+        else:
+            self.any_literal.add(condition_id)
+        self.conditions.append((prefix, literal, trie.fold))
+
+        if not prefix and not literals:
+            self.always.add(shortcut_id)
+
+    def label_index(self, label):
+        """
+        Return the index of the shortcuts carrying 'label', whose candidates
+        are ids of this index
+
+        A labelled lookup only walks the tries and automata of its label, so
+        that its time depends on the number of shortcuts with the label
+        rather than on the size of the config.
+        """
+        labelled = self.label_indexes.get(label)
+        if labelled is not None:
+            return labelled
+
+        labelled = ShortcutIndex(())
+        shortcut_ids = self.labels.get(label, ())
+        labelled.size = len(shortcut_ids)
+        for shortcut_id in shortcut_ids:
+            for condition_id in self.condition_ranges[shortcut_id]:
+                prefix, literal, fold = self.conditions[condition_id]
+                if fold:
+                    trie = labelled.folded_prefixes
+                    automaton = labelled.folded_literals
+                else:
+                    trie = labelled.exact_prefixes
+                    automaton = labelled.exact_literals
+                labelled.add_condition(shortcut_id, prefix,
+                                       [literal] if literal else [],
+                                       trie, automaton)
+        labelled.exact_literals.build()
+        labelled.folded_literals.build()
+        if shortcut_ids:
+            # unknown labels aren't kept, a daemon may be asked for any
+            labelled = self.label_indexes.setdefault(label, labelled)
+        return labelled
+
+    def first_characters(self):
+        """
+        Return the set of characters an input has to start with to have any
+        candidates, or None if any input can have candidates
+
+        Both cases of the first characters of case-insensitive prefixes are
+        included. Inputs starting with a non-ASCII character may have
+        candidates as well, see PrefixTrie.find.
+        """
+        if self.any_prefix:
+            return None
+        chars = set(self.exact_prefixes.root.children)
+        for char in self.folded_prefixes.root.children:
+            chars.update((char, char.upper()))
+        return chars
+
+    def candidates(self, input_data, label=None, stats=None):
+        """
+        Return the sorted ids of shortcuts which can match input_data
+
+        If a label is given, only shortcuts carrying it are returned. If a
+        'stats' dictionary is given, it is filled with the number of
+        shortcuts pruned by the label, the prefix and the literal filter.
+        """
+        if label:
+            labelled = self.label_index(label)
+            found = labelled.candidates(input_data, stats=stats)
+            if stats is not None:
+                stats['shortcuts'] = self.size
+                stats['pruned_by_label'] = self.size - labelled.size
+            return found
+
+        prefixed = set()
+        self.exact_prefixes.find(input_data, prefixed)
+        self.folded_prefixes.find(input_data, prefixed)
+
+        contained = set()
+        self.exact_literals.find(input_data, contained)
+        self.folded_literals.find(input_data, contained)
+
+        owners = self.owners
+        any_prefix = self.any_prefix
+        any_literal = self.any_literal
+        found = {owners[condition_id] for condition_id in prefixed
+                 if condition_id in any_literal or condition_id in contained}
+        found.update(owners[condition_id] for condition_id in contained
+                     if condition_id in any_prefix)
+        found.update(self.always)
+
+        if stats is not None:
+            with_prefix = {owners[condition_id]
+                           for condition_id in prefixed | any_prefix}
+            stats['shortcuts'] = self.size
+            stats['pruned_by_label'] = 0
+            stats['pruned_by_prefix'] = self.size - len(with_prefix)
+            stats['pruned_by_literal'] = len(with_prefix) - len(found)
+            stats['candidates'] = len(found)
+        return sorted(found)
@@ -1,23 +1,23 @@
 #!/usr/bin/python3
 
-import re
+# Only cheap modules are imported here, the rest is imported by the functions
+# which need it. 's' is run interactively and module imports make up most of
+# its startup time.
 import os
 import sys
-import glob
-import argparse
-import subprocess
 
-import yaml
-import parse
-
-try:
-    from xdg import XDG_CONFIG_HOME
-except ImportError:
-    XDG_CONFIG_HOME = '~/.config'
+from shellcut import cache, guard, trace
+from shellcut.dirs import XDG_CONFIG_HOME
 
 
 AVAILABLE_EXECUTORS = ['bash', 'fish', 'python']
 
+# shortcut keys controlling how the executors are run
+EXECUTION_SETTINGS = ['parallel', 'timeout', 'inprocess']
+
+# config files are parsed in worker processes when this many have to be parsed
+PARALLEL_LOAD_THRESHOLD = 32
+
 
 def get_config_dirs():
     """
@@ -40,34 +40,383 @@ def get_config_dirs():
     return config_dirs
 
 
+def find_config_files(configdirs):
+    """
+    Return the list of yaml config files in the config directories, in the
+    order of the directories and sorted by name within each
+    """
+    import glob
+
+    filenames = []
+    for configdir in configdirs:
+        filenames.extend(sorted(glob.glob(os.path.join(configdir, '*.yaml'))))
+    return filenames
+
+
+def load_config_file(filename):
+    """
+    Parse a single yaml config file and return its shortcuts
+    """
+    # yaml is imported here so that runs served from the cache never load it
+    import yaml
+
+    # the libyaml based loader is much faster, if PyYAML was built with it
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(filename) as fd:
+        y = yaml.load(fd, Loader=loader)
+    guard.check_shortcuts(y['shortcuts'], filename)
+    return y['shortcuts']
+
+
+def load_config_files(filenames):
+    """
+    Parse the config files, in worker processes if there are at least
+    PARALLEL_LOAD_THRESHOLD of them
+
+    Returns:
+        list of the shortcut lists of the files, in the order of filenames
+    """
+    tracer = trace.tracer
+    jobs = min(os.cpu_count() or 1, len(filenames) // 8)
+    if len(filenames) < PARALLEL_LOAD_THRESHOLD or jobs < 2:
+        loaded = []
+        for filename in filenames:
+            if tracer is not None:
+                started = tracer.now()
+            loaded.append(load_config_file(filename))
+            if tracer is not None:
+                tracer.record('load_file', started, file=filename,
+                              cached=False)
+        return loaded
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    if tracer is not None:
+        started = tracer.now()
+    with ProcessPoolExecutor(jobs) as executor:
+        loaded = list(executor.map(load_config_file, filenames,
+                                   chunksize=-(-len(filenames) // (4 * jobs))))
+    if tracer is not None:
+        tracer.record('load_files', started, files=len(filenames), jobs=jobs)
+    return loaded
+
+
 def load_shortcuts(configdirs):
     """
     Load shortcuts from the config directory
     """
     shortcuts = []
-    for configdir in configdirs:
-        for filename in glob.glob(os.path.join(configdir, '*.yaml')):
-            y = yaml.load(open(filename))
-            shortcuts.extend(y['shortcuts'])
+    for file_shortcuts in load_config_files(find_config_files(configdirs)):
+        shortcuts.extend(file_shortcuts)
     return shortcuts
 
 
-def check_shortcuts(input_data, shortcuts, label=None):
+def load_shortcuts_cached(configdirs, cache_path=None):
+    """
+    Load shortcuts like load_shortcuts, but reuse the parsed content of config
+    files which did not change since they were last cached.
+
+    A file is considered unchanged if its path, mtime and size are the same.
+    """
+    if cache_path is None:
+        cache_path = cache.get_cache_path()
+
+    tracer = trace.tracer
+    entries = cache.read_cache(cache_path)
+    keys = []
+    stale = []
+    for filename in find_config_files(configdirs):
+        path = os.path.abspath(filename)
+        key = cache.file_key(path)
+        entry = entries.get(path)
+        keys.append((path, key))
+        if entry is None or entry[0] != key:
+            stale.append(path)
+        elif tracer is not None:
+            tracer.record('load_file', tracer.now(), file=path, cached=True)
+
+    loaded = dict(zip(stale, load_config_files(stale)))
+    fresh = {}
+    shortcuts = []
+    for path, key in keys:
+        if path in loaded:
+            entry = (key, loaded[path])
+        else:
+            entry = entries[path]
+        fresh[path] = entry
+        shortcuts.extend(entry[1])
+
+    if stale or len(fresh) != len(entries):
+        cache.write_cache(cache_path, fresh)
+    return shortcuts
+
+
+class ShortcutTable:
+    """
+    Values shared by the shortcuts compiled together
+
+    Equal strings, label sets, condition and executor tuples are stored once,
+    as are the render function of every template and the compiled pattern of
+    every condition, which are created on first use. Large configs repeat
+    many of them.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.renderers = {}
+        self.parsers = {}
+        self.regexes = {}
+
+    def share(self, value):
+        """
+        Return the stored value equal to 'value', storing it if there is none
+        """
+        return self.values.setdefault(value, value)
+
+    def share_all(self, values):
+        """
+        Return a shared tuple of the shared values
+        """
+        return self.share(tuple(self.share(value) for value in values))
+
+    def renderer(self, template):
+        renderer = self.renderers.get(template)
+        if renderer is None:
+            renderer = self.renderers[template] = compile_template(template)
+        return renderer
+
+    def parser(self, condition):
+        parser = self.parsers.get(condition)
+        if parser is None:
+            import parse
+            parser = self.parsers[condition] = parse.compile(condition)
+        return parser
+
+    def regex(self, condition):
+        regex = self.regexes.get(condition)
+        if regex is None:
+            import re
+            regex = self.regexes[condition] = re.compile(condition)
+        return regex
+
+
+# default of Shortcut.get telling a missing key from a None value
+MISSING = object()
+
+# the keys a Shortcut keeps in its own attributes
+SHORTCUT_KEYS = frozenset(['name', 'label', 'match', 'regex'] +
+                          AVAILABLE_EXECUTORS)
+
+
+class Shortcut:
+    """
+    Shortcut loaded from a config file, with its patterns compiled
+
+    Item access works like on the original config dictionary, so a Shortcut
+    can be used wherever the raw shortcut dictionary is expected. The
+    dictionary itself isn't kept: its values are stored in slots, shared
+    through a ShortcutTable with the other shortcuts compiled together.
+
+    The patterns are compiled on first use, so that shortcuts a ShortcutIndex
+    rules out are never compiled.
+    """
+
+    __slots__ = ('name', 'labels', 'label_order', 'match_conditions',
+                 'regex_conditions', 'executors', 'extra', 'table',
+                 '_parsers', '_regexes')
+
+    def __init__(self, data, table=None):
+        if table is None:
+            table = ShortcutTable()
+        self.table = table
+        self.name = table.share(data.get('name'))
+        # the labels in config order, and as a set for membership checks;
+        # a label list may mix YAML types, so it is never sorted
+        self.label_order = table.share_all(listify(data.get('label')))
+        self.labels = table.share(frozenset(self.label_order))
+        self.match_conditions = table.share_all(
+            listify(data.get('match', [])))
+        self.regex_conditions = table.share_all(
+            listify(data.get('regex', [])))
+        self._parsers = None
+        self._regexes = None
+        self.executors = table.share(tuple(
+            table.share_all((executor, data[executor]))
+            for executor in AVAILABLE_EXECUTORS
+            if executor in data))
+        # other keys, such as the execution settings
+        self.extra = {table.share(key): value
+                      for key, value in data.items()
+                      if key not in SHORTCUT_KEYS} or None
+
+    @property
+    def parsers(self):
+        if self._parsers is None:
+            self._parsers = tuple(self.table.parser(condition)
+                                  for condition in self.match_conditions)
+        return self._parsers
+
+    @property
+    def regexes(self):
+        if self._regexes is None:
+            self._regexes = tuple(self.table.regex(condition)
+                                  for condition in self.regex_conditions)
+        return self._regexes
+
+    @property
+    def renderers(self):
+        return [(executor, self.table.renderer(template))
+                for executor, template in self.executors]
+
+    @property
+    def data(self):
+        """
+        The config dictionary, rebuilt from the slots
+
+        Single labels and conditions are strings, several are lists.
+        """
+        data = {}
+        if self.name is not None:
+            data['name'] = self.name
+        labels = [label for label in self.label_order if label is not None]
+        for key, values in (('label', labels),
+                            ('match', self.match_conditions),
+                            ('regex', self.regex_conditions)):
+            if values:
+                data[key] = values[0] if len(values) == 1 else list(values)
+        data.update(self.executors)
+        data.update(self.extra or {})
+        return data
+
+    def get(self, key, default=None):
+        if key == 'name':
+            return default if self.name is None else self.name
+        if key not in SHORTCUT_KEYS:
+            return default if self.extra is None else self.extra.get(
+                key, default)
+        return self.data.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, MISSING) is not MISSING
+
+    def __repr__(self):
+        return 'Shortcut({!r})'.format(self.name)
+
+
+class Match:
+    """
+    Shortcut matched by an input, together with the captured groups
+
+    The executor templates are only rendered when render() is called, which
+    main does only for the shortcut the user picked.
+    """
+
+    __slots__ = ('shortcut', 'args', 'kwargs')
+
+    def __init__(self, shortcut, args=(), kwargs=None):
+        self.shortcut = shortcut
+        self.args = args
+        self.kwargs = kwargs or {}
+
+    @property
+    def settings(self):
+        """
+        Execution settings of the matched shortcut
+        """
+        return {key: self.shortcut[key]
+                for key in EXECUTION_SETTINGS if key in self.shortcut}
+
+    def render(self):
+        """
+        Return the executor map: executor name -> substituted script
+        """
+        return {executor: render(*self.args, **self.kwargs)
+                for executor, render in self.shortcut.renderers}
+
+    def __eq__(self, other):
+        return (isinstance(other, Match) and
+                self.shortcut is other.shortcut and
+                self.args == other.args and
+                self.kwargs == other.kwargs)
+
+    def __repr__(self):
+        return 'Match({!r}, {!r}, {!r})'.format(
+            self.shortcut, self.args, self.kwargs)
+
+
+def compile_template(template):
+    """
+    Return a function substituting captured groups into an executor template
+
+    Templates without any braces are returned as they are, without going
+    through str.format.
+    """
+    if '{' in template or '}' in template:
+        return template.format
+    return lambda *args, **kwargs: template
+
+
+def compile_shortcuts(shortcuts):
+    """
+    Compile the patterns of raw shortcut dictionaries, sharing equal values
+    between them
+
+    Returns:
+        list of Shortcut objects, in the same order
+    """
+    table = ShortcutTable()
+    compiled = [Shortcut(shortcut, table) for shortcut in shortcuts]
+    # the shared values are referenced by the shortcuts, the lookup table
+    # is only needed while compiling
+    table.values.clear()
+    return compiled
+
+
+def check_shortcuts(input_data, shortcuts, label=None, index=None,
+                    stats=None):
     """
     Returns the shortcuts matching input_data
 
-    Returns: list of pairs (shortcut, script)
+    If a ShortcutIndex built from 'shortcuts' is given, only the shortcuts it
+    selects as candidates are checked, and the 'stats' dictionary (if given)
+    receives its pruning counters.
+
+    While tracing, the index counters and the cost of every checked shortcut
+    are recorded.
+
+    Returns: list of pairs (shortcut, match)
         shortcut: matched shortcut
-        script: corresponding pattern script string
+        match: Match rendering the corresponding pattern scripts
     """
+    tracer = trace.tracer
     possible = []
 
-    for shortcut in shortcuts:
-        executor_map = get_match(input_data, shortcut, label)
-        # check if the pattern supports the given shell and default to 'shell'
+    if index is not None:
+        if tracer is not None:
+            started = tracer.now()
+            if stats is None:
+                stats = {}
+        shortcuts = [shortcuts[i]
+                     for i in index.candidates(input_data, label, stats)]
+        if tracer is not None:
+            tracer.record('index', started, **stats)
 
-        if executor_map:
-            possible.append((shortcut, executor_map))
+    for shortcut in shortcuts:
+        if tracer is None:
+            match = get_match(input_data, shortcut, label)
+        else:
+            started = tracer.now()
+            match = get_match(input_data, shortcut, label)
+            tracer.record('get_match', started, shortcut=shortcut.get('name'),
+                          matched=match is not None)
+        if match:
+            possible.append((shortcut, match))
 
     return possible
 
@@ -88,43 +437,56 @@ def label_matches(cli_label, pattern_label):
 
 def get_match(input_data, shortcut, label=None):
     """
-    Check if 'input_data' matches the 'shortcut' pattern and if yes, return the
-    substituted shell command.
+    Check if 'input_data' matches the 'shortcut' pattern and if yes, return a
+    Match which renders the substituted shell commands.
+
+    The shortcut is either a compiled Shortcut or a raw shortcut dictionary,
+    which gets compiled on every call.
     """
 
+    if not isinstance(shortcut, Shortcut):
+        shortcut = Shortcut(shortcut)
+
     # if the label does not match, return None
-    if not label_matches(label, shortcut.get('label')):
+    if label and label not in shortcut.labels:
         return
 
-    executor_map = {}
+    # a shortcut without executors has nothing to run
+    if not shortcut.executors:
+        return
 
-    conditions_match = listify(shortcut.get('match', []))
-    conditions_regex = listify(shortcut.get('regex', []))
+    if guard.active is not None:
+        return guarded_match(input_data, shortcut, guard.active)
 
-    # fetch executors from match-type patterns
-    for condition in conditions_match:
-        result = parse.parse(condition, input_data)
-        if result is None:
-            continue
-        executor_map.update({
-            executor: shortcut[executor].format(
-                *result.fixed, **result.named)
-            for executor in AVAILABLE_EXECUTORS
-            if executor in shortcut
-        })
-
-    # fetch executors from regex-type patterns
-    for condition in conditions_regex:
-        match = re.match(condition, input_data)
-        if not match:
-            continue
-        executor_map.update({
-            executor: shortcut[executor].format(*match.groups())
-            for executor in AVAILABLE_EXECUTORS
-            if executor in shortcut
-        })
+    # the captures of the last matching condition are used for rendering,
+    # regex-type patterns take precedence over match-type ones
+    for regex in reversed(shortcut.regexes):
+        match = regex.match(input_data)
+        if match:
+            return Match(shortcut, match.groups())
 
-    return executor_map or None
+    for parser in reversed(shortcut.parsers):
+        result = parser.parse(input_data)
+        if result is not None:
+            return Match(shortcut, result.fixed, result.named)
+
+
+def guarded_match(input_data, shortcut, checker):
+    """
+    get_match for a compiled shortcut, with every pattern timed and stopped
+    by the guard
+    """
+    for condition, regex in zip(reversed(shortcut.regex_conditions),
+                                reversed(shortcut.regexes)):
+        match = checker.call(shortcut, condition, regex.match, input_data)
+        if match:
+            return Match(shortcut, match.groups())
+
+    for condition, parser in zip(reversed(shortcut.match_conditions),
+                                 reversed(shortcut.parsers)):
+        result = checker.call(shortcut, condition, parser.parse, input_data)
+        if result is not None:
+            return Match(shortcut, result.fixed, result.named)
 
 
 def get_input(text):
@@ -150,15 +512,89 @@ def choose_match(possible_matches):
         raise ValueError('Invalid choice')
 
 
+def env_flag(variable):
+    """
+    Check if the environment variable is set to a true value: anything but
+    empty, '0', 'false' or 'no'
+    """
+    value = os.environ.get(variable, '').strip().lower()
+    return value not in ('', '0', 'false', 'no', 'off')
+
+
 def parse_arguments():
     """
     Parse CLI arguments
     """
+    import argparse
+
     parser = argparse.ArgumentParser()
-    parser.add_argument('input')
+    parser.add_argument('input', nargs='?')
     parser.add_argument('label', nargs='?')
-
-    return parser.parse_args()
+    parser.add_argument('--compile', action='store_true',
+                        help='compile the configs into a dispatcher module '
+                             'used by later runs')
+    parser.add_argument('--import-yaml', action='store_true',
+                        help='import the configs into an SQLite catalog '
+                             'used by later runs')
+    parser.add_argument('--daemon', action='store_true',
+                        help='keep the shortcuts in memory and answer '
+                             'queries of other s invocations')
+    parser.add_argument('--batch', action='store_true',
+                        help='match every line of the input file (or '
+                             'stdin) and print the results as JSON lines')
+    parser.add_argument('--scan', dest='scan_file', metavar='FILE',
+                        help='print every token of the file matching a '
+                             'shortcut as JSON lines')
+    parser.add_argument('--from', dest='batch_file', metavar='FILE',
+                        help='input file for --batch')
+    parser.add_argument('--label', dest='batch_label',
+                        help='label for --batch and --scan')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='number of worker processes for --batch')
+    parser.add_argument('--run', action='store_true',
+                        help='with --batch, also run the scripts of inputs '
+                             'matching a single shortcut')
+    parser.add_argument('--parallel', action='store_true', default=None,
+                        help='run all executors of the shortcut at once')
+    parser.add_argument('--timeout', type=float, metavar='SECONDS',
+                        help='kill executors running longer than this')
+    parser.add_argument('--inprocess', action='store_true', default=None,
+                        help='run python executors in this interpreter')
+    parser.add_argument('--exec', dest='exec_in_place', action='store_true',
+                        help='replace s with the executor if the shortcut '
+                             'has a single one')
+    parser.add_argument('--print', dest='print_scripts', action='store_true',
+                        help='print the scripts instead of running them')
+    parser.add_argument('--eval', dest='eval_shell', metavar='SHELL',
+                        choices=['bash', 'fish'],
+                        help='print a script for SHELL to evaluate instead '
+                             'of running the executors')
+    parser.add_argument('--regex-budget', type=float, metavar='MS',
+                        help='skip patterns taking longer than this to match '
+                             'an input')
+    parser.add_argument('--regex-costs', action='store_true',
+                        help='with --batch, print the time spent in every '
+                             'pattern to stderr as JSON')
+    parser.add_argument('--auto-pick', action='store_true',
+                        default=env_flag('SHELLCUT_AUTO_PICK'),
+                        help='run the shortcut used most often without '
+                             'asking, if it dominates the matching ones')
+    parser.add_argument('--no-memo', action='store_true',
+                        help='neither use nor update the memo of recent '
+                             'inputs and shortcut usage')
+    parser.add_argument('--timings', action='store_true',
+                        help='print the time spent in every phase of the run '
+                             'to stderr as JSON')
+
+    args = parser.parse_args()
+    if args.input is None and not (args.compile or args.import_yaml or
+                                   args.daemon or args.batch or
+                                   args.scan_file):
+        parser.error('the following arguments are required: input')
+    if args.batch_label is not None and not (args.batch or args.scan_file):
+        parser.error('--label only applies to --batch and --scan, give the '
+                     'label after the input otherwise')
+    return args
 
 
 def choose_single_match(possible_matches):
@@ -195,21 +631,263 @@ def listify(element):
     return element if isinstance(element, list) else [element]
 
 
-def main():
-    # load CLI arguments
-    args = parse_arguments()
+def load_compiled_shortcuts():
+    """
+    Load the shortcuts from all config directories and compile them
+    """
+    with trace.stage('get_config_dirs'):
+        configdirs = get_config_dirs()
+    with trace.stage('load_shortcuts'):
+        shortcuts = load_shortcuts_cached(configdirs)
+    with trace.stage('compile_shortcuts'):
+        return compile_shortcuts(shortcuts)
+
+
+def find_matches(input_data, label=None, memo=None):
+    """
+    Return the shortcuts matching input_data, asking the daemon if one is
+    running and checking the shortcuts in this process otherwise: those the
+    catalog selects or the compiled dispatcher, if either is up to date,
+    and all shortcuts of the config files if not.
+
+    If a shellcut.memo.Memo is given, an input it remembers is only checked
+    against the shortcuts which matched it before, and the lookups of all
+    shortcuts are remembered in it.
+
+    While a regex budget is enforced, neither the daemon nor the dispatcher
+    is used, as they match outside of the guard.
+    """
+    from shellcut import daemon
+
+    guarded = guard.active is not None
+    if not guarded:
+        with trace.stage('daemon_query'):
+            possible_matches = daemon.query(input_data, label)
+        if possible_matches is not None:
+            return possible_matches
+
+    if memo is not None:
+        with trace.stage('memo_lookup'):
+            remembered = memo.lookup(input_data, label)
+        if remembered is not None:
+            with trace.stage('check_shortcuts'):
+                return check_shortcuts(input_data,
+                                       compile_shortcuts(remembered), label)
+
+    from shellcut import catalog
+
+    with trace.stage('open_catalog'):
+        connection = catalog.open_catalog(get_config_dirs())
+    if connection is not None:
+        try:
+            with trace.stage('catalog_query'):
+                found = catalog.candidates(connection, input_data, label)
+        finally:
+            connection.close()
+        ids = [shortcut_id for shortcut_id, _ in found]
+        with trace.stage('check_shortcuts'):
+            shortcuts = compile_shortcuts([raw for _, raw in found])
+            possible_matches = check_shortcuts(input_data, shortcuts, label)
+        remember_matches(memo, input_data, label, possible_matches,
+                         shortcuts, ids)
+        return possible_matches
+
+    from shellcut.compiler import load_dispatcher
+
+    dispatcher = None
+    if not guarded:
+        with trace.stage('load_dispatcher'):
+            dispatcher = load_dispatcher(get_config_dirs())
+    if dispatcher is not None:
+        with trace.stage('check_shortcuts'):
+            return dispatcher.check_shortcuts(input_data, label)
+
+    from shellcut.index import ShortcutIndex
+
+    shortcuts = load_compiled_shortcuts()
+    with trace.stage('build_index'):
+        index = ShortcutIndex(shortcuts)
+    with trace.stage('check_shortcuts'):
+        possible_matches = check_shortcuts(input_data, shortcuts,
+                                           label=label, index=index)
+    remember_matches(memo, input_data, label, possible_matches, shortcuts,
+                     range(len(shortcuts)))
+    return possible_matches
+
+
+def remember_matches(memo, input_data, label, possible_matches, shortcuts,
+                     ids):
+    """
+    Store a lookup over 'shortcuts' in the memo, if there is one, where
+    'ids' are the positions of the shortcuts in the configs
+    """
+    if memo is None:
+        return
+    # one pass over the shortcuts finds the positions of all matched ones
+    matched = {id(shortcut) for shortcut, _ in possible_matches}
+    positions = {}
+    if matched:
+        positions = {id(shortcut): i for i, shortcut in enumerate(shortcuts)
+                     if id(shortcut) in matched}
+    memo.store(input_data, label,
+               [(ids[positions[id(shortcut)]], shortcut.data)
+                for shortcut, _ in possible_matches])
+
+
+def pick_match(possible_matches, memo=None, auto_pick=False):
+    """
+    Choose the match to run like choose_single_match, offering the most
+    used shortcuts first if there is a memo and counting the run in it
+
+    With 'auto_pick', a shortcut dominating the usage counts is chosen
+    without asking.
+    """
+    if memo is not None:
+        possible_matches = memo.rank(possible_matches)
+        if auto_pick:
+            dominant = memo.dominant(possible_matches)
+            if dominant is not None:
+                possible_matches = [dominant]
+    try:
+        match = choose_single_match(possible_matches)
+        if memo is not None:
+            for shortcut, possible_match in possible_matches:
+                if possible_match is match:
+                    memo.record_use(shortcut)
+    finally:
+        # the lookup is remembered even if nothing matched or was chosen
+        if memo is not None:
+            memo.save()
+    return match
+
+
+def run_input(args):
+    """
+    Match the input, let the user choose a shortcut and run its executors
 
+    Returns:
+        exit status
+    """
     # load and check shortcuts
-    shortcuts = load_shortcuts(get_config_dirs())
-    possible_matches = check_shortcuts(args.input, shortcuts,
-                                       label=args.label)
+    with trace.stage('find_matches'):
+        memo = None
+        if not args.no_memo:
+            from shellcut.memo import load_memo
+            memo = load_memo(get_config_dirs())
+        possible_matches = find_matches(args.input, args.label, memo)
 
     # if the function returned no matches, exit
-    executor_map = choose_single_match(possible_matches)
+    with trace.stage('choose_match'):
+        if args.eval_shell or args.print_scripts:
+            # the output is evaluated by a shell or piped, prompt on stderr
+            import contextlib
+            with contextlib.redirect_stdout(sys.stderr):
+                match = pick_match(possible_matches, memo, args.auto_pick)
+        else:
+            match = pick_match(possible_matches, memo, args.auto_pick)
+    with trace.stage('render'):
+        executor_map = match.render()
+
+    # CLI options override the settings of the shortcut
+    settings = match.settings
+    for key in EXECUTION_SETTINGS:
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+
+    from shellcut import executors
+
+    if args.print_scripts:
+        sys.stdout.write(executors.format_scripts(executor_map))
+        return 0
+    if args.eval_shell:
+        sys.stdout.write(executors.eval_script(executor_map,
+                                               args.eval_shell))
+        return 0
+
+    # a timeout needs this process to enforce it, in-process python scripts
+    # don't need a new process at all
+    if (args.exec_in_place and len(executor_map) == 1 and
+            settings.get('timeout') is None and
+            not (settings.get('inprocess') and 'python' in executor_map)):
+        (command, script), = executor_map.items()
+        trace.finish()
+        executors.exec_executor(command, script)
 
     # run all executors
-    for command, script in executor_map.items():
-        subprocess.call([command, "-c", script])
+    with trace.stage('run_executors'):
+        return executors.run_executors(executor_map, **settings)
+
+
+def main():
+    started = trace.now()
+
+    # load CLI arguments
+    args = parse_arguments()
+
+    if args.compile:
+        from shellcut.compiler import write_dispatcher, get_dispatcher_path
+        count, files = write_dispatcher(get_config_dirs())
+        print('Compiled {} shortcuts from {} config files into {}'.format(
+            count, files, get_dispatcher_path()))
+        return
+
+    if args.import_yaml:
+        from shellcut.catalog import write_catalog, get_catalog_path
+        count, files = write_catalog(get_config_dirs())
+        print('Imported {} shortcuts from {} config files into {}'.format(
+            count, files, get_catalog_path()))
+        return
+
+    if args.daemon:
+        from shellcut import daemon
+        try:
+            daemon.serve(daemon.get_socket_path())
+        except RuntimeError as ex:
+            print(ex, file=sys.stderr)
+            sys.exit(1)
+        return
+
+    budget = args.regex_budget
+    if budget is None and os.environ.get('SHELLCUT_REGEX_BUDGET'):
+        budget = float(os.environ['SHELLCUT_REGEX_BUDGET'])
+    if budget is not None:
+        # milliseconds on the command line
+        budget /= 1000
+
+    if args.scan_file:
+        from shellcut.scan import scan_file
+        if budget is not None:
+            guard.enable(budget)
+        try:
+            scan_file(args.scan_file, sys.stdout, args.batch_label)
+        finally:
+            guard.disable()
+        return
+
+    if args.batch:
+        from shellcut.batch import run_batch
+        options = {'run': args.run, 'regex_budget': budget,
+                   'regex_costs': args.regex_costs}
+        if args.batch_file:
+            with open(args.batch_file) as fd:
+                run_batch(fd, sys.stdout, args.batch_label, args.jobs,
+                          **options)
+        else:
+            run_batch(sys.stdin, sys.stdout, args.batch_label, args.jobs,
+                      **options)
+        return
+
+    if budget is not None:
+        guard.enable(budget)
+
+    destination = '-' if args.timings else os.environ.get('SHELLCUT_TRACE')
+    if destination:
+        tracer = trace.enable(destination, started)
+        tracer.record('parse_arguments', started)
+    try:
+        sys.exit(run_input(args))
+    finally:
+        trace.finish()
 
 
 if __name__ == '__main__':
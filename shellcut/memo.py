@@ -0,0 +1,193 @@
+"""
+Memo of recent lookups and usage counts of the shortcuts
+
+'s' remembers the shortcuts which matched the last MEMO_SIZE inputs (with
+their label), so that a repeated input is only checked against those, without
+loading and scanning all shortcuts. The remembered lookups are tied to the
+config files they were made with and dropped when any of them changes, is
+added or removed.
+
+It also counts how often every shortcut (by name) was run. When several
+shortcuts match, the most used ones are offered first, and with --auto-pick
+(or SHELLCUT_AUTO_PICK) a dominant one is run without asking.
+"""
+
+import os
+import marshal
+import collections
+
+from shellcut.cache import file_key
+from shellcut.dirs import XDG_CACHE_HOME
+
+
+# bump when the layout of the memo file changes
+MEMO_VERSION = 1
+
+# number of remembered lookups
+MEMO_SIZE = 256
+
+# a shortcut is picked automatically if it was run at least this many times,
+# and made up at least this share of the runs of the matching shortcuts
+AUTO_PICK_USES = 5
+AUTO_PICK_SHARE = 0.8
+
+
+def get_memo_path():
+    """
+    Return the path of the memo file
+    """
+    return os.path.join(XDG_CACHE_HOME, 'shellcut', 'memo')
+
+
+def config_key(configdirs):
+    """
+    Return the key identifying the current content of all config files
+    """
+    from shellcut import main
+
+    return tuple((os.path.abspath(filename), file_key(filename))
+                 for filename in main.find_config_files(configdirs))
+
+
+class Memo:
+    """
+    Remembered lookups, least recently used first, and usage counts
+
+    A lookup is remembered as the ids of the matched shortcuts, their
+    positions in the configs. The raw shortcut dictionaries of all ids are
+    kept as well.
+    """
+
+    def __init__(self, key, entries=(), shortcuts=None, counts=None,
+                 path=None):
+        self.key = key
+        # (input, label) -> shortcut ids
+        self.entries = collections.OrderedDict(
+            ((input_data, label), ids) for input_data, label, ids in entries)
+        # shortcut id -> raw shortcut dictionary
+        self.shortcuts = shortcuts or {}
+        # shortcut name -> number of runs
+        self.counts = counts or {}
+        self.path = path
+        self.changed = False
+
+    def lookup(self, input_data, label=None):
+        """
+        Return the raw shortcuts which matched input_data the last time, in
+        config order, or None if the lookup is not remembered
+        """
+        ids = self.entries.get((input_data, label))
+        if ids is None:
+            return None
+        self.entries.move_to_end((input_data, label))
+        self.changed = True
+        return [self.shortcuts[shortcut_id] for shortcut_id in ids]
+
+    def store(self, input_data, label, matched):
+        """
+        Remember a lookup, 'matched' holds (id, raw shortcut) pairs of the
+        matched shortcuts
+        """
+        self.entries[(input_data, label)] = tuple(
+            shortcut_id for shortcut_id, _ in matched)
+        self.entries.move_to_end((input_data, label))
+        self.shortcuts.update(matched)
+        while len(self.entries) > MEMO_SIZE:
+            self.entries.popitem(last=False)
+        self.changed = True
+
+    def count(self, shortcut):
+        return self.counts.get(shortcut.get('name'), 0)
+
+    def rank(self, possible_matches):
+        """
+        Return the (shortcut, match) pairs, the most used shortcuts first
+        and otherwise in config order
+        """
+        return sorted(possible_matches,
+                      key=lambda pair: -self.count(pair[0]))
+
+    def dominant(self, possible_matches):
+        """
+        Return the pair of the shortcut run far more often than the other
+        matching ones, or None if there is none
+        """
+        if not possible_matches:
+            return None
+        counts = [self.count(shortcut) for shortcut, _ in possible_matches]
+        best = max(counts)
+        if best >= AUTO_PICK_USES and best >= AUTO_PICK_SHARE * sum(counts):
+            return possible_matches[counts.index(best)]
+        return None
+
+    def record_use(self, shortcut):
+        """
+        Count a run of the shortcut
+        """
+        name = shortcut.get('name')
+        if name is not None:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            self.changed = True
+
+    def save(self):
+        """
+        Atomically replace the memo file, if anything changed
+
+        Returns:
+            True if the memo was written, False otherwise
+        """
+        if not self.changed:
+            return False
+        used = set()
+        for ids in self.entries.values():
+            used.update(ids)
+        entries = [(input_data, label, ids)
+                   for (input_data, label), ids in self.entries.items()]
+        shortcuts = {shortcut_id: shortcut
+                     for shortcut_id, shortcut in self.shortcuts.items()
+                     if shortcut_id in used}
+        try:
+            data = marshal.dumps((MEMO_VERSION, self.key, entries, shortcuts,
+                                  self.counts))
+        except ValueError:
+            # a remembered shortcut holds values marshal can't store, keep
+            # only the counts
+            data = marshal.dumps((MEMO_VERSION, self.key, [], {},
+                                  self.counts))
+
+        tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, 'wb') as fd:
+                fd.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return False
+        self.changed = False
+        return True
+
+
+def load_memo(configdirs, path=None):
+    """
+    Read the memo file
+
+    Returns:
+        Memo, without the remembered lookups if the memo file is missing,
+        corrupt, of another version or made with other config files
+    """
+    if path is None:
+        path = get_memo_path()
+    key = config_key(configdirs)
+    try:
+        with open(path, 'rb') as fd:
+            version, old_key, entries, shortcuts, counts = marshal.load(fd)
+    except (OSError, EOFError, ValueError, TypeError):
+        return Memo(key, path=path)
+
+    if version != MEMO_VERSION or not isinstance(counts, dict):
+        return Memo(key, path=path)
+    if old_key != key:
+        memo = Memo(key, counts=counts, path=path)
+        memo.changed = True
+        return memo
+    return Memo(key, entries, shortcuts, counts, path=path)
@@ -0,0 +1,173 @@
+"""
+Pool of long-lived shell coprocesses for running many scripts in a row
+
+Starting a shell for every script costs a fork, an exec and the shell's
+startup. A ShellWorker starts the shell once and feeds it scripts over its
+stdin. Each script is written to a temporary file, sourced (in a subshell
+for bash) with stderr merged into stdout, and followed by a sentinel line
+carrying its exit status:
+
+    <output of the script>
+    <token> <status>
+
+A worker is replaced after a script fails, after the shell dies (e.g. on
+'exit' in fish, which has no subshells) and after a number of runs.
+"""
+
+import os
+import re
+import uuid
+import shlex
+import tempfile
+import threading
+import subprocess
+
+
+# commands feeding a script file to each supported shell
+SHELL_COMMANDS = {
+    'bash': "( . {path} ) </dev/null 2>&1\nprintf '\\n%s %s\\n' {token} $?\n",
+    'fish': ("begin; source {path}; end </dev/null 2>&1\n"
+             "printf '\\n%s %s\\n' {token} $status\n"),
+}
+
+
+class ShellWorker:
+    """
+    A single shell coprocess
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.token = 'SHELLCUT-{}'.format(uuid.uuid4().hex)
+        self.sentinel = re.compile(
+            r'^{} (\d+)\n$'.format(self.token).encode())
+        self.runs = 0
+        self.process = subprocess.Popen(
+            [command], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL)
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def run(self, script):
+        """
+        Run the script in the shell
+
+        Returns:
+            pair (exit status, output with stderr merged in)
+        """
+        self.runs += 1
+        fd, path = tempfile.mkstemp(prefix='shellcut-', suffix='.sh')
+        try:
+            with os.fdopen(fd, 'w') as script_file:
+                script_file.write(script)
+            command = SHELL_COMMANDS[self.command].format(
+                path=shlex.quote(path), token=self.token)
+            try:
+                self.process.stdin.write(command.encode())
+                self.process.stdin.flush()
+            except BrokenPipeError:
+                pass
+            return self.read_result()
+        finally:
+            os.remove(path)
+
+    def read_result(self):
+        lines = []
+        for line in iter(self.process.stdout.readline, b''):
+            sentinel = self.sentinel.match(line)
+            if sentinel:
+                # drop the newline printed before the sentinel
+                output = b''.join(lines)[:-1]
+                return int(sentinel.group(1)), output
+            lines.append(line)
+
+        # the shell exited in the middle of the script
+        return self.process.wait(), b''.join(lines)
+
+    def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+class ShellPool:
+    """
+    Thread-safe pool of up to 'size' shell workers per shell
+
+    Workers are recycled after a failed script or after 'max_runs' scripts.
+    """
+
+    def __init__(self, size=2, max_runs=100):
+        self.size = size
+        self.max_runs = max_runs
+        self.idle = {}
+        self.started = {}
+        self.condition = threading.Condition()
+
+    def acquire(self, command):
+        with self.condition:
+            while True:
+                idle = self.idle.setdefault(command, [])
+                if idle:
+                    return idle.pop()
+                if self.started.get(command, 0) < self.size:
+                    self.started[command] = self.started.get(command, 0) + 1
+                    break
+                self.condition.wait()
+        try:
+            return ShellWorker(command)
+        except BaseException:
+            self.discard(command)
+            raise
+
+    def release(self, worker, recycle):
+        if recycle or not worker.alive:
+            worker.close()
+            self.discard(worker.command)
+            return
+        with self.condition:
+            self.idle[worker.command].append(worker)
+            self.condition.notify()
+
+    def discard(self, command):
+        with self.condition:
+            self.started[command] -= 1
+            self.condition.notify()
+
+    def run(self, command, script):
+        """
+        Run the script with the given shell ('bash' or 'fish')
+
+        Returns:
+            pair (exit status, output with stderr merged in)
+        """
+        if command not in SHELL_COMMANDS:
+            raise ValueError('No pooled shell for {}'.format(command))
+
+        worker = self.acquire(command)
+        status = None
+        try:
+            status, output = worker.run(script)
+        finally:
+            recycle = status != 0 or worker.runs >= self.max_runs
+            self.release(worker, recycle)
+        return status, output
+
+    def close(self):
+        with self.condition:
+            workers = [worker
+                       for idle in self.idle.values()
+                       for worker in idle]
+            self.idle = {}
+        for worker in workers:
+            worker.close()
+            self.discard(worker.command)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
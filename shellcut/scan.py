@@ -0,0 +1,166 @@
+"""
+Scan mode: find the text in a file which shortcuts would handle
+
+'s --scan FILE' splits the file into whitespace separated tokens and checks
+each of them against the shortcuts, like an input given to 's'. Quotes,
+brackets and punctuation around a token are ignored, so '(BZ1234),' is
+found as 'BZ1234'. Text embedded in a token after a non-alphanumeric
+character is found as well, so 'url=https://github.com/a/b' yields
+'https://github.com/a/b'. Every matching text is written as a JSON line:
+
+    {"offset": 5120, "text": "BZ1234", "shortcuts": ["Open RH bugzilla Bug"]}
+
+where offset is the byte offset of the text in the file.
+
+The file is memory-mapped and searched in a single pass, so memory use does
+not depend on its size. Tokens in which no text can start with the literal
+prefix of any pattern are skipped by the regex finding the tokens. Patterns
+spanning whitespace, such as 'go {} {}', are not found.
+"""
+
+import re
+import json
+
+from shellcut import main
+
+
+TOKEN_RE = re.compile(rb'\S+')
+
+# characters stripped from both ends of a token
+PUNCTUATION = b'"\'`()[]{}<>,.;:!?'
+
+# bytes continuing a word: text embedded in a token is only checked if it
+# starts after another byte, such as '=' in 'url=https://...'
+WORD_BYTES = frozenset(
+    b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789' +
+    bytes(range(0x80, 0x100)))
+
+# longer tokens (e.g. minified or base64 data) are skipped
+MAX_TOKEN_LENGTH = 4096
+
+# number of distinct tokens whose results are remembered, logs repeat many
+CACHE_SIZE = 10000
+
+
+def start_bytes(index):
+    """
+    Return the set of bytes a text some prefix of the index starts with can
+    start with, or None if a text can start with any byte
+    """
+    chars = index.first_characters()
+    if chars is None:
+        return None
+    # any byte of a non-ASCII character
+    return frozenset(ord(char) for char in chars
+                     if ord(char) < 128) | frozenset(range(0x80, 0x100))
+
+
+def token_regex(index):
+    """
+    Return the regex finding the tokens to check: all of them, or only those
+    with a character some prefix of the index starts with, at the start of
+    the token or after a non-alphanumeric character
+
+    Skipping the other tokens in the regex engine is much faster than
+    checking them one by one.
+    """
+    chars = index.first_characters()
+    if chars is None:
+        return TOKEN_RE
+    first = b''.join(re.escape(char.encode()) for char in sorted(chars)
+                     if ord(char) < 128)
+    return re.compile(b'(?<!\\S)\\S*?(?<![A-Za-z0-9\\x80-\\xff])[' + first +
+                      b'\\x80-\\xff]\\S*')
+
+
+def match_token(token, shortcuts, index, label, starts=None):
+    """
+    Check a token, first without the punctuation around it and as it is,
+    then the texts embedded in it after a non-alphanumeric character which
+    start with one of the bytes 'starts' (any byte if None)
+
+    Returns:
+        triple (offset of the text in the token, text, names of the matching
+        shortcuts), or None if no shortcut matches
+    """
+    stripped = token.strip(PUNCTUATION)
+    lead = len(token) - len(token.lstrip(PUNCTUATION))
+    candidates = [(lead, stripped)]
+    if stripped != token:
+        candidates.append((0, token))
+    candidates.extend(
+        (lead + i, stripped[i:]) for i in range(1, len(stripped))
+        if stripped[i - 1] not in WORD_BYTES and
+        (starts is None or stripped[i] in starts))
+
+    for offset, candidate in candidates:
+        if not candidate:
+            continue
+        text = candidate.decode('utf-8', errors='replace')
+        possible = main.check_shortcuts(text, shortcuts, label, index=index)
+        if possible:
+            return offset, text, [shortcut.get('name')
+                                  for shortcut, _ in possible]
+    return None
+
+
+def scan_buffer(buffer, shortcuts, index, label=None):
+    """
+    Find the tokens of a bytes-like buffer matching the compiled shortcuts
+
+    Yields:
+        triples (offset, text, names of the matching shortcuts)
+    """
+    # token -> result of match_token, or False
+    seen = {}
+    starts = start_bytes(index)
+    for token_match in token_regex(index).finditer(buffer):
+        token = token_match.group()
+        if len(token) > MAX_TOKEN_LENGTH:
+            continue
+
+        found = seen.get(token)
+        if found is None:
+            found = match_token(token, shortcuts, index, label,
+                                starts) or False
+            if len(seen) >= CACHE_SIZE:
+                seen.clear()
+            seen[token] = found
+
+        if found:
+            offset, text, names = found
+            yield token_match.start() + offset, text, names
+
+
+def scan_file(filename, out, label=None, configdirs=None):
+    """
+    Write a JSON record of every token of the file matching a shortcut to
+    'out'
+
+    Returns:
+        number of matching tokens
+    """
+    import mmap
+    from shellcut.index import ShortcutIndex
+
+    if configdirs is None:
+        configdirs = main.get_config_dirs()
+    shortcuts = main.compile_shortcuts(main.load_shortcuts_cached(configdirs))
+    index = ShortcutIndex(shortcuts)
+
+    count = 0
+    with open(filename, 'rb') as fd:
+        try:
+            buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped
+            return 0
+        with buffer:
+            for offset, text, names in scan_buffer(buffer, shortcuts, index,
+                                                   label):
+                out.write(json.dumps({'offset': offset, 'text': text,
+                                      'shortcuts': names}))
+                out.write('\n')
+                count += 1
+    out.flush()
+    return count
@@ -0,0 +1,132 @@
+"""
+Timings of the phases of an 's' run
+
+Tracing is enabled by the --timings option (JSON to stderr) or by the
+SHELLCUT_TRACE environment variable, holding the file to append the JSON to
+('-' for stderr). The record of a run looks like:
+
+    {"argv": ["BZ1234"], "total": 12.3, "events": [
+        {"event": "load_file", "start": 0.4, "duration": 0.1,
+         "file": "/home/user/.config/shellcut/default.yaml", "cached": true},
+        {"event": "get_match", "start": 1.2, "duration": 0.02,
+         "shortcut": "Open RH bugzilla Bug", "matched": true},
+        ...
+    ]}
+
+Times are milliseconds since the start of the run. While tracing is
+disabled, 'tracer' is None and the instrumented code only checks that.
+"""
+
+import sys
+import time
+
+
+# the Tracer of this run, None while tracing is disabled
+tracer = None
+
+now = time.monotonic
+
+
+class Tracer:
+    """
+    Collects timed events of one run
+    """
+
+    def __init__(self, destination, start=None):
+        self.destination = destination
+        self.start = now() if start is None else start
+        self.events = []
+
+    def now(self):
+        return now()
+
+    def record(self, event, start, end=None, **fields):
+        """
+        Record an event which started at 'start' (from now()) and ended at
+        'end' or now
+        """
+        if end is None:
+            end = now()
+        record = {
+            'event': event,
+            'start': round((start - self.start) * 1000, 3),
+            'duration': round((end - start) * 1000, 3),
+        }
+        record.update(fields)
+        self.events.append(record)
+
+    def report(self):
+        return {
+            'argv': sys.argv[1:],
+            'total': round((now() - self.start) * 1000, 3),
+            'events': self.events,
+        }
+
+    def write(self):
+        import json
+
+        line = json.dumps(self.report()) + '\n'
+        if self.destination == '-':
+            sys.stderr.write(line)
+            sys.stderr.flush()
+        else:
+            with open(self.destination, 'a') as fd:
+                fd.write(line)
+
+
+class Stage:
+    """
+    Context manager recording the time spent in a stage of the run
+    """
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.started = self.tracer.now()
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.started)
+
+
+class NullStage:
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+def stage(name):
+    """
+    Return a context manager timing a stage, a no-op while tracing is
+    disabled
+    """
+    if tracer is None:
+        return NULL_STAGE
+    return Stage(tracer, name)
+
+
+def enable(destination, start=None):
+    """
+    Start tracing, the report goes to the file 'destination' or '-' for
+    stderr
+    """
+    global tracer
+    tracer = Tracer(destination, start)
+    return tracer
+
+
+def finish():
+    """
+    Write the report and stop tracing
+    """
+    global tracer
+    if tracer is not None:
+        current, tracer = tracer, None
+        current.write()
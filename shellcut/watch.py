@@ -0,0 +1,360 @@
+"""
+Hot reload of the config directories for long-running processes
+
+A ConfigWatcher keeps one segment per config file: its compiled shortcuts.
+When a file changes, only its segment is reparsed and a new Snapshot sharing
+the other segments is swapped in. Snapshots are never modified, so a lookup
+running on one stays consistent.
+
+The shortcuts are indexed in a few layers, each a ShortcutIndex over some
+of the segments: the segments loaded by a refresh get a new layer, and the
+layers of the other segments are shared with the previous snapshot. Layers
+of similar sizes are merged, so there are only a few of them and a lookup
+doesn't depend on the number of config files. Shortcuts of replaced or
+removed segments stay in their layer until it is merged, lookups skip them.
+
+Changes are noticed through inotify where available and by polling the
+mtime and size of the config files otherwise.
+"""
+
+import os
+import sys
+import bisect
+import select
+import struct
+import threading
+
+from shellcut import main
+from shellcut.cache import file_key
+from shellcut.index import ShortcutIndex
+
+
+class Segment:
+    """
+    Compiled shortcuts of a single config file
+    """
+
+    def __init__(self, path, key, shortcuts):
+        self.path = path
+        self.key = key
+        self.shortcuts = shortcuts
+
+
+class Layer:
+    """
+    Index over the shortcuts of some segments
+    """
+
+    def __init__(self, segments):
+        self.segments = tuple(segments)
+        self.shortcuts = []
+        # id of the first shortcut of every segment
+        self.starts = []
+        for segment in self.segments:
+            self.starts.append(len(self.shortcuts))
+            self.shortcuts.extend(segment.shortcuts)
+        self.size = len(self.shortcuts)
+        self.index = ShortcutIndex(self.shortcuts)
+
+    def locate(self, shortcut_id):
+        """
+        Return the segment of a shortcut and its position in the segment
+        """
+        i = bisect.bisect_right(self.starts, shortcut_id) - 1
+        return self.segments[i], shortcut_id - self.starts[i]
+
+    def live_size(self, live):
+        """
+        Return the number of shortcuts of the segments in 'live'
+        """
+        return sum(len(segment.shortcuts) for segment in self.segments
+                   if segment in live)
+
+
+def update_layers(layers, segments, loaded):
+    """
+    Return the layers indexing 'segments', given the layers of the previous
+    snapshot and the segments loaded since, which get a new layer
+
+    A layer is rebuilt once most of its shortcuts were replaced, and merged
+    with the preceding one when it grows to half of its size.
+    """
+    live = set(segments)
+    sizes = []
+    kept = []
+    for layer in layers:
+        size = layer.live_size(live)
+        if size * 2 < layer.size:
+            layer = Layer(segment for segment in layer.segments
+                          if segment in live)
+        if layer.segments:
+            kept.append(layer)
+            sizes.append(size)
+    if loaded:
+        kept.append(Layer(loaded))
+        sizes.append(kept[-1].size)
+
+    while len(kept) > 1 and sizes[-1] * 2 >= sizes[-2]:
+        last = kept.pop()
+        previous = kept.pop()
+        kept.append(Layer(segment
+                          for segment in previous.segments + last.segments
+                          if segment in live))
+        sizes[-2:] = [kept[-1].size]
+    return tuple(kept)
+
+
+class Snapshot:
+    """
+    Immutable view of the shortcuts of all config files
+    """
+
+    def __init__(self, segments, layers=None):
+        self.segments = tuple(segments)
+        if layers is None:
+            layers = update_layers((), self.segments, self.segments)
+        self.layers = layers
+        # segment -> its position in the config order
+        self.order = {segment: i for i, segment in enumerate(self.segments)}
+
+    @property
+    def shortcuts(self):
+        return [shortcut
+                for segment in self.segments
+                for shortcut in segment.shortcuts]
+
+    def check_shortcuts(self, input_data, label=None):
+        """
+        Returns the shortcuts matching input_data, like
+        main.check_shortcuts over all config files in order
+        """
+        order = self.order
+        candidates = []
+        for layer in self.layers:
+            for shortcut_id in layer.index.candidates(input_data, label):
+                segment, position = layer.locate(shortcut_id)
+                rank = order.get(segment)
+                if rank is not None:
+                    candidates.append((rank, position,
+                                       layer.shortcuts[shortcut_id]))
+        candidates.sort(key=lambda candidate: candidate[:2])
+        return main.check_shortcuts(
+            input_data, [shortcut for _, _, shortcut in candidates], label)
+
+
+class PollWaiter:
+    """
+    Wait for config changes by just sleeping, the caller compares mtimes
+    """
+
+    def __init__(self, configdirs):
+        self.woken = threading.Event()
+
+    def wait(self, timeout):
+        self.woken.wait(timeout)
+        return True
+
+    def wake(self):
+        self.woken.set()
+
+    def close(self):
+        pass
+
+
+class InotifyWaiter:
+    """
+    Wait for config changes with inotify (Linux only)
+    """
+
+    # IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+    # IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+    MASK = (0x002 | 0x004 | 0x008 | 0x040 | 0x080 | 0x100 | 0x200 | 0x400 |
+            0x800)
+    # IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED: the directory is gone
+    GONE = 0x400 | 0x800 | 0x8000
+    # struct inotify_event without the name
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, configdirs):
+        import ctypes
+
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.configdirs = configdirs
+        # watch descriptor -> config directory
+        self.watched = {}
+        self.wake_read, self.wake_write = os.pipe()
+        self.add_watches()
+
+    def add_watches(self):
+        """
+        Watch the config directories which exist, return True if all do
+        """
+        watched = set(self.watched.values())
+        for configdir in self.configdirs:
+            if configdir in watched:
+                continue
+            wd = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(configdir), self.MASK)
+            if wd >= 0:
+                self.watched[wd] = configdir
+                watched.add(configdir)
+        return len(watched) == len(set(self.configdirs))
+
+    def wait(self, timeout):
+        # directories which don't exist (yet, or any more) can't be watched,
+        # poll for them; files in a directory watched just now may be new
+        watched = len(self.watched)
+        polling = not self.add_watches() or len(self.watched) > watched
+
+        readable, _, _ = select.select(
+            [self.fd, self.wake_read], [], [], timeout)
+        if self.fd not in readable:
+            return polling
+        self.drain()
+        return True
+
+    def wake(self):
+        os.write(self.wake_write, b'x')
+
+    def drain(self):
+        """
+        Read the pending events, forgetting the directories which were
+        removed or moved away so that they are watched again once recreated
+        """
+        data = b''
+        try:
+            while True:
+                chunk = os.read(self.fd, 65536)
+                if not chunk:
+                    break
+                data += chunk
+        except BlockingIOError:
+            pass
+
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size + length
+            if mask & self.GONE and wd in self.watched:
+                del self.watched[wd]
+                if not mask & 0x8000:
+                    # a moved directory keeps its watch until removed
+                    self.libc.inotify_rm_watch(self.fd, wd)
+
+    def close(self):
+        for fd in (self.fd, self.wake_read, self.wake_write):
+            os.close(fd)
+
+
+def make_waiter(configdirs):
+    """
+    Return an InotifyWaiter if inotify is available, otherwise a PollWaiter
+    """
+    try:
+        return InotifyWaiter(configdirs)
+    except (OSError, AttributeError):
+        return PollWaiter(configdirs)
+
+
+class ConfigWatcher:
+    """
+    Keeps an up-to-date Snapshot of the shortcuts in the config directories
+
+    Call refresh() to pick up changes, or start() to do so in a background
+    thread. Readers should take 'snapshot' once per lookup.
+    """
+
+    def __init__(self, configdirs=None, interval=1.0):
+        if configdirs is None:
+            configdirs = main.get_config_dirs()
+        self.configdirs = configdirs
+        self.interval = interval
+        self.snapshot = Snapshot(())
+        # path -> key of config files which failed to load
+        self.failed = {}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.waiter = None
+        self.stopped = threading.Event()
+        self.refresh()
+
+    def check_shortcuts(self, input_data, label=None):
+        return self.snapshot.check_shortcuts(input_data, label)
+
+    def load_segment(self, path, key):
+        """
+        Parse and index one config file, return None if it can't be loaded
+        """
+        try:
+            shortcuts = main.compile_shortcuts(main.load_config_file(path))
+        except Exception as ex:
+            # typically a file saved in the middle of editing
+            print('shellcut: not reloading {}: {}'.format(path, ex),
+                  file=sys.stderr)
+            return None
+        return Segment(path, key, shortcuts)
+
+    def refresh(self):
+        """
+        Reload the config files which changed
+
+        Returns:
+            True if a new snapshot was swapped in, otherwise False
+        """
+        with self.lock:
+            old_segments = {segment.path: segment
+                            for segment in self.snapshot.segments}
+            segments = []
+            loaded = []
+            for filename in main.find_config_files(self.configdirs):
+                path = os.path.abspath(filename)
+                try:
+                    key = file_key(path)
+                except OSError:
+                    # removed since it was listed
+                    continue
+
+                segment = old_segments.get(path)
+                stale = segment is None or segment.key != key
+                if stale and self.failed.get(path) != key:
+                    new_segment = self.load_segment(path, key)
+                    if new_segment is None:
+                        self.failed[path] = key
+                    else:
+                        self.failed.pop(path, None)
+                        segment = new_segment
+                        loaded.append(segment)
+                if segment is not None:
+                    segments.append(segment)
+
+            if loaded or len(segments) != len(old_segments):
+                self.snapshot = Snapshot(segments, update_layers(
+                    self.snapshot.layers, segments, loaded))
+                return True
+            return False
+
+    def run(self):
+        while not self.stopped.is_set():
+            if self.waiter.wait(self.interval) and not self.stopped.is_set():
+                self.refresh()
+
+    def start(self):
+        """
+        Watch for changes in a background thread
+        """
+        self.waiter = make_waiter(self.configdirs)
+        # catch changes made before the watches were set up
+        self.refresh()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.waiter.wake()
+            self.thread.join()
+            self.waiter.close()
+            self.thread = None
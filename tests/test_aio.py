@@ -0,0 +1,86 @@
+import os
+import time
+import asyncio
+
+from unittest import TestCase
+
+from shellcut import aio
+from shellcut.executors import TIMEOUT_STATUS
+
+
+class TestAio(TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.lines = []
+
+    def on_output(self, command, stream, line):
+        self.lines.append((command, stream, line))
+
+    def run_executors(self, executor_map, **kwargs):
+        return self.loop.run_until_complete(aio.run_executors(
+            executor_map, on_output=self.on_output, **kwargs))
+
+    def test_run_executors(self):
+        """
+        Test that output is streamed and the first failure is reported
+        """
+        status = self.run_executors({
+            'bash': 'echo one; echo oops >&2; exit 3',
+            'python': 'print("two")',
+        })
+        self.assertEqual(status, 3)
+        self.assertCountEqual(self.lines, [
+            ('bash', 'stdout', b'one\n'),
+            ('bash', 'stderr', b'oops\n'),
+            ('python', 'stdout', b'two\n'),
+        ])
+
+    def test_timeout(self):
+        """
+        Test that an executor exceeding the timeout is killed
+        """
+        start = time.monotonic()
+        status = self.run_executors({'bash': 'sleep 5; echo never',
+                                     'python': 'pass'}, timeout=0.2)
+        self.assertEqual(status, TIMEOUT_STATUS)
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(self.lines, [])
+
+    def test_concurrency(self):
+        """
+        Test that a shared semaphore limits executors across calls
+        """
+        async def run_both():
+            limit = asyncio.Semaphore(1)
+            return await asyncio.gather(
+                aio.run_executors({'bash': 'sleep 0.2'}, concurrency=limit),
+                aio.run_executors({'bash': 'sleep 0.2'}, concurrency=limit))
+
+        start = time.monotonic()
+        self.assertEqual(self.loop.run_until_complete(run_both()), [0, 0])
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+
+        start = time.monotonic()
+        self.run_executors({'bash': 'sleep 0.2',
+                            'python': 'import time; time.sleep(0.2)'})
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_cancel(self):
+        """
+        Test that cancelling the call kills the executors
+        """
+        async def run_and_cancel():
+            task = asyncio.ensure_future(aio.run_executors(
+                {'bash': 'echo $$; sleep 5'}, on_output=self.on_output))
+            while not self.lines:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        self.loop.run_until_complete(run_and_cancel())
+        pid = int(self.lines[0][2])
+        with self.assertRaises(ProcessLookupError):
+            os.kill(pid, 0)
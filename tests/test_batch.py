@@ -0,0 +1,96 @@
+import io
+import os
+import json
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import batch
+
+
+CONFIG = """\
+shortcuts:
+- name: bz
+  match: BZ{}
+  bash: open {}
+  label: bug
+- name: edit
+  regex: ^bashrc$
+  bash: vim ~/.bashrc
+- name: backup
+  regex: ^bashrc$
+  bash: cp ~/.bashrc /tmp
+"""
+
+
+class TestBatch(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, 'a.yaml'), 'w') as fd:
+            fd.write(CONFIG)
+        cache_path = os.path.join(self.tmpdir.name, 'shortcuts.cache')
+        patcher = patch('shellcut.cache.get_cache_path',
+                        return_value=cache_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_batch(self, text, **kwargs):
+        out = io.StringIO()
+        batch.run_batch(io.StringIO(text), out,
+                        configdirs=[self.tmpdir.name], **kwargs)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_run_batch(self):
+        """
+        Test that every input line gets a record with the matches
+        """
+        records = self.run_batch('BZ12\nnothing\nbashrc\r\n')
+        self.assertEqual(records, [
+            {'input': 'BZ12',
+             'matches': [{'name': 'bz', 'scripts': {'bash': 'open 12'}}]},
+            {'input': 'nothing', 'matches': []},
+            {'input': 'bashrc',
+             'matches': [
+                 {'name': 'edit', 'scripts': {'bash': 'vim ~/.bashrc'}},
+                 {'name': 'backup',
+                  'scripts': {'bash': 'cp ~/.bashrc /tmp'}}]},
+        ])
+
+    def test_run_batch_label(self):
+        """
+        Test that the label restricts the matches
+        """
+        records = self.run_batch('BZ12\nbashrc\n', label='bug')
+        self.assertEqual([len(r['matches']) for r in records], [1, 0])
+
+    def test_run_batch_empty(self):
+        """
+        Test that an empty input gives no output
+        """
+        self.assertEqual(self.run_batch(''), [])
+
+    def test_run_batch_parallel(self):
+        """
+        Test that worker processes give the same records in input order
+        """
+        lines = ['BZ{}'.format(i) if i % 3 else 'bashrc'
+                 for i in range(batch.CHUNK_SIZE * 3 + 7)]
+        text = '\n'.join(lines) + '\n'
+        self.assertEqual(self.run_batch(text, jobs=3), self.run_batch(text))
+
+    def test_run_batch_run(self):
+        """
+        Test that the scripts of inputs with a single match are run
+        """
+        with open(os.path.join(self.tmpdir.name, 'a.yaml'), 'w') as fd:
+            fd.write(CONFIG.replace('open {}', 'echo {0}; exit {0}'))
+        records = self.run_batch('BZ3\nbashrc\n', run=True)
+
+        self.assertEqual(records[0]['results'],
+                         {'bash': {'status': 3, 'output': '3\n'}})
+        self.assertNotIn('results', records[1])
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from unittest import TestCase
+
+from shellcut import cache
+
+
+class TestCache(TestCase):
+
+    def test_read_cache_missing(self):
+        """
+        Test that a missing cache file reads as an empty cache
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            entries = cache.read_cache(os.path.join(tmpdir, 'nothing'))
+            self.assertEqual(entries, {})
+
+    def test_read_cache_corrupt(self):
+        """
+        Test that a corrupt cache file reads as an empty cache
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = os.path.join(tmpdir, 'shortcuts.cache')
+            with open(cache_path, 'wb') as fd:
+                fd.write(b'garbage')
+            self.assertEqual(cache.read_cache(cache_path), {})
+
+    def test_write_read_roundtrip(self):
+        """
+        Test that written entries are read back unchanged
+        """
+        entries = {'/a.yaml': ((1, 2), [{'name': 'harry', 'label': ['x']}])}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = os.path.join(tmpdir, 'sub', 'shortcuts.cache')
+            self.assertTrue(cache.write_cache(cache_path, entries))
+            self.assertEqual(cache.read_cache(cache_path), entries)
+
+    def test_write_cache_unmarshallable(self):
+        """
+        Test that entries marshal can't store are pickled, and entries
+        pickle can't store either are left out
+        """
+        import datetime
+
+        entries = {
+            '/a.yaml': ((1, 2), [{'name': 'harry'}]),
+            '/b.yaml': ((3, 4), [{'name': 'ron',
+                                  'created': datetime.date(2020, 1, 1)}]),
+            '/c.yaml': ((5, 6), [{'name': lambda: None}]),
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_path = os.path.join(tmpdir, 'shortcuts.cache')
+            self.assertTrue(cache.write_cache(cache_path, entries))
+            del entries['/c.yaml']
+            self.assertEqual(cache.read_cache(cache_path), entries)
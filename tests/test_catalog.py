@@ -0,0 +1,141 @@
+import os
+import sys
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import memo
+from shellcut import catalog
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'benchmarks'))
+from synthetic import generate_shortcuts, generate_inputs  # noqa: E402
+from test_compiler import (EXTRA_SHORTCUTS, EXTRA_INPUTS,  # noqa: E402
+                           results)
+
+
+class TestCatalog(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.configdir = os.path.join(self.tmpdir.name, 'config')
+        os.mkdir(self.configdir)
+        self.path = os.path.join(self.tmpdir.name, 'catalog.sqlite')
+
+    def write_config(self, name, shortcuts):
+        import yaml
+
+        filename = os.path.join(self.configdir, name)
+        with open(filename, 'w') as fd:
+            yaml.safe_dump({'shortcuts': shortcuts}, fd)
+        return filename
+
+    def open(self):
+        catalog.write_catalog([self.configdir], self.path)
+        connection = catalog.open_catalog([self.configdir], self.path)
+        if connection is not None:
+            self.addCleanup(connection.close)
+        return connection
+
+    def check(self, connection, input_data, label=None):
+        found = catalog.candidates(connection, input_data, label)
+        shortcuts = main.compile_shortcuts([raw for _, raw in found])
+        return main.check_shortcuts(input_data, shortcuts, label)
+
+    def test_equivalent(self):
+        """
+        Test that the shortcuts the catalog selects match like all shortcuts
+        across the synthetic corpus
+        """
+        raw = generate_shortcuts(2000) + EXTRA_SHORTCUTS
+        self.write_config('a.yaml', raw[:1000])
+        self.write_config('b.yaml', raw[1000:])
+        connection = self.open()
+        self.assertIsNotNone(connection)
+        self.assertEqual(catalog.load_shortcuts(connection), raw)
+
+        shortcuts = main.compile_shortcuts(raw)
+        inputs = generate_inputs(raw, 200) + EXTRA_INPUTS
+        inputs += [input_data.upper() for input_data in inputs]
+        for label in [None, 'docs', 'go', 'any']:
+            for input_data in inputs:
+                self.assertEqual(
+                    results(self.check(connection, input_data, label)),
+                    results(main.check_shortcuts(input_data, shortcuts,
+                                                 label)),
+                    (input_data, label))
+
+    def test_candidates(self):
+        """
+        Test that only shortcuts with a matching prefix and label are read
+        """
+        self.write_config('a.yaml', EXTRA_SHORTCUTS)
+        connection = self.open()
+
+        def names(input_data, label=None):
+            return [raw['name'] for _, raw in
+                    catalog.candidates(connection, input_data, label)]
+
+        # 'unicode' and 'flags' have no prefix
+        self.assertEqual(names('go x y'),
+                         ['named', 'unicode', 'flags', 'anything'])
+        self.assertEqual(names('GO x y', 'go'), ['named'])
+        self.assertEqual(names('BOTH-1', 'any'), ['anything'])
+        # KELVIN SIGN matches 'k' case-insensitively
+        self.assertIn('kelvin', names('\u212aelvin'))
+        self.assertNotIn('kelvin', names('xelvin'))
+        self.assertEqual([shortcut_id for shortcut_id, _ in
+                          catalog.candidates(connection, 'n x')],
+                         [2, 3, 5, 6])
+
+    def test_open_catalog_stale(self):
+        """
+        Test that the catalog is only used while it is up to date
+        """
+        self.assertIsNone(catalog.open_catalog([self.configdir], self.path))
+
+        filename = self.write_config('a.yaml', EXTRA_SHORTCUTS)
+        self.open().close()
+
+        # a changed config file
+        stat = os.stat(self.path)
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertIsNone(catalog.open_catalog([self.configdir], self.path))
+
+        # an added config file
+        self.open().close()
+        self.write_config('b.yaml', [])
+        os.utime(os.path.join(self.configdir, 'b.yaml'), ns=(0, 0))
+        self.assertIsNone(catalog.open_catalog([self.configdir], self.path))
+
+        # not a database
+        with open(self.path, 'w') as fd:
+            fd.write('garbage')
+        self.assertIsNone(catalog.open_catalog([self.configdir], self.path))
+
+    @patch('shellcut.daemon.query', return_value=None)
+    def test_find_matches(self, mock_query):
+        """
+        Test that main imports the configs and uses the catalog, filling
+        the memo with the positions of the matched shortcuts
+        """
+        self.write_config('a.yaml', EXTRA_SHORTCUTS)
+        remembered = memo.Memo(())
+        with patch('shellcut.main.get_config_dirs',
+                   return_value=[self.configdir]), \
+                patch('shellcut.catalog.get_catalog_path',
+                      return_value=self.path), \
+                patch('sys.argv', ['s', '--import-yaml']), \
+                patch('sys.stdout'):
+            main.main()
+            with patch('shellcut.main.load_compiled_shortcuts') as mock_load:
+                possible = main.find_matches('go a b', 'go', remembered)
+
+        mock_load.assert_not_called()
+        self.assertEqual(results(possible), [
+            ('named', {'bash': 'cd a b'}, {'parallel': True, 'timeout': 2.5})
+        ])
+        self.assertEqual(remembered.entries, {('go a b', 'go'): (1,)})
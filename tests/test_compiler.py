@@ -0,0 +1,160 @@
+import os
+import sys
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import compiler
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                'benchmarks'))
+from synthetic import generate_shortcuts, generate_inputs  # noqa: E402
+
+
+EXTRA_SHORTCUTS = [
+    {'name': 'typed', 'match': 'add {:d} {:d}', 'bash': 'echo {}'},
+    {'name': 'named', 'match': 'go {place} {}', 'bash': 'cd {place} {}',
+     'label': 'go', 'parallel': True, 'timeout': 2.5},
+    {'name': 'nested', 'match': 'n {a[b]}', 'python': 'print({a})'},
+    {'name': 'unicode', 'match': 'Ünï{}', 'bash': 'echo {}'},
+    {'name': 'kelvin', 'match': 'kelvin{}', 'bash': 'echo {}'},
+    {'name': 'flags', 'regex': '(?i)abc(\\d)', 'bash': 'echo {0}'},
+    {'name': 'anything', 'regex': '.*', 'bash': 'true', 'label': 'any'},
+    {'name': 'no executors', 'match': 'add {} {}'},
+    {'name': 'both', 'match': ['both {}', 'BOTH-{}'], 'regex': '^both (x)$',
+     'fish': 'echo {}'},
+]
+
+EXTRA_INPUTS = ['add 1 2', 'ADD 1 2', 'go home now', 'n x', 'ünï1',
+                'ÜNÏ2', 'Kelvin3', 'KELVIN4', 'aBc5', 'both x',
+                'both y', 'both-z', '', 'ſomething', 'T5-42'.lower()]
+
+
+def results(possible):
+    return [(shortcut.get('name'), match.render(), match.settings)
+            for shortcut, match in possible]
+
+
+class TestCompiler(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.configdir = os.path.join(self.tmpdir.name, 'config')
+        os.mkdir(self.configdir)
+        self.path = os.path.join(self.tmpdir.name, 'dispatch.py')
+
+    def write_config(self, name, shortcuts):
+        import yaml
+
+        filename = os.path.join(self.configdir, name)
+        with open(filename, 'w') as fd:
+            yaml.safe_dump({'shortcuts': shortcuts}, fd)
+        return filename
+
+    def compile(self):
+        compiler.write_dispatcher([self.configdir], self.path)
+        return compiler.load_dispatcher([self.configdir], self.path)
+
+    def test_equivalent(self):
+        """
+        Test that the dispatcher finds the same matches as check_shortcuts
+        across the synthetic corpus
+        """
+        raw = generate_shortcuts(2000) + EXTRA_SHORTCUTS
+        self.write_config('a.yaml', raw[:1000])
+        self.write_config('b.yaml', raw[1000:])
+        dispatcher = self.compile()
+        self.assertIsNotNone(dispatcher)
+
+        shortcuts = main.compile_shortcuts(main.load_shortcuts(
+            [self.configdir]))
+        inputs = generate_inputs(raw, 200) + EXTRA_INPUTS
+        inputs += [input_data.upper() for input_data in inputs]
+        for label in [None, 'docs', 'go', 'any']:
+            for input_data in inputs:
+                self.assertEqual(
+                    results(dispatcher.check_shortcuts(input_data, label)),
+                    results(main.check_shortcuts(input_data, shortcuts,
+                                                 label)),
+                    (input_data, label))
+
+    def test_no_parse_import(self):
+        """
+        Test that the dispatcher doesn't need parse for untyped templates
+        """
+        self.write_config('a.yaml', EXTRA_SHORTCUTS[1:2])
+        dispatcher = self.compile()
+        with patch.dict(sys.modules, {'parse': None}):
+            possible = dispatcher.check_shortcuts('go a b')
+        self.assertEqual(results(possible), [
+            ('named', {'bash': 'cd a b'}, {'parallel': True, 'timeout': 2.5})
+        ])
+
+    def test_load_dispatcher_stale(self):
+        """
+        Test that the dispatcher is only used while it is up to date
+        """
+        self.assertIsNone(
+            compiler.load_dispatcher([self.configdir], self.path))
+
+        filename = self.write_config('a.yaml', EXTRA_SHORTCUTS)
+        self.assertIsNotNone(self.compile())
+
+        # a changed config file
+        stat = os.stat(self.path)
+        os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        self.assertIsNone(
+            compiler.load_dispatcher([self.configdir], self.path))
+
+        # a removed config file
+        self.write_config('b.yaml', [])
+        self.assertIsNotNone(self.compile())
+        os.remove(os.path.join(self.configdir, 'b.yaml'))
+        self.assertIsNone(
+            compiler.load_dispatcher([self.configdir], self.path))
+
+    def test_load_dispatcher_other_version(self):
+        """
+        Test that a dispatcher generated by another version is not used
+        """
+        self.write_config('a.yaml', EXTRA_SHORTCUTS)
+        self.assertIsNotNone(self.compile())
+        with patch('shellcut.compiler.DISPATCHER_VERSION',
+                   compiler.DISPATCHER_VERSION + 1):
+            self.assertIsNone(
+                compiler.load_dispatcher([self.configdir], self.path))
+
+    def test_parse_internals_missing(self):
+        """
+        Test that templates stay parse templates if parse lacks the
+        internals used to translate them
+        """
+        self.assertEqual(compiler.compile_parse_template('go {}')[0],
+                         compiler.TEMPLATE)
+        with patch('parse.compile', return_value=object()):
+            self.assertEqual(compiler.compile_parse_template('go {}'),
+                             (compiler.PARSE, 'go {}', 0, (), ()))
+
+    @patch('shellcut.daemon.query', return_value=None)
+    def test_find_matches(self, mock_query):
+        """
+        Test that main uses an up-to-date dispatcher
+        """
+        self.write_config('a.yaml', EXTRA_SHORTCUTS)
+        with patch('shellcut.main.get_config_dirs',
+                   return_value=[self.configdir]), \
+                patch('shellcut.compiler.get_dispatcher_path',
+                      return_value=self.path), \
+                patch('sys.argv', ['s', '--compile']), \
+                patch('sys.stdout'):
+            main.main()
+            with patch('shellcut.main.load_compiled_shortcuts') as mock_load:
+                possible = main.find_matches('go a b', 'go')
+
+        mock_load.assert_not_called()
+        self.assertEqual(results(possible), [
+            ('named', {'bash': 'cd a b'}, {'parallel': True, 'timeout': 2.5})
+        ])
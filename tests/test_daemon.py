@@ -0,0 +1,149 @@
+import io
+import os
+import tempfile
+import threading
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import daemon
+
+
+SHORTCUTS = [
+    {'name': 'bz', 'match': 'BZ{}', 'bash': 'open {}', 'label': 'bug'},
+    {'name': 'edit', 'regex': '^bashrc$', 'bash': 'vim ~/.bashrc'},
+    {'name': 'backup', 'regex': '^bashrc$', 'bash': 'cp ~/.bashrc /tmp'},
+]
+
+
+class TestDaemon(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmpdir.name, 'shellcut.sock')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def start_server(self, configdirs=None):
+        shortcuts = main.compile_shortcuts(SHORTCUTS)
+
+        def check_shortcuts(input_data, label):
+            return main.check_shortcuts(input_data, shortcuts, label)
+
+        server = daemon.make_server(self.socket_path, check_shortcuts,
+                                    configdirs)
+        thread = threading.Thread(target=server.serve_forever,
+                                  kwargs={'poll_interval': 0.01})
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+    def test_query(self):
+        """
+        Test that the daemon answers like check_shortcuts
+        """
+        self.start_server()
+
+        result = daemon.query('BZ12', socket_path=self.socket_path)
+        self.assertEqual([(s, m.render()) for s, m in result],
+                         [({'name': 'bz'}, {'bash': 'open 12'})])
+
+        result = daemon.query('bashrc', socket_path=self.socket_path)
+        self.assertEqual([shortcut['name'] for shortcut, _ in result],
+                         ['edit', 'backup'])
+
+        result = daemon.query('BZ12', 'other', socket_path=self.socket_path)
+        self.assertEqual(result, [])
+
+    def test_query_other_configdirs(self):
+        """
+        Test that a daemon serving other config directories is not used
+        """
+        served = os.path.join(self.tmpdir.name, 'served')
+        self.start_server([served])
+
+        result = daemon.query('BZ12', socket_path=self.socket_path,
+                              configdirs=[served])
+        self.assertEqual([shortcut['name'] for shortcut, _ in result],
+                         ['bz'])
+        self.assertIsNone(daemon.query(
+            'BZ12', socket_path=self.socket_path,
+            configdirs=[os.path.join(self.tmpdir.name, 'other')]))
+        with patch.dict(os.environ, {'SHELLCUT_CONFIG': served}):
+            self.assertIsNone(daemon.query('BZ12',
+                                           socket_path=self.socket_path))
+        self.assertTrue(daemon.is_listening(self.socket_path))
+
+    def test_socket_permissions(self):
+        """
+        Test that only the current user can connect to the daemon
+        """
+        self.start_server()
+        mode = os.stat(self.socket_path).st_mode & 0o777
+        self.assertEqual(mode & 0o077, 0)
+
+    def test_query_no_daemon(self):
+        """
+        Test that a query without a daemon returns None
+        """
+        self.assertIsNone(daemon.query('BZ12', socket_path=self.socket_path))
+
+    def test_query_stale_socket(self):
+        """
+        Test that a query to a socket nobody listens on returns None
+        """
+        server = daemon.make_server(self.socket_path, None)
+        server.server_close()
+        self.assertTrue(os.path.exists(self.socket_path))
+        self.assertIsNone(daemon.query('BZ12', socket_path=self.socket_path))
+
+    def test_serve_running_daemon(self):
+        """
+        Test that a second daemon refuses to take over the socket
+        """
+        self.start_server()
+        with self.assertRaises(RuntimeError):
+            daemon.serve(self.socket_path, [self.tmpdir.name])
+
+    def test_main_running_daemon(self):
+        """
+        Test that 's --daemon' exits with an error if one is running
+        """
+        self.start_server()
+        with patch('shellcut.daemon.get_socket_path',
+                   return_value=self.socket_path), \
+                patch('sys.argv', ['s', '--daemon']), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            with self.assertRaises(SystemExit) as raised:
+                main.main()
+        self.assertEqual(raised.exception.code, 1)
+        self.assertIn('already listening', stderr.getvalue())
+
+    @patch('shellcut.main.load_compiled_shortcuts')
+    @patch('shellcut.daemon.query')
+    def test_find_matches_daemon(self, mock_query, mock_load):
+        """
+        Test that matches from the daemon are used when it runs
+        """
+        mock_query.return_value = [({'name': 'bz'}, {'bash': 'x'})]
+        result = main.find_matches('BZ1')
+        self.assertEqual(result, mock_query.return_value)
+        mock_load.assert_not_called()
+
+    @patch('shellcut.catalog.open_catalog', return_value=None)
+    @patch('shellcut.compiler.load_dispatcher', return_value=None)
+    @patch('shellcut.main.load_compiled_shortcuts')
+    @patch('shellcut.daemon.query')
+    def test_find_matches_fallback(self, mock_query, mock_load,
+                                   mock_dispatcher, mock_catalog):
+        """
+        Test that shortcuts are checked in-process without a daemon
+        """
+        mock_query.return_value = None
+        mock_load.return_value = main.compile_shortcuts(SHORTCUTS)
+        result = main.find_matches('BZ1', 'bug')
+        self.assertEqual([(s['name'], m.render()) for s, m in result],
+                         [('bz', {'bash': 'open 1'})])
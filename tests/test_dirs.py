@@ -0,0 +1,32 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import dirs
+
+
+class TestDirs(TestCase):
+
+    @patch.dict('shellcut.dirs.os.environ', {'XDG_CACHE_HOME': '/xdg/cache'})
+    def test_xdg_dir_env(self):
+        """
+        Test that an absolute path from the environment is used
+        """
+        self.assertEqual(dirs.xdg_dir('XDG_CACHE_HOME', '~/.cache'),
+                         '/xdg/cache')
+
+    @patch.dict('shellcut.dirs.os.environ', {'XDG_CACHE_HOME': 'relative'})
+    def test_xdg_dir_relative(self):
+        """
+        Test that a relative path from the environment is ignored
+        """
+        self.assertEqual(dirs.xdg_dir('XDG_CACHE_HOME', '/default'),
+                         '/default')
+
+    @patch.dict('shellcut.dirs.os.environ', {}, clear=True)
+    def test_xdg_dir_default(self):
+        """
+        Test that the default is expanded when the variable is not set
+        """
+        self.assertEqual(dirs.xdg_dir('XDG_CACHE_HOME', '~/.cache'),
+                         dirs.os.path.expanduser('~/.cache'))
+        self.assertIsNone(dirs.xdg_dir('XDG_RUNTIME_DIR', None))
@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import threading
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut.engine import ShortcutEngine
+
+
+SHORTCUTS = [
+    {'name': 'bz', 'match': 'BZ{}', 'bash': 'open {}', 'label': 'bug'},
+    {'name': 'edit', 'regex': '^bashrc$', 'bash': 'vim ~/.bashrc'},
+    {'name': 'backup', 'regex': '^bashrc$', 'bash': 'cp ~/.bashrc /tmp',
+     'timeout': 5},
+]
+
+
+class TestShortcutEngine(TestCase):
+
+    def names(self, matches):
+        return [match.shortcut['name'] for match in matches]
+
+    def test_match_and_render(self):
+        """
+        Test that matches are returned in config order and rendered
+        """
+        engine = ShortcutEngine(SHORTCUTS)
+        matches = engine.match('bashrc')
+        self.assertEqual(self.names(matches), ['edit', 'backup'])
+        self.assertEqual(engine.render(matches[1]),
+                         {'bash': 'cp ~/.bashrc /tmp'})
+        self.assertEqual(matches[1].settings, {'timeout': 5})
+
+        self.assertEqual(engine.render(engine.match('bz42')[0]),
+                         {'bash': 'open 42'})
+        self.assertEqual(engine.match('nothing'), [])
+
+    def test_label(self):
+        """
+        Test that the label restricts the matched shortcuts
+        """
+        engine = ShortcutEngine(SHORTCUTS)
+        self.assertEqual(self.names(engine.match('BZ1', label='bug')), ['bz'])
+        self.assertEqual(engine.match('bashrc', label='bug'), [])
+
+    def test_no_output(self):
+        """
+        Test that lookups without matches neither print nor exit
+        """
+        engine = ShortcutEngine(SHORTCUTS)
+        with patch('builtins.print') as mock_print:
+            self.assertEqual(engine.match('nothing'), [])
+        mock_print.assert_not_called()
+
+    def test_invalid_pattern(self):
+        """
+        Test that invalid patterns are reported when the engine is created
+        """
+        import re
+
+        with self.assertRaises(re.error):
+            ShortcutEngine([{'name': 'broken', 'regex': '(', 'bash': 'x'}])
+
+    def test_config_dirs(self):
+        """
+        Test loading and reloading the shortcuts of config directories
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'a.yaml')
+            with open(path, 'w') as fd:
+                fd.write('shortcuts:\n- name: one\n  match: X{}\n'
+                         '  bash: echo {}\n')
+            cache_path = os.path.join(tmpdir, 'shortcuts.cache')
+            with patch('shellcut.cache.get_cache_path',
+                       return_value=cache_path):
+                engine = ShortcutEngine(configdirs=[tmpdir])
+                self.assertEqual(self.names(engine.match('X1')), ['one'])
+                old_shortcuts = engine.shortcuts
+
+                with open(path, 'w') as fd:
+                    fd.write('shortcuts:\n- name: two\n  match: X{}\n'
+                             '  bash: echo {}\n')
+                os.utime(path, (1, 1))
+                engine.reload()
+
+        self.assertEqual(self.names(engine.match('X1')), ['two'])
+        self.assertEqual([s['name'] for s in old_shortcuts], ['one'])
+
+    def test_threads(self):
+        """
+        Test that concurrent lookups get the same results as serial ones
+        """
+        sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..',
+                                        'benchmarks'))
+        self.addCleanup(sys.path.pop, 0)
+        from synthetic import generate_shortcuts, generate_inputs
+
+        shortcuts = generate_shortcuts(300)
+        inputs = generate_inputs(shortcuts, 200)
+        engine = ShortcutEngine(shortcuts)
+
+        def lookup(input_data):
+            return [(match.shortcut['name'], engine.render(match))
+                    for match in engine.match(input_data)]
+
+        expected = [lookup(input_data) for input_data in inputs]
+        # a fresh engine, so that the threads race on the first lookups
+        engine = ShortcutEngine(shortcuts)
+        results = [None] * 8
+        barrier = threading.Barrier(len(results))
+
+        def worker(i):
+            barrier.wait()
+            results[i] = [lookup(input_data) for input_data in inputs]
+
+        threads = [threading.Thread(target=worker, args=(i,))
+                   for i in range(len(results))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for result in results:
+            self.assertEqual(result, expected)
@@ -0,0 +1,277 @@
+import io
+import os
+import time
+import signal
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import executors
+
+
+class TestExecutors(TestCase):
+
+    def test_combine_statuses(self):
+        """
+        Test that the first failure is reported
+        """
+        self.assertEqual(executors.combine_statuses([0, 0]), 0)
+        self.assertEqual(executors.combine_statuses([0, 3, 1]), 3)
+        self.assertEqual(executors.combine_statuses([-9]), 137)
+
+    def test_run_sequential(self):
+        """
+        Test that sequential executors report the combined status
+        """
+        status = executors.run_sequential({'bash': 'exit 0',
+                                           'python': 'exit(4)'})
+        self.assertEqual(status, 4)
+
+    def test_run_sequential_timeout(self):
+        """
+        Test that an executor exceeding the timeout is killed
+        """
+        status = executors.run_sequential({'bash': 'sleep 5'}, timeout=0.1)
+        self.assertEqual(status, executors.TIMEOUT_STATUS)
+
+    def test_run_sequential_timeout_children(self):
+        """
+        Test that a timeout also kills what the executor started
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pidfile = os.path.join(tmpdir, 'pid')
+            status = executors.run_sequential({
+                'bash': 'sleep 30 & echo $! > {}; wait'.format(pidfile),
+            }, timeout=0.5)
+            with open(pidfile) as fd:
+                pid = int(fd.read())
+        self.assertEqual(status, executors.TIMEOUT_STATUS)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                break
+            time.sleep(0.01)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            self.fail('the child of the executor is still running')
+
+    @patch('shellcut.executors.subprocess.call')
+    def test_run_sequential_inprocess(self, mock_call):
+        """
+        Test that python scripts run in-process with their own namespace
+        """
+        mock_call.return_value = 0
+        status = executors.run_sequential({
+            'bash': 'true',
+            'python': 'import sys; x = 1; sys.exit(sys.argv != ["-c"])',
+        }, inprocess=True)
+
+        self.assertEqual(status, 0)
+        mock_call.assert_called_once_with(['bash', '-c', 'true'],
+                                          timeout=None)
+        self.assertNotIn('x', globals())
+
+    def test_run_python_inprocess_status(self):
+        """
+        Test that exit codes and exceptions give the statuses 'python -c'
+        exits with
+        """
+        run = executors.run_python_inprocess
+        self.assertEqual(run('pass'), 0)
+        self.assertEqual(run('exit(3)'), 3)
+        self.assertEqual(run('raise SystemExit'), 0)
+        with patch('sys.stderr', new_callable=io.StringIO) as mock_stderr:
+            self.assertEqual(run('raise SystemExit("bye")'), 1)
+            self.assertEqual(run('1 / 0'), 1)
+        self.assertIn('bye', mock_stderr.getvalue())
+        self.assertIn('File "<string>", line 1, in <module>',
+                      mock_stderr.getvalue())
+        self.assertIn('ZeroDivisionError', mock_stderr.getvalue())
+        self.assertNotIn('executors.py', mock_stderr.getvalue())
+
+    def test_run_parallel_output(self):
+        """
+        Test that the output of parallel executors is prefixed line by line
+        """
+        out = io.BytesIO()
+        err = io.BytesIO()
+        status = executors.run_parallel({
+            'bash': 'echo one; echo two; echo oops >&2',
+            'python': 'print("three")',
+        }, out=out, err=err)
+
+        self.assertEqual(status, 0)
+        self.assertCountEqual(out.getvalue().splitlines(),
+                              [b'[bash] one', b'[bash] two',
+                               b'[python] three'])
+        self.assertEqual(err.getvalue(), b'[bash] oops\n')
+
+    def test_run_parallel_concurrent(self):
+        """
+        Test that parallel executors run at the same time
+        """
+        start = time.monotonic()
+        status = executors.run_parallel({
+            'bash': 'sleep 0.5',
+            'python': 'import time; time.sleep(0.5)',
+        }, out=io.BytesIO(), err=io.BytesIO())
+        self.assertEqual(status, 0)
+        self.assertLess(time.monotonic() - start, 0.9)
+
+    def test_run_parallel_timeout(self):
+        """
+        Test that a timeout kills the executor and what it started
+        """
+        start = time.monotonic()
+        status = executors.run_parallel({
+            'bash': 'sleep 5; echo never',
+            'python': 'exit(2)',
+        }, timeout=0.2, out=io.BytesIO(), err=io.BytesIO())
+        self.assertEqual(status, executors.TIMEOUT_STATUS)
+        self.assertLess(time.monotonic() - start, 2)
+
+    @patch('shellcut.executors.run_sequential')
+    @patch('shellcut.executors.run_parallel')
+    def test_run_executors_default(self, mock_parallel, mock_sequential):
+        """
+        Test that executors run sequentially unless parallel is requested
+        """
+        executor_map = {'bash': 'a', 'python': 'b'}
+        executors.run_executors(executor_map)
+        mock_sequential.assert_called_once_with(executor_map, None, False)
+        mock_parallel.assert_not_called()
+
+        executors.run_executors(executor_map, parallel=True)
+        mock_parallel.assert_called_once_with(executor_map, None)
+
+    def test_match_settings(self):
+        """
+        Test that a match carries the execution settings of its shortcut
+        """
+        shortcut = main.Shortcut({'match': 'x', 'bash': 'a',
+                                  'parallel': True, 'label': 'l'})
+        match = main.get_match('x', shortcut)
+        self.assertEqual(match.settings, {'parallel': True})
+
+    def test_format_scripts(self):
+        """
+        Test that printed scripts are labelled only if there are several
+        """
+        self.assertEqual(executors.format_scripts({'bash': 'cd /tmp'}),
+                         'cd /tmp\n')
+        self.assertEqual(
+            executors.format_scripts({'bash': 'a\n', 'python': 'b'}),
+            '# bash\na\n# python\nb\n')
+
+    def test_quote(self):
+        """
+        Test that quoted words survive the shells
+        """
+        self.assertEqual(executors.quote('bash', "it's"), "'it'\"'\"'s'")
+        self.assertEqual(executors.quote('fish', "it's \\"), "'it\\'s \\\\'")
+
+    def test_eval_script(self):
+        """
+        Test that the script of the evaluating shell runs in it and the
+        others in child processes
+        """
+        import subprocess
+
+        script = executors.eval_script({
+            'bash': 'cd /\nX="it\'s"',
+            'python': 'print("python says \'hi\'")',
+        }, 'bash')
+        self.assertTrue(script.startswith('cd /\nX="it\'s"\npython -c '))
+        output = subprocess.check_output(
+            ['bash', '-c', 'cd /tmp; eval "$0"; echo "$PWD $X"', script],
+            universal_newlines=True)
+        self.assertEqual(output, "python says 'hi'\n/ it's\n")
+
+    @patch('shellcut.executors.os.execvp')
+    def test_exec_executor(self, mock_execvp):
+        """
+        Test that the process is replaced with the executor
+        """
+        executors.exec_executor('bash', 'echo 1')
+        mock_execvp.assert_called_once_with('bash', ['bash', '-c', 'echo 1'])
+
+
+class TestRunInput(TestCase):
+
+    SHORTCUTS = [
+        {'name': 'cd', 'match': 'cd {}', 'bash': 'cd {}'},
+        {'name': 'both', 'match': 'both {}', 'bash': 'echo {}',
+         'python': 'print({!r})'},
+        {'name': 'slow', 'match': 'slow {}', 'bash': 'sleep {}',
+         'timeout': 1},
+        {'name': 'pick', 'match': 'pick', 'bash': 'echo a'},
+        {'name': 'pick2', 'match': 'pick', 'bash': 'echo b'},
+    ]
+
+    def run_input(self, input_data, **options):
+        import argparse
+
+        args = argparse.Namespace(input=input_data, label=None, no_memo=True,
+                                  auto_pick=False, parallel=None,
+                                  timeout=None, inprocess=None,
+                                  exec_in_place=False, print_scripts=False,
+                                  eval_shell=None)
+        vars(args).update(options)
+        possible = main.check_shortcuts(
+            input_data, main.compile_shortcuts(self.SHORTCUTS))
+        with patch('shellcut.main.find_matches', return_value=possible):
+            return main.run_input(args)
+
+    @patch('shellcut.executors.run_executors', return_value=0)
+    @patch('shellcut.executors.exec_executor')
+    def test_exec(self, mock_exec, mock_run):
+        """
+        Test that --exec replaces s with a single executor without a timeout
+        """
+        # execvp doesn't return
+        mock_exec.side_effect = SystemExit
+        with self.assertRaises(SystemExit):
+            self.run_input('cd /tmp', exec_in_place=True)
+        mock_exec.assert_called_once_with('bash', 'cd /tmp')
+        mock_exec.reset_mock()
+
+        for input_data in ['both x', 'slow 1']:
+            self.run_input(input_data, exec_in_place=True)
+        mock_exec.assert_not_called()
+        self.assertEqual(mock_run.call_count, 2)
+
+    @patch('shellcut.executors.run_executors')
+    @patch('shellcut.main.get_input', return_value='2')
+    def test_eval(self, mock_input, mock_run):
+        """
+        Test that --eval prints the script, and prompts on stderr
+        """
+        with patch('sys.stdout', new_callable=io.StringIO) as out, \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            self.assertEqual(self.run_input('pick', eval_shell='bash'), 0)
+            self.assertEqual(self.run_input('both x', print_scripts=True), 0)
+
+        self.assertEqual(out.getvalue(),
+                         "echo b\n# bash\necho x\n# python\nprint('x')\n")
+        self.assertIn('Choose one:', err.getvalue())
+        mock_run.assert_not_called()
+
+    @patch('shellcut.main.get_input', return_value='1')
+    def test_print_prompt(self, mock_input):
+        """
+        Test that --print prompts and reports no match on stderr
+        """
+        with patch('sys.stdout', new_callable=io.StringIO) as out, \
+                patch('sys.stderr', new_callable=io.StringIO) as err:
+            self.assertEqual(self.run_input('pick', print_scripts=True), 0)
+            with self.assertRaises(SystemExit):
+                self.run_input('nothing', print_scripts=True)
+
+        self.assertEqual(out.getvalue(), 'echo a\n')
+        self.assertIn('Choose one:', err.getvalue())
+        self.assertIn('Input matches none of the patterns', err.getvalue())
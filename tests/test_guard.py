@@ -0,0 +1,176 @@
+import io
+import os
+import json
+import time
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import batch
+from shellcut import guard
+
+
+SLOW_REGEX = r'^(a+)+$'
+
+SLOW_INPUT = 'a' * 40 + 'b'
+
+
+class TestAnalyzeRegex(TestCase):
+
+    def test_flagged(self):
+        """
+        Test that patterns prone to catastrophic backtracking are flagged
+        """
+        for pattern, problem in [
+                (SLOW_REGEX, 'nested quantifier'),
+                (r'(\w+\s?)*x', 'nested quantifier'),
+                (r'(?:a*)*b', 'nested quantifier'),
+                (r'(x+x+)+y', 'adjacent overlapping quantifiers'),
+                (r'(a|aa)*b', 'quantified alternation of ambiguous branches'),
+                (r'x(ab|a.)*y',
+                 'quantified alternation of ambiguous branches')]:
+            self.assertEqual(guard.analyze_regex(pattern), [problem],
+                             pattern)
+
+    def test_not_flagged(self):
+        """
+        Test that common safe patterns are not flagged
+        """
+        for pattern in [r'^https://github.com/([\w-]+)/([\w-]+).*$',
+                        r'(\w+\s)*', r'(ab|a)*', r'^(a|b|c)+$', r'\d+\d+',
+                        r'(\d|x)+', r'^bashrc$', '[']:
+            self.assertEqual(guard.analyze_regex(pattern), [], pattern)
+
+    def test_load_config_file_warns(self):
+        """
+        Test that loading a config file warns about slow regexes
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'a.yaml')
+            with open(filename, 'w') as fd:
+                fd.write("shortcuts:\n- name: slow\n  regex: '{}'\n"
+                         "- name: fine\n  regex: ['^x$']\n".format(
+                             SLOW_REGEX))
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+                main.load_config_file(filename)
+
+        self.assertEqual(len(stderr.getvalue().splitlines()), 1)
+        self.assertIn("shortcut 'slow'", stderr.getvalue())
+        self.assertIn('nested quantifier', stderr.getvalue())
+
+
+class TestGuard(TestCase):
+
+    def setUp(self):
+        self.addCleanup(guard.disable)
+        self.shortcuts = main.compile_shortcuts([
+            {'name': 'slow', 'regex': SLOW_REGEX, 'bash': 'echo slow'},
+            {'name': 'fast', 'match': 'a{}', 'bash': 'echo {}'},
+        ])
+
+    def test_budget(self):
+        """
+        Test that a pattern exceeding the budget is skipped and reported
+        """
+        checker = guard.enable(0.05)
+        start = time.monotonic()
+        with patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            possible = main.check_shortcuts(SLOW_INPUT, self.shortcuts)
+            main.check_shortcuts(SLOW_INPUT, self.shortcuts)
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual([shortcut['name'] for shortcut, _ in possible],
+                         ['fast'])
+        self.assertEqual(possible[0][1].render(), {'bash': 'echo ' +
+                                                   SLOW_INPUT[1:]})
+        # reported once
+        self.assertEqual(len(stderr.getvalue().splitlines()), 1)
+        self.assertIn('skipped pattern', stderr.getvalue())
+
+        report = checker.report()
+        self.assertEqual(report[0]['shortcut'], 'slow')
+        self.assertEqual(report[0]['calls'], 2)
+        self.assertEqual(report[0]['timeouts'], 2)
+        self.assertEqual(report[1]['pattern'], 'a{}')
+
+    def test_budget_dispatcher(self):
+        """
+        Test that the budget applies while a compiled dispatcher is up to
+        date, and the daemon isn't asked
+        """
+        from shellcut import compiler
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'a.yaml'), 'w') as fd:
+                fd.write("shortcuts:\n- name: slow\n  regex: '{}'\n"
+                         "  bash: echo slow\n".format(SLOW_REGEX))
+            path = os.path.join(tmpdir, 'dispatch.py')
+            with patch('sys.stderr', new_callable=io.StringIO) as stderr, \
+                    patch('shellcut.main.get_config_dirs',
+                          return_value=[tmpdir]), \
+                    patch('shellcut.compiler.get_dispatcher_path',
+                          return_value=path), \
+                    patch('shellcut.cache.get_cache_path',
+                          return_value=os.path.join(tmpdir, 'cache')), \
+                    patch('shellcut.catalog.open_catalog',
+                          return_value=None), \
+                    patch('shellcut.daemon.query') as mock_query:
+                compiler.write_dispatcher([tmpdir], path)
+                self.assertIsNotNone(compiler.load_dispatcher([tmpdir], path))
+
+                guard.enable(0.05)
+                start = time.monotonic()
+                possible = main.find_matches(SLOW_INPUT)
+
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(possible, [])
+        self.assertIn('skipped pattern', stderr.getvalue())
+        mock_query.assert_not_called()
+
+    def test_costs_without_budget(self):
+        """
+        Test that patterns are only counted without a budget
+        """
+        checker = guard.enable()
+        possible = main.check_shortcuts('aaa', self.shortcuts)
+        self.assertEqual(len(possible), 2)
+
+        costs = checker.take_costs()
+        self.assertEqual(sorted(cost[:3] for cost in costs),
+                         [('fast', 'a{}', 1), ('slow', SLOW_REGEX, 1)])
+        self.assertEqual(checker.report(), [])
+
+        checker.add_costs(costs)
+        checker.add_costs(costs)
+        self.assertEqual([entry['calls'] for entry in checker.report()],
+                         [2, 2])
+
+    def test_batch_costs(self):
+        """
+        Test that batch mode reports the pattern costs of all workers
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'a.yaml'), 'w') as fd:
+                fd.write("shortcuts:\n- name: slow\n  regex: '{}'\n"
+                         "  bash: x\n".format(SLOW_REGEX))
+            cache_path = os.path.join(tmpdir, 'shortcuts.cache')
+            for jobs in (1, 2):
+                out = io.StringIO()
+                with patch('shellcut.cache.get_cache_path',
+                           return_value=cache_path), \
+                        patch('sys.stderr',
+                              new_callable=io.StringIO) as stderr:
+                    batch.run_batch(io.StringIO('aa\n{}\n'.format(SLOW_INPUT)),
+                                    out, jobs=jobs, configdirs=[tmpdir],
+                                    regex_budget=0.05, regex_costs=True)
+
+                records = [json.loads(line)
+                           for line in out.getvalue().splitlines()]
+                self.assertEqual([len(record['matches'])
+                                  for record in records], [1, 0])
+                report = json.loads(stderr.getvalue().splitlines()[-1])
+                self.assertEqual(report['regex_costs'][0]['calls'], 2)
+                self.assertEqual(report['regex_costs'][0]['timeouts'], 1)
+                self.assertIsNone(guard.active)
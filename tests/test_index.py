@@ -0,0 +1,298 @@
+import os
+import random
+
+from unittest import TestCase
+
+from shellcut import main
+from shellcut import index
+
+
+class TestLiteralPrefix(TestCase):
+
+    def test_template_literal_prefix(self):
+        """
+        Test that the prefix of a parse template ends at the first field
+        """
+        self.assertEqual(index.template_literal_prefix('BZ{}'), 'BZ')
+        self.assertEqual(
+            index.template_literal_prefix('https://github.com/{}/{}'),
+            'https://github.com/')
+        self.assertEqual(index.template_literal_prefix('{} x'), '')
+        self.assertEqual(index.template_literal_prefix('a{{b}}{c:d}'), 'a{b}')
+        self.assertEqual(index.template_literal_prefix('no fields'),
+                         'no fields')
+
+    def test_regex_literal_prefix(self):
+        """
+        Test that the literal prefix of a regex is extracted conservatively
+        """
+        cases = {
+            r'^https://github.com/([\w-]+)': 'https://github',
+            r'^https://github\.com/([\w-]+)': 'https://github.com/',
+            r'^bashrc$': 'bashrc',
+            r'ab?c': 'a',
+            r'ab*c': 'a',
+            r'ab{2}': 'a',
+            r'ab+c': 'ab',
+            r'a|b': '',
+            r'ab(c|d)': 'ab',
+            r'[|]x': '',
+            r'\d+': '',
+            r'(?i)abc': '',
+            r'x\\y': 'x\\y',
+        }
+        for pattern, prefix in cases.items():
+            self.assertEqual(index.regex_literal_prefix(pattern), prefix,
+                             pattern)
+
+    def test_template_literals(self):
+        """
+        Test that all literal texts between template fields are returned
+        """
+        self.assertEqual(
+            index.template_literals('https://github.com/{}/pull/{:d}'),
+            ['https://github.com/', '/pull/'])
+        self.assertEqual(index.template_literals('{}x{{y}}{z}'), ['x{y}'])
+        self.assertEqual(index.template_literals('{}'), [])
+
+    def test_regex_literals(self):
+        """
+        Test that only literals required outside of groups are returned
+        """
+        cases = {
+            r'^https://github\.com/([\w-]+)/pull/([0-9]+)$':
+                ['https://github.com/', '/pull/'],
+            r'ab+c': ['ab', 'c'],
+            r'ab?cd': ['a', 'cd'],
+            r'a{2,3}bc': ['bc'],
+            r'x[abc]yz(q)?w': ['x', 'yz', 'w'],
+            r'a|b': [],
+            r'(?i)abc': [],
+        }
+        for pattern, literals in cases.items():
+            self.assertEqual(index.regex_literals(pattern), literals,
+                             pattern)
+
+    def test_literal_automaton(self):
+        """
+        Test that the automaton finds all contained literals, including
+        overlapping ones
+        """
+        automaton = index.LiteralAutomaton()
+        for literal_id, literal in enumerate(['he', 'she', 'his', 'hers']):
+            automaton.add(literal, literal_id)
+
+        found = set()
+        automaton.find('ushers', found)
+        self.assertEqual(found, {0, 1, 3})
+
+    def test_literal_automaton_fold(self):
+        """
+        Test that the case-insensitive automaton ignores ASCII case and keeps
+        all literals for non-ASCII text
+        """
+        automaton = index.LiteralAutomaton(fold=True)
+        automaton.add('bz', 0)
+        automaton.add('xy', 1)
+
+        found = set()
+        automaton.find('aBZ', found)
+        self.assertEqual(found, {0})
+
+        found = set()
+        automaton.find('\u00e9', found)
+        self.assertEqual(found, {0, 1})
+
+    def test_has_top_level_alternation(self):
+        """
+        Test that only an alternation outside of groups and sets is found
+        """
+        self.assertTrue(index.has_top_level_alternation('a|b'))
+        self.assertTrue(index.has_top_level_alternation('(a)|b'))
+        self.assertFalse(index.has_top_level_alternation('(a|b)'))
+        self.assertFalse(index.has_top_level_alternation('[|]'))
+        self.assertFalse(index.has_top_level_alternation('[]|]'))
+        self.assertFalse(index.has_top_level_alternation(r'a\|b'))
+
+
+class TestShortcutIndex(TestCase):
+
+    def check_same_as_linear(self, shortcuts, inputs, labels=(None,)):
+        shortcut_index = index.ShortcutIndex(shortcuts)
+        for input_data in inputs:
+            for label in labels:
+                self.assertEqual(
+                    main.check_shortcuts(input_data, shortcuts, label,
+                                         index=shortcut_index),
+                    main.check_shortcuts(input_data, shortcuts, label),
+                    (input_data, label))
+
+    def test_candidates_label(self):
+        """
+        Test that a labelled lookup only returns shortcuts with the label
+        """
+        shortcuts = main.compile_shortcuts([
+            {'name': 'edit', 'regex': '^bashrc$', 'label': ['edit']},
+            {'name': 'backup', 'regex': '^bashrc$', 'label': 'backup'},
+            {'name': 'any', 'regex': '.*', 'label': ['edit', 'x']},
+            {'name': 'nolabel', 'regex': '.*'},
+        ])
+        shortcut_index = index.ShortcutIndex(shortcuts)
+
+        self.assertEqual(shortcut_index.candidates('bashrc'), [0, 1, 2, 3])
+        self.assertEqual(shortcut_index.candidates('bashrc', 'edit'), [0, 2])
+        self.assertEqual(shortcut_index.candidates('bashrc', 'backup'), [1])
+        self.assertEqual(shortcut_index.candidates('bashrc', 'x'), [2])
+        self.assertEqual(shortcut_index.candidates('bashrc', 'nope'), [])
+
+        stats = {}
+        shortcut_index.candidates('zshrc', 'edit', stats)
+        self.assertEqual(stats['pruned_by_label'], 2)
+        self.assertEqual(stats['pruned_by_prefix'], 1)
+        self.assertEqual(stats['candidates'], 1)
+
+    def test_candidates(self):
+        """
+        Test that only shortcuts with a matching prefix are candidates
+        """
+        shortcuts = main.compile_shortcuts([
+            {'name': 'bz', 'match': 'BZ{}'},
+            {'name': 'gh', 'regex': '^https://github.com/(.*)$'},
+            {'name': 'any', 'regex': '.*'},
+            {'name': 'multi', 'match': ['x{}', '{}y']},
+        ])
+        shortcut_index = index.ShortcutIndex(shortcuts)
+
+        self.assertEqual(shortcut_index.candidates('BZ123'), [0, 2])
+        self.assertEqual(shortcut_index.candidates('bz123'), [0, 2])
+        self.assertEqual(shortcut_index.candidates('BZ12y'), [0, 2, 3])
+        self.assertEqual(shortcut_index.candidates('https://github.com/a'),
+                         [1, 2])
+
+    def test_candidates_stats(self):
+        """
+        Test that the number of pruned shortcuts is reported
+        """
+        shortcuts = main.compile_shortcuts([
+            {'name': 'bz', 'match': 'BZ{}'},
+            {'name': 'pr', 'match': 'https://github.com/{}/pull/{}'},
+            {'name': 'any', 'regex': '.*'},
+        ])
+        shortcut_index = index.ShortcutIndex(shortcuts)
+
+        stats = {}
+        candidates = shortcut_index.candidates('https://github.com/a/b',
+                                               stats=stats)
+        self.assertEqual(candidates, [2])
+        self.assertEqual(stats, {
+            'shortcuts': 3,
+            'pruned_by_label': 0,
+            'pruned_by_prefix': 1,
+            'pruned_by_literal': 1,
+            'candidates': 1,
+        })
+
+    def test_case_insensitive_match(self):
+        """
+        Test that match conditions are indexed case-insensitively, like the
+        parse module matches them
+        """
+        shortcuts = main.compile_shortcuts([
+            {'name': 'bz', 'match': 'BZ{}', 'bash': '{}'},
+            {'name': 'k', 'match': 'k{}', 'bash': '{}'},
+        ])
+        self.check_same_as_linear(
+            shortcuts, ['bz1', 'Bz1', 'BZ1', 'k1', 'K1', 'K1', 'x1'])
+
+    def test_first_characters(self):
+        """
+        Test that the first characters of all prefixes are collected, in
+        both cases for match conditions
+        """
+        shortcuts = main.compile_shortcuts([
+            {'name': 'bz', 'match': 'BZ{}', 'bash': '{}'},
+            {'name': 'rc', 'regex': '^bashrc$', 'bash': 'x'},
+            {'name': 'dot', 'regex': '^\\.x', 'bash': 'x'},
+        ])
+        self.assertEqual(index.ShortcutIndex(shortcuts).first_characters(),
+                         {'b', 'B', '.'})
+        shortcuts += main.compile_shortcuts([
+            {'name': 'any', 'regex': '.*', 'bash': 'x'},
+        ])
+        self.assertIsNone(index.ShortcutIndex(shortcuts).first_characters())
+
+    def test_default_config(self):
+        """
+        Test that the index gives the same results as checking every shortcut
+        for the default config
+        """
+        config_dir = os.path.join(os.path.dirname(main.__file__), 'config')
+        shortcuts = main.compile_shortcuts(main.load_shortcuts([config_dir]))
+        self.check_same_as_linear(shortcuts, [
+            'BZ1234',
+            'https://github.com/radomirbosak/shellcut',
+            'https://github.com/radomirbosak/shellcut/pull/12',
+            'bashrc',
+            'nothing',
+        ], labels=[None, 'bug', 'clone', 'bashrc', 'backup', 'nope'])
+
+    def test_random_shortcuts(self):
+        """
+        Test that the index gives the same results as checking every shortcut
+        for randomly generated patterns and inputs
+        """
+        rnd = random.Random(0)
+        alphabet = 'abAB'
+        raw = []
+        for i in range(200):
+            literal = ''.join(rnd.choice(alphabet)
+                              for _ in range(rnd.randint(0, 3)))
+            if i % 2:
+                shortcut = {'name': str(i), 'match': literal + '{}',
+                            'bash': '{}'}
+            else:
+                shortcut = {'name': str(i), 'regex': literal + '(.*)b?',
+                            'bash': '{}'}
+            if i % 3:
+                shortcut['label'] = rnd.sample(['l1', 'l2', 'l3'], i % 3)
+            raw.append(shortcut)
+        inputs = [''.join(rnd.choice(alphabet)
+                          for _ in range(rnd.randint(0, 5)))
+                  for _ in range(200)]
+        self.check_same_as_linear(main.compile_shortcuts(raw), inputs,
+                                  labels=[None, 'l1', 'l3', 'l4'])
+
+    def test_labelled_candidates(self):
+        """
+        Test that a labelled lookup selects the same candidates as an
+        unlabelled one restricted to the label
+        """
+        rnd = random.Random(1)
+        alphabet = 'abkAB/\u212a'
+        raw = []
+        for i in range(200):
+            literal = ''.join(rnd.choice(alphabet)
+                              for _ in range(rnd.randint(0, 3)))
+            other = ''.join(rnd.choice(alphabet)
+                            for _ in range(rnd.randint(0, 2)))
+            if i % 2:
+                shortcut = {'match': literal + '{}' + other + '{}'}
+            else:
+                shortcut = {'regex': literal + '(.*)' + other}
+            shortcut['label'] = rnd.sample(['l1', 'l2', 'l3'], i % 3)
+            raw.append(shortcut)
+        shortcut_index = index.ShortcutIndex(main.compile_shortcuts(raw))
+        for _ in range(200):
+            input_data = ''.join(rnd.choice(alphabet)
+                                 for _ in range(rnd.randint(0, 6)))
+            for label in ['l1', 'l2', 'l4']:
+                stats = {}
+                candidates = shortcut_index.candidates(input_data, label,
+                                                       stats)
+                self.assertEqual(
+                    candidates,
+                    [shortcut_id for shortcut_id
+                     in shortcut_index.candidates(input_data)
+                     if label in raw[shortcut_id]['label']],
+                    (input_data, label))
+                self.assertEqual(stats['candidates'], len(candidates))
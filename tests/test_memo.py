@@ -0,0 +1,197 @@
+import os
+import argparse
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import memo
+
+
+CONFIG = """\
+shortcuts:
+- name: bz
+  match: BZ{}
+  bash: open {}
+- name: edit
+  regex: ^bashrc$
+  bash: vim ~/.bashrc
+- name: backup
+  regex: ^bashrc$
+  bash: cp ~/.bashrc /tmp
+"""
+
+
+class TestMemo(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.configdir = os.path.join(self.tmpdir.name, 'config')
+        os.mkdir(self.configdir)
+        self.config = os.path.join(self.configdir, 'a.yaml')
+        with open(self.config, 'w') as fd:
+            fd.write(CONFIG)
+        self.path = os.path.join(self.tmpdir.name, 'memo')
+
+        for target, value in [
+                ('shellcut.main.get_config_dirs', [self.configdir]),
+                ('shellcut.memo.get_memo_path', self.path),
+                ('shellcut.cache.get_cache_path',
+                 os.path.join(self.tmpdir.name, 'shortcuts.cache')),
+                ('shellcut.compiler.get_dispatcher_path',
+                 os.path.join(self.tmpdir.name, 'dispatch.py')),
+                ('shellcut.daemon.query', None)]:
+            patcher = patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def names(self, possible):
+        return [shortcut['name'] for shortcut, _ in possible]
+
+    def test_lru(self):
+        """
+        Test that the least recently used lookups are dropped
+        """
+        remembered = memo.Memo(())
+        with patch('shellcut.memo.MEMO_SIZE', 2):
+            remembered.store('a', None, [(0, {'name': 'x'})])
+            remembered.store('b', None, [])
+            self.assertEqual(remembered.lookup('a'), [{'name': 'x'}])
+            remembered.store('c', 'label', [])
+
+        self.assertIsNone(remembered.lookup('b'))
+        self.assertEqual(remembered.lookup('a'), [{'name': 'x'}])
+        self.assertEqual(remembered.lookup('c', 'label'), [])
+        self.assertIsNone(remembered.lookup('c'))
+
+    def test_find_matches(self):
+        """
+        Test that a repeated input is only checked against the shortcuts it
+        matched before
+        """
+        remembered = memo.load_memo([self.configdir])
+        possible = main.find_matches('bashrc', memo=remembered)
+        self.assertEqual(self.names(possible), ['edit', 'backup'])
+        self.assertEqual(main.find_matches('nothing', memo=remembered), [])
+        self.assertTrue(remembered.save())
+
+        remembered = memo.load_memo([self.configdir])
+        with patch('shellcut.main.load_compiled_shortcuts') as mock_load:
+            possible = main.find_matches('bashrc', memo=remembered)
+            self.assertEqual([m.render() for _, m in possible],
+                             [{'bash': 'vim ~/.bashrc'},
+                              {'bash': 'cp ~/.bashrc /tmp'}])
+            self.assertEqual(main.find_matches('nothing', memo=remembered), [])
+        mock_load.assert_not_called()
+
+    def test_mixed_labels(self):
+        """
+        Test that a label list mixing YAML types is remembered in its order
+        """
+        with open(self.config, 'a') as fd:
+            fd.write('- name: mixed\n'
+                     '  regex: ^mixed$\n'
+                     '  label: [2019, review]\n'
+                     '  bash: echo mixed\n')
+        remembered = memo.load_memo([self.configdir])
+        possible = main.find_matches('mixed', memo=remembered)
+        self.assertEqual(self.names(possible), ['mixed'])
+        self.assertEqual(possible[0][0]['label'], [2019, 'review'])
+        self.assertEqual(
+            self.names(main.find_matches('mixed', 'review', remembered)),
+            ['mixed'])
+
+    def test_config_change(self):
+        """
+        Test that changing a config file drops the lookups, but not the
+        usage counts
+        """
+        remembered = memo.load_memo([self.configdir])
+        remembered.store('bashrc', None, [])
+        remembered.record_use({'name': 'edit'})
+        remembered.save()
+        self.assertEqual(memo.load_memo([self.configdir]).lookup('bashrc'),
+                         [])
+
+        with open(self.config, 'a') as fd:
+            fd.write('- name: new\n  match: x\n  bash: x\n')
+        remembered = memo.load_memo([self.configdir])
+        self.assertIsNone(remembered.lookup('bashrc'))
+        self.assertEqual(remembered.counts, {'edit': 1})
+
+    def test_corrupt(self):
+        """
+        Test that a corrupt memo file is ignored
+        """
+        with open(self.path, 'wb') as fd:
+            fd.write(b'garbage')
+        remembered = memo.load_memo([self.configdir])
+        self.assertEqual(remembered.counts, {})
+        self.assertIsNone(remembered.lookup('bashrc'))
+
+    def test_rank_and_dominant(self):
+        """
+        Test that the most used shortcuts come first, and that only a clearly
+        dominant one is picked
+        """
+        remembered = memo.Memo((), counts={'b': 4, 'c': 1})
+        possible = [({'name': 'a'}, 1), ({'name': 'b'}, 2),
+                    ({'name': 'c'}, 3)]
+        self.assertEqual(remembered.rank(possible),
+                         [possible[1], possible[2], possible[0]])
+        # too few uses
+        self.assertIsNone(remembered.dominant(possible))
+
+        remembered.counts['b'] = 5
+        # 5 of 6 uses
+        self.assertEqual(remembered.dominant(possible), possible[1])
+        remembered.counts['c'] = 2
+        self.assertIsNone(remembered.dominant(possible))
+        self.assertIsNone(remembered.dominant([]))
+
+    @patch('shellcut.executors.run_executors', return_value=0)
+    @patch('shellcut.main.get_input', return_value='1')
+    def test_run_input(self, mock_input, mock_run):
+        """
+        Test that runs are counted, and that the dominant shortcut is run
+        without asking with auto-pick
+        """
+        args = argparse.Namespace(input='bashrc', label=None, no_memo=False,
+                                  auto_pick=True, parallel=None,
+                                  timeout=None, inprocess=None,
+                                  exec_in_place=False, print_scripts=False,
+                                  eval_shell=None)
+        with patch('builtins.print'):
+            for _ in range(memo.AUTO_PICK_USES):
+                # the first choice, then the most used one
+                main.run_input(args)
+            self.assertEqual(mock_input.call_count, memo.AUTO_PICK_USES)
+            self.assertEqual(memo.load_memo([self.configdir]).counts,
+                             {'edit': memo.AUTO_PICK_USES})
+
+            main.run_input(args)
+        self.assertEqual(mock_input.call_count, memo.AUTO_PICK_USES)
+        mock_run.assert_called_with({'bash': 'vim ~/.bashrc'})
+
+        # offered first without auto-pick
+        mock_input.return_value = '2'
+        args.auto_pick = False
+        with patch('builtins.print'):
+            main.run_input(args)
+        mock_run.assert_called_with({'bash': 'cp ~/.bashrc /tmp'})
+
+    def test_run_input_no_match(self):
+        """
+        Test that a lookup without matches is saved although s exits
+        """
+        args = argparse.Namespace(input='nothing', label=None, no_memo=False,
+                                  auto_pick=False, parallel=None,
+                                  timeout=None, inprocess=None,
+                                  exec_in_place=False, print_scripts=False,
+                                  eval_shell=None)
+        with patch('builtins.print'), self.assertRaises(SystemExit):
+            main.run_input(args)
+        self.assertEqual(memo.load_memo([self.configdir]).lookup('nothing'),
+                         [])
@@ -0,0 +1,88 @@
+import threading
+
+from unittest import TestCase
+
+from shellcut import pool
+
+
+class TestShellPool(TestCase):
+
+    def setUp(self):
+        self.pool = pool.ShellPool(size=2, max_runs=3)
+        self.addCleanup(self.pool.close)
+
+    def test_run_output(self):
+        """
+        Test that output, stderr and exit status of a script are captured
+        """
+        status, output = self.pool.run('bash', 'echo one\necho two >&2')
+        self.assertEqual((status, output), (0, b'one\ntwo\n'))
+
+        status, output = self.pool.run('bash', 'printf partial; exit 3')
+        self.assertEqual((status, output), (3, b'partial'))
+
+    def test_run_isolated(self):
+        """
+        Test that scripts don't see the state left by previous scripts
+        """
+        self.pool.run('bash', 'cd /; X=1; f() { :; }')
+        status, output = self.pool.run(
+            'bash', 'echo "$X"; type f >/dev/null 2>&1 || echo nof')
+        self.assertEqual(output, b'\nnof\n')
+
+    def test_worker_reused(self):
+        """
+        Test that successful scripts run in the same shell
+        """
+        _, first = self.pool.run('bash', 'echo $$')
+        _, second = self.pool.run('bash', 'echo $$')
+        self.assertEqual(first, second)
+
+    def test_worker_recycled_after_failure(self):
+        """
+        Test that the shell is replaced after a failed script
+        """
+        _, first = self.pool.run('bash', 'echo $$; false')
+        _, second = self.pool.run('bash', 'echo $$')
+        self.assertNotEqual(first.split()[0], second.split()[0])
+
+    def test_worker_recycled_after_max_runs(self):
+        """
+        Test that the shell is replaced after max_runs scripts
+        """
+        pids = [self.pool.run('bash', 'echo $$')[1] for _ in range(4)]
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[3], pids[0])
+
+    def test_worker_died(self):
+        """
+        Test that a shell dying in the middle of a script is reported and
+        replaced
+        """
+        status, output = self.pool.run('bash', 'echo bye; kill -9 $$')
+        self.assertEqual((status, output), (-9, b'bye\n'))
+        self.assertEqual(self.pool.run('bash', 'echo hi'), (0, b'hi\n'))
+
+    def test_concurrent_runs(self):
+        """
+        Test that concurrent runs use at most 'size' shells
+        """
+        outputs = []
+
+        def run():
+            outputs.append(self.pool.run('bash', 'sleep 0.1; echo $$')[1])
+
+        threads = [threading.Thread(target=run) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(outputs), 6)
+        self.assertLessEqual(len(set(outputs)), 2)
+
+    def test_unknown_shell(self):
+        """
+        Test that only supported shells can be pooled
+        """
+        with self.assertRaises(ValueError):
+            self.pool.run('python', 'print(1)')
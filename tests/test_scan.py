@@ -0,0 +1,156 @@
+import io
+import os
+import json
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import scan
+from shellcut.index import ShortcutIndex
+
+
+SHORTCUTS = [
+    {'name': 'bz', 'match': 'BZ{:d}', 'bash': 'open {}', 'label': 'bug'},
+    {'name': 'pr', 'regex': '^https://github.com/([\\w-]+)/([\\w-]+)/pull/'
+                            '([0-9]+)$', 'bash': 'open {}'},
+    {'name': 'ticket', 'regex': '^T-[0-9]+:$', 'bash': 'open {}'},
+]
+
+TEXT = ('build started\nfailed, see (BZ1234).\n'
+        'fix: https://github.com/a/b/pull/7, retry bz99\n'
+        'T-1: done \xe9 BZ5\n').encode() + b'\xff BZ1234\n'
+
+
+class TestScan(TestCase):
+
+    def setUp(self):
+        self.shortcuts = main.compile_shortcuts(SHORTCUTS)
+        self.index = ShortcutIndex(self.shortcuts)
+
+    def scan(self, data, label=None):
+        return list(scan.scan_buffer(data, self.shortcuts, self.index, label))
+
+    def test_scan_buffer(self):
+        """
+        Test that matching tokens are found with their offsets, without the
+        punctuation around them
+        """
+        found = self.scan(TEXT)
+        self.assertEqual([(text, names) for _, text, names in found], [
+            ('BZ1234', ['bz']),
+            ('https://github.com/a/b/pull/7', ['pr']),
+            ('bz99', ['bz']),
+            ('T-1:', ['ticket']),
+            ('BZ5', ['bz']),
+            ('BZ1234', ['bz']),
+        ])
+        for offset, text, _ in found:
+            self.assertEqual(TEXT[offset:offset + len(text)], text.encode())
+
+    def test_prefilter(self):
+        """
+        Test that skipping tokens by their first character finds the same
+        tokens as checking all of them
+        """
+        shortcuts = main.compile_shortcuts(
+            SHORTCUTS + [{'name': 'kelvin', 'match': 'kelvin{}',
+                          'bash': 'echo {}'}])
+        index = ShortcutIndex(shortcuts)
+        self.assertIsNotNone(index.first_characters())
+        text = TEXT + '[\u212aelvin1] Kelvin2 xkelvin3'.encode()
+
+        found = list(scan.scan_buffer(text, shortcuts, index))
+        with patch.object(index, 'first_characters', return_value=None):
+            self.assertEqual(
+                list(scan.scan_buffer(text, shortcuts, index)), found)
+        self.assertEqual([text for _, text, _ in found[-2:]],
+                         ['\u212aelvin1', 'Kelvin2'])
+
+    def test_embedded(self):
+        """
+        Test that text embedded in a token after a non-alphanumeric
+        character is found, with its offset in the buffer
+        """
+        data = (b'url=https://github.com/a/b/pull/7 PR:BZ12, xBZ3 '
+                b'a=b=(BZ4)')
+        found = self.scan(data)
+        self.assertEqual([(text, names) for _, text, names in found], [
+            ('https://github.com/a/b/pull/7', ['pr']),
+            ('BZ12', ['bz']),
+            ('BZ4', ['bz']),
+        ])
+        for offset, text, _ in found:
+            self.assertEqual(data[offset:offset + len(text)], text.encode())
+        with patch.object(self.index, 'first_characters', return_value=None):
+            self.assertEqual(self.scan(data), found)
+
+    def test_label(self):
+        """
+        Test that the label restricts the shortcuts
+        """
+        self.assertEqual([text for _, text, _ in self.scan(TEXT, 'bug')],
+                         ['BZ1234', 'bz99', 'BZ5', 'BZ1234'])
+
+    @patch('shellcut.scan.MAX_TOKEN_LENGTH', 5)
+    def test_long_tokens(self):
+        """
+        Test that overlong tokens are skipped
+        """
+        self.assertEqual([text for _, text, _ in self.scan(b'BZ1 BZ123456')],
+                         ['BZ1'])
+
+    def test_scan_file(self):
+        """
+        Test scanning a file from the command line
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            configdir = os.path.join(tmpdir, 'config')
+            os.mkdir(configdir)
+            with open(os.path.join(configdir, 'a.yaml'), 'w') as fd:
+                json.dump({'shortcuts': SHORTCUTS}, fd)
+            filename = os.path.join(tmpdir, 'log')
+            with open(filename, 'wb') as fd:
+                fd.write(TEXT)
+            empty = os.path.join(tmpdir, 'empty')
+            open(empty, 'w').close()
+
+            with patch('shellcut.main.get_config_dirs',
+                       return_value=[configdir]), \
+                    patch('shellcut.cache.get_cache_path',
+                          return_value=os.path.join(tmpdir, 'cache')), \
+                    patch('sys.argv', ['s', '--scan', filename, '--label',
+                                       'bug']), \
+                    patch('sys.stdout', new_callable=io.StringIO) as out:
+                main.main()
+                self.assertEqual(scan.scan_file(empty, out), 0)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0], {'offset': 27, 'text': 'BZ1234',
+                                      'shortcuts': ['bz']})
+
+    def test_memory(self):
+        """
+        Test that memory use doesn't grow with the size of the file
+        """
+        import tracemalloc
+
+        line = b'2020-01-01 INFO request BZ42 took 12ms, see log\n'
+        with tempfile.TemporaryFile() as fd:
+            fd.write(line * 40000)
+            fd.flush()
+            import mmap
+            buffer = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+            tracemalloc.start()
+            try:
+                count = sum(1 for _ in scan.scan_buffer(
+                    buffer, self.shortcuts, self.index))
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+                buffer.close()
+
+        self.assertEqual(count, 40000)
+        self.assertLess(peak, 256 * 1024)
@@ -1,8 +1,11 @@
 import os
+import sys
 import textwrap
 import tempfile
+import subprocess
 
 from unittest import TestCase
+from concurrent.futures import ProcessPoolExecutor
 from unittest.mock import patch
 
 from shellcut import main
@@ -112,7 +115,7 @@ class TestShellcut(TestCase):
         }
 
         result = main.get_match('input_data', shortcut, label='l2')
-        self.assertEqual(result, {'bash': 'command'})
+        self.assertEqual(result.render(), {'bash': 'command'})
 
     def test_get_match_multilabel_fail(self):
         """
@@ -138,7 +141,7 @@ class TestShellcut(TestCase):
         }
         input_data = 'My name is Harry Potter'
         result = main.get_match(input_data, shortcut)
-        self.assertEqual(result, {'bash': 'echo "Hello Harry!"'})
+        self.assertEqual(result.render(), {'bash': 'echo "Hello Harry!"'})
 
     def test_get_match_parse_regex(self):
         """
@@ -150,7 +153,7 @@ class TestShellcut(TestCase):
         }
         input_data = 'My name is Harry Potter'
         result = main.get_match(input_data, shortcut)
-        self.assertEqual(result, {'bash': 'echo "Hello Harry!"'})
+        self.assertEqual(result.render(), {'bash': 'echo "Hello Harry!"'})
 
     def test_get_match_parse_no_match(self):
         """
@@ -186,7 +189,7 @@ class TestShellcut(TestCase):
         }
         input_data = 'm1'
         result = main.get_match(input_data, shortcut)
-        self.assertEqual(result, {'bash': 'result'})
+        self.assertEqual(result.render(), {'bash': 'result'})
 
     def test_get_match_multiple_match_fail(self):
         """
@@ -210,7 +213,7 @@ class TestShellcut(TestCase):
         }
         input_data = 'm1'
         result = main.get_match(input_data, shortcut)
-        self.assertEqual(result, {'bash': 'result'})
+        self.assertEqual(result.render(), {'bash': 'result'})
 
     def test_get_match_multiple_regex_fail(self):
         """
@@ -224,6 +227,136 @@ class TestShellcut(TestCase):
         result = main.get_match(input_data, shortcut)
         self.assertIsNone(result)
 
+    def test_get_match_compiled(self):
+        """
+        Test that a compiled shortcut matches like its raw dictionary
+        """
+        shortcut = main.Shortcut({
+            'name': 'potter',
+            'match': 'My name is {} Potter',
+            'regex': r'I am (\w+)',
+            'bash': 'echo "Hello {}!"',
+            'label': ['l1', 'l2'],
+        })
+        result = main.get_match('My name is Harry Potter', shortcut, 'l2')
+        self.assertEqual(result.render(), {'bash': 'echo "Hello Harry!"'})
+
+        result = main.get_match('I am Ron', shortcut)
+        self.assertEqual(result.render(), {'bash': 'echo "Hello Ron!"'})
+
+        result = main.get_match('I am Ron', shortcut, 'l3')
+        self.assertIsNone(result)
+
+    def test_get_match_last_condition_wins(self):
+        """
+        Test that the scripts are rendered with the groups of the last
+        matching condition, regex-type conditions coming after match-type
+        ones
+        """
+        shortcut = {
+            'match': ['{}-{}', 'a-{}'],
+            'regex': [r'(\w)-(\w)', 'x'],
+            'bash': '{0}',
+        }
+        result = main.get_match('a-b', shortcut)
+        self.assertEqual(result.render(), {'bash': 'a'})
+
+        shortcut['regex'] = 'x'
+        result = main.get_match('a-b', shortcut)
+        self.assertEqual(result.render(), {'bash': 'b'})
+
+    def test_get_match_no_executors(self):
+        """
+        Test that a shortcut without any executor does not match
+        """
+        result = main.get_match('abc', {'match': 'abc', 'shell': 'x'})
+        self.assertIsNone(result)
+
+    def test_check_shortcuts_lazy_render(self):
+        """
+        Test that matching does not render the scripts, so a template which
+        can't be rendered only fails when its match is rendered
+        """
+        shortcuts = main.compile_shortcuts([
+            {'name': 'bad', 'match': 'a{}', 'bash': '{5}'},
+            {'name': 'good', 'match': 'a{}', 'bash': 'echo {}'},
+        ])
+        possible = main.check_shortcuts('abc', shortcuts)
+        self.assertEqual(len(possible), 2)
+        self.assertEqual(possible[1][1].render(), {'bash': 'echo bc'})
+        with self.assertRaises(IndexError):
+            possible[0][1].render()
+
+    def test_compile_template(self):
+        """
+        Test that templates with and without fields render like str.format
+        """
+        self.assertEqual(main.compile_template('plain')('x'), 'plain')
+        self.assertEqual(main.compile_template('{} {n}')('x', n='y'), 'x y')
+        self.assertEqual(main.compile_template('{{}}')(), '{}')
+
+    def test_compile_shortcuts(self):
+        """
+        Test that compiled shortcuts keep the order and the dictionary access
+        of the raw shortcuts
+        """
+        raw = [
+            {'name': 'a', 'match': 'x{}', 'label': 'l1'},
+            {'name': 'b', 'regex': ['y', 'z'], 'bash': 'cmd', 'fish': 'f'},
+        ]
+        compiled = main.compile_shortcuts(raw)
+
+        self.assertEqual([s['name'] for s in compiled], ['a', 'b'])
+        self.assertEqual(compiled[0].labels, frozenset(['l1']))
+        self.assertEqual(len(compiled[0].parsers), 1)
+        self.assertEqual(len(compiled[1].regexes), 2)
+        self.assertEqual(compiled[1].executors,
+                         (('bash', 'cmd'), ('fish', 'f')))
+        self.assertIn('bash', compiled[1])
+        self.assertIsNone(compiled[0].get('bash'))
+
+    def test_compile_shortcuts_shared(self):
+        """
+        Test that equal values of compiled shortcuts are stored once
+        """
+        raw = [
+            {'name': 'a', 'match': 'x{}', 'label': ['l1', 'l2'],
+             'bash': 'open {}'},
+            {'name': 'b', 'match': 'x{}', 'label': ['l2', 'l1'],
+             'bash': 'open {}'},
+        ]
+        first, second = main.compile_shortcuts(raw)
+
+        self.assertIs(first.labels, second.labels)
+        self.assertIs(first.match_conditions, second.match_conditions)
+        self.assertIs(first.executors, second.executors)
+        self.assertIs(first.parsers[0], second.parsers[0])
+        self.assertIs(first.renderers[0][1], second.renderers[0][1])
+        self.assertFalse(hasattr(first, '__dict__'))
+
+    def test_shortcut_item_access(self):
+        """
+        Test that a compiled shortcut gives access to its config values
+        """
+        shortcut = main.Shortcut({'name': 'a', 'regex': ['y', 'z'],
+                                  'label': 'l1', 'bash': 'cmd',
+                                  'timeout': 3})
+
+        self.assertEqual(shortcut.data, {'name': 'a', 'regex': ['y', 'z'],
+                                         'label': 'l1', 'bash': 'cmd',
+                                         'timeout': 3})
+        self.assertEqual(shortcut['timeout'], 3)
+        self.assertEqual(shortcut['regex'], ['y', 'z'])
+        self.assertIn('timeout', shortcut)
+        self.assertNotIn('parallel', shortcut)
+        self.assertNotIn('match', shortcut)
+        with self.assertRaises(KeyError):
+            shortcut['match']
+
+        unnamed = main.Shortcut({'match': 'x'})
+        self.assertNotIn('name', unnamed)
+        self.assertEqual(unnamed.get('name', 'none'), 'none')
+
     def test_load_shortcuts_empty(self):
         """
         Test that an empty config dir loads no shortcuts
@@ -322,6 +455,119 @@ class TestShellcut(TestCase):
         tmpdir1.cleanup()
         tmpdir2.cleanup()
 
+    def test_load_shortcuts_cached_reuses_cache(self):
+        """
+        Test that unchanged config files are not parsed again on the second
+        load
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            content = """\
+            ---
+            shortcuts:
+            - name: harry
+              attr: value
+            """
+            with open(os.path.join(tmpdir, 'file1.yaml'), 'w') as fd:
+                fd.write(textwrap.dedent(content))
+            cache_path = os.path.join(tmpdir, 'cache', 'shortcuts.cache')
+
+            first = main.load_shortcuts_cached([tmpdir], cache_path)
+            with patch('shellcut.main.load_config_file') as mock_load:
+                second = main.load_shortcuts_cached([tmpdir], cache_path)
+
+            mock_load.assert_not_called()
+            self.assertEqual(first, [{'attr': 'value', 'name': 'harry'}])
+            self.assertEqual(second, first)
+
+    def test_load_shortcuts_cached_changed_file(self):
+        """
+        Test that only the config file which changed is parsed again
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file1 = os.path.join(tmpdir, 'file1.yaml')
+            file2 = os.path.join(tmpdir, 'file2.yaml')
+            with open(file1, 'w') as fd:
+                fd.write('shortcuts:\n- name: harry\n')
+            with open(file2, 'w') as fd:
+                fd.write('shortcuts:\n- name: ron\n')
+            cache_path = os.path.join(tmpdir, 'shortcuts.cache')
+            main.load_shortcuts_cached([tmpdir], cache_path)
+
+            with open(file2, 'w') as fd:
+                fd.write('shortcuts:\n- name: hermione\n')
+
+            with patch('shellcut.main.load_config_file',
+                       wraps=main.load_config_file) as mock_load:
+                shortcuts = main.load_shortcuts_cached([tmpdir], cache_path)
+
+            mock_load.assert_called_once_with(file2)
+            self.assertCountEqual(
+                shortcuts, [{'name': 'harry'}, {'name': 'hermione'}])
+
+    def test_load_shortcuts_cached_removed_file(self):
+        """
+        Test that shortcuts of a deleted config file are not served from the
+        cache
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file1 = os.path.join(tmpdir, 'file1.yaml')
+            with open(file1, 'w') as fd:
+                fd.write('shortcuts:\n- name: harry\n')
+            cache_path = os.path.join(tmpdir, 'shortcuts.cache')
+            main.load_shortcuts_cached([tmpdir], cache_path)
+
+            os.remove(file1)
+            shortcuts = main.load_shortcuts_cached([tmpdir], cache_path)
+            self.assertEqual(shortcuts, [])
+
+    def test_load_shortcuts_sorted(self):
+        """
+        Test that config files of a directory are loaded in name order
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ['b', 'c', 'a']:
+                with open(os.path.join(tmpdir, name + '.yaml'), 'w') as fd:
+                    fd.write('shortcuts:\n- name: {}\n'.format(name))
+
+            shortcuts = main.load_shortcuts([tmpdir])
+        self.assertEqual(shortcuts,
+                         [{'name': 'a'}, {'name': 'b'}, {'name': 'c'}])
+
+    @patch('shellcut.main.os.cpu_count', return_value=2)
+    @patch('shellcut.main.PARALLEL_LOAD_THRESHOLD', 2)
+    def test_load_config_files_parallel(self, mock_cpu_count):
+        """
+        Test that files parsed in worker processes keep their order
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filenames = []
+            for i in range(20):
+                filename = os.path.join(tmpdir, '{}.yaml'.format(i))
+                with open(filename, 'w') as fd:
+                    fd.write('shortcuts:\n- name: s{}\n'.format(i))
+                filenames.append(filename)
+
+            with patch('concurrent.futures.ProcessPoolExecutor',
+                       wraps=ProcessPoolExecutor) as mock_executor:
+                loaded = main.load_config_files(filenames)
+
+        mock_executor.assert_called_once_with(2)
+        self.assertEqual(loaded, [[{'name': 's{}'.format(i)}]
+                                  for i in range(20)])
+
+    def test_env_flag(self):
+        """
+        Test that false-looking values of a flag variable disable it
+        """
+        for value, expected in [('1', True), ('yes', True), ('', False),
+                                ('0', False), ('false', False),
+                                ('No', False)]:
+            with patch.dict('os.environ', {'SHELLCUT_AUTO_PICK': value}):
+                self.assertEqual(main.env_flag('SHELLCUT_AUTO_PICK'),
+                                 expected, value)
+        with patch.dict('os.environ', clear=True):
+            self.assertFalse(main.env_flag('SHELLCUT_AUTO_PICK'))
+
     @patch('shellcut.main.os.environ')
     def test_get_config_dirs_envset(self, mock_environ):
         """
@@ -401,6 +647,16 @@ class TestShellcut(TestCase):
         with self.assertRaises(SystemExit):
             main.parse_arguments()
 
+    def test_parse_arguments_label_option(self):
+        """
+        Test that --label is rejected without --batch or --scan
+        """
+        with patch('sys.argv', ['s', 'BZ1', '--label', 'bug']), \
+                patch('sys.stderr'), self.assertRaises(SystemExit):
+            main.parse_arguments()
+        with patch('sys.argv', ['s', '--batch', '--label', 'bug']):
+            self.assertEqual(main.parse_arguments().batch_label, 'bug')
+
     def test_choose_single_match_no_match(self):
         """
         Test no possible match exits the program
@@ -470,3 +726,17 @@ class TestShellcut(TestCase):
 
         res = main.listify([1, 2, 3])
         self.assertEqual(res, [1, 2, 3])
+
+    def test_import_is_lazy(self):
+        """
+        Test that importing the module does not import the modules only some
+        code paths need
+        """
+        code = ('import sys, shellcut.main; '
+                'print(" ".join(sorted(sys.modules)))')
+        output = subprocess.check_output([sys.executable, '-c', code],
+                                         universal_newlines=True)
+        modules = output.split()
+        for module in ['yaml', 'parse', 'xdg', 'argparse', 'subprocess',
+                       'shellcut.index']:
+            self.assertNotIn(module, modules)
@@ -0,0 +1,119 @@
+import io
+import os
+import json
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import main
+from shellcut import trace
+from shellcut.index import ShortcutIndex
+
+
+SHORTCUTS = [
+    {'name': 'bz', 'match': 'BZ{}', 'bash': 'open {}'},
+    {'name': 'jira', 'regex': '^JIRA-(\\d+)$', 'bash': 'open {}'},
+]
+
+
+class TestTrace(TestCase):
+
+    def setUp(self):
+        self.addCleanup(setattr, trace, 'tracer', None)
+
+    def events(self, name):
+        return [event for event in trace.tracer.events
+                if event['event'] == name]
+
+    def test_disabled(self):
+        """
+        Test that nothing is recorded while tracing is disabled
+        """
+        self.assertIs(trace.stage('x'), trace.NULL_STAGE)
+        with trace.stage('x'):
+            pass
+        self.assertEqual(len(main.check_shortcuts('BZ1', SHORTCUTS)), 1)
+
+    def test_stage(self):
+        """
+        Test that stages are recorded with their start and duration
+        """
+        tracer = trace.enable('-')
+        with trace.stage('load'):
+            pass
+        self.assertEqual(len(tracer.events), 1)
+        event = tracer.events[0]
+        self.assertEqual(event['event'], 'load')
+        self.assertGreaterEqual(event['start'], 0)
+        self.assertGreaterEqual(event['duration'], 0)
+
+    def test_check_shortcuts(self):
+        """
+        Test that the index counters and every checked shortcut are recorded
+        """
+        shortcuts = main.compile_shortcuts(SHORTCUTS)
+        index = ShortcutIndex(shortcuts)
+        trace.enable('-')
+        main.check_shortcuts('BZ1', shortcuts, index=index)
+
+        self.assertEqual(
+            [(event['shortcut'], event['matched'])
+             for event in self.events('get_match')], [('bz', True)])
+        self.assertEqual(self.events('index')[0]['candidates'], 1)
+
+    def test_load_shortcuts(self):
+        """
+        Test that the load time of every config file is recorded
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'a.yaml'), 'w') as fd:
+                fd.write('shortcuts: []\n')
+            cache_path = os.path.join(tmpdir, 'cache')
+            trace.enable('-')
+            main.load_shortcuts_cached([tmpdir], cache_path)
+            main.load_shortcuts_cached([tmpdir], cache_path)
+
+        self.assertEqual([event['cached']
+                          for event in self.events('load_file')],
+                         [False, True])
+
+    def test_finish_file(self):
+        """
+        Test that the report is appended to the trace file
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'trace.json')
+            for _ in range(2):
+                trace.enable(path)
+                with trace.stage('x'):
+                    pass
+                trace.finish()
+            with open(path) as fd:
+                reports = [json.loads(line) for line in fd]
+
+        self.assertIsNone(trace.tracer)
+        self.assertEqual(len(reports), 2)
+        self.assertEqual(reports[0]['events'][0]['event'], 'x')
+
+    @patch('shellcut.executors.run_executors', return_value=0)
+    @patch('shellcut.main.find_matches')
+    def test_main_timings(self, mock_find, mock_run):
+        """
+        Test that --timings prints the stages of the run to stderr
+        """
+        match = main.get_match('BZ1', SHORTCUTS[0])
+        mock_find.return_value = [(SHORTCUTS[0], match)]
+
+        with patch('sys.argv', ['s', '--timings', '--no-memo', 'BZ1']), \
+                patch('sys.stderr', new_callable=io.StringIO) as stderr, \
+                self.assertRaises(SystemExit):
+            main.main()
+
+        report = json.loads(stderr.getvalue())
+        self.assertEqual(
+            [event['event'] for event in report['events']],
+            ['parse_arguments', 'find_matches', 'choose_match', 'render',
+             'run_executors'])
+        mock_run.assert_called_once_with({'bash': 'open 1'})
+        self.assertIsNone(trace.tracer)
@@ -0,0 +1,165 @@
+import os
+import time
+import tempfile
+
+from unittest import TestCase
+from unittest.mock import patch
+
+from shellcut import watch
+
+
+def write_config(path, name, match, mtime=None):
+    with open(path, 'w') as fd:
+        fd.write('shortcuts:\n- name: {}\n  match: "{}"\n  bash: "{{}}"\n'
+                 .format(name, match))
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+class TestConfigWatcher(TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.file1 = os.path.join(self.tmpdir.name, 'a.yaml')
+        self.file2 = os.path.join(self.tmpdir.name, 'b.yaml')
+        write_config(self.file1, 'harry', 'H{}', mtime=1000)
+        write_config(self.file2, 'ron', 'R{}', mtime=1000)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def names(self, possible):
+        return [shortcut['name'] for shortcut, _ in possible]
+
+    def test_initial_load(self):
+        """
+        Test that all config files are loaded in order
+        """
+        watcher = watch.ConfigWatcher([self.tmpdir.name])
+        self.assertCountEqual(
+            [s['name'] for s in watcher.snapshot.shortcuts], ['harry', 'ron'])
+        self.assertEqual(self.names(watcher.check_shortcuts('R1')), ['ron'])
+
+    def test_refresh_unchanged(self):
+        """
+        Test that refreshing unchanged config files keeps the snapshot
+        """
+        watcher = watch.ConfigWatcher([self.tmpdir.name])
+        snapshot = watcher.snapshot
+        self.assertFalse(watcher.refresh())
+        self.assertIs(watcher.snapshot, snapshot)
+
+    def test_refresh_changed_file(self):
+        """
+        Test that only the changed file is reloaded and the old snapshot
+        keeps answering with the old shortcuts
+        """
+        watcher = watch.ConfigWatcher([self.tmpdir.name])
+        old_snapshot = watcher.snapshot
+
+        write_config(self.file2, 'hermione', 'R{}', mtime=2000)
+        self.assertTrue(watcher.refresh())
+
+        for old, new in zip(old_snapshot.segments, watcher.snapshot.segments):
+            self.assertEqual(old is new, old.path == self.file1)
+        self.assertEqual(self.names(watcher.check_shortcuts('R1')),
+                         ['hermione'])
+        self.assertEqual(self.names(old_snapshot.check_shortcuts('R1')),
+                         ['ron'])
+
+    def test_refresh_keeps_other_layers(self):
+        """
+        Test that a changed file is indexed on its own, without touching
+        the index of the other files, and matches keep the config order
+        """
+        for name in 'cde':
+            write_config(os.path.join(self.tmpdir.name, name + '.yaml'),
+                         name, 'X{}', mtime=1000)
+        watcher = watch.ConfigWatcher([self.tmpdir.name])
+        base, = watcher.snapshot.layers
+        index_data = dict(vars(base.index))
+
+        write_config(self.file2, 'hermione', 'X{}', mtime=2000)
+        self.assertTrue(watcher.refresh())
+
+        layers = watcher.snapshot.layers
+        self.assertIs(layers[0], base)
+        self.assertEqual(vars(base.index), index_data)
+        self.assertEqual([segment.path for segment in layers[1].segments],
+                         [self.file2])
+        self.assertEqual(self.names(watcher.check_shortcuts('X1')),
+                         ['hermione', 'c', 'd', 'e'])
+        self.assertEqual(self.names(watcher.check_shortcuts('R1')), [])
+
+    def test_refresh_added_and_removed_file(self):
+        """
+        Test that added and removed config files are picked up
+        """
+        watcher = watch.ConfigWatcher([self.tmpdir.name])
+        os.remove(self.file1)
+        write_config(os.path.join(self.tmpdir.name, 'c.yaml'), 'ginny',
+                     'G{}')
+        self.assertTrue(watcher.refresh())
+        self.assertCountEqual(
+            [s['name'] for s in watcher.snapshot.shortcuts], ['ron', 'ginny'])
+
+    @patch('sys.stderr')
+    def test_refresh_broken_file(self, mock_stderr):
+        """
+        Test that a config file which fails to parse keeps its old shortcuts
+        """
+        watcher = watch.ConfigWatcher([self.tmpdir.name])
+        with open(self.file2, 'w') as fd:
+            fd.write('shortcuts: [')
+        self.assertFalse(watcher.refresh())
+        self.assertEqual(self.names(watcher.check_shortcuts('R1')), ['ron'])
+
+    def check_background_reload(self):
+        watcher = watch.ConfigWatcher([self.tmpdir.name], interval=0.01)
+        watcher.start()
+        self.addCleanup(watcher.stop)
+
+        write_config(self.file2, 'hermione', 'R{}', mtime=2000)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if self.names(watcher.check_shortcuts('R1')) == ['hermione']:
+                break
+            time.sleep(0.01)
+        self.assertEqual(self.names(watcher.check_shortcuts('R1')),
+                         ['hermione'])
+
+    def test_background_reload(self):
+        """
+        Test that the background thread picks up a changed file
+        """
+        self.check_background_reload()
+
+    @patch('shellcut.watch.make_waiter', watch.PollWaiter)
+    def test_background_reload_polling(self):
+        """
+        Test that changes are picked up by polling without inotify
+        """
+        self.check_background_reload()
+
+    def test_inotify_recreated_directory(self):
+        """
+        Test that a removed and recreated config directory is watched again
+        """
+        configdir = os.path.join(self.tmpdir.name, 'config')
+        os.mkdir(configdir)
+        try:
+            waiter = watch.InotifyWaiter([configdir])
+        except (OSError, AttributeError):
+            self.skipTest('inotify is not available')
+        self.addCleanup(waiter.close)
+        self.assertEqual(list(waiter.watched.values()), [configdir])
+
+        os.rmdir(configdir)
+        self.assertTrue(waiter.wait(1))
+        self.assertEqual(waiter.watched, {})
+
+        os.mkdir(configdir)
+        self.assertTrue(waiter.wait(0))
+        self.assertEqual(list(waiter.watched.values()), [configdir])
+        write_config(os.path.join(configdir, 'a.yaml'), 'harry', 'H{}')
+        self.assertTrue(waiter.wait(1))